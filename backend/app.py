@@ -1,18 +1,25 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request, Body
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request, Body, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+import logging
 import os
 import time
 from pathlib import Path
+from typing import Literal
 from fastapi.staticfiles import StaticFiles
 
 from backend import db
+from backend import async_db as adb
 from backend import settings as settings_mod
+from backend.responses import accepts_gzip, gzip_chunks, respond
+from backend.pagination import InvalidCursor, next_cursor, page
 from backend.schemas import ProjectCreate, ProjectOut, CommandCreate
 from jarvis.security import EnterpriseSecurity
 from jarvis import voice
 from jarvis import BasicAICore, devices
 from organism_designer import api as organism_api
+from organism_designer import core as organism_core
 from fastapi.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
 
 
 app = FastAPI(title="J.A.R.V.I.S Backend (Prototype)")
@@ -29,16 +36,21 @@ def startup_event():
     db.init_db()
 
 
+@app.exception_handler(InvalidCursor)
+async def invalid_cursor_handler(request: Request, exc: InvalidCursor):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+
 @app.get("/health")
-def health():
+async def health():
     return {"status": "ok"}
 
 
-def _verify_admin(request: Request):
+async def _verify_admin(request: Request):
     # Prefer short-lived session token
     session = request.headers.get('x-admin-session')
     if session:
-        ok, actor = db.verify_admin_session(session)
+        ok, actor = await adb.verify_admin_session(session)
         if ok:
             return True, actor
 
@@ -56,7 +68,7 @@ def _verify_admin(request: Request):
 
 
 @app.post('/api/admin/login')
-def admin_login(request: Request, payload: dict = Body(...)):
+async def admin_login(request: Request, payload: dict = Body(...)):
     """Exchange a configured master token for a short-lived session token.
 
     Payload: {"master_token": "...", "actor": "username", "ttl": 3600}
@@ -67,33 +79,34 @@ def admin_login(request: Request, payload: dict = Body(...)):
     env = os.environ.get('JARVIS_ADMIN_TOKEN')
     if not env or master != env:
         raise HTTPException(status_code=401, detail='invalid master token')
-    sess = db.create_admin_session(actor=actor, ttl_seconds=ttl)
+    sess = await adb.create_admin_session(actor=actor, ttl_seconds=ttl)
     return sess
 
 
 @app.post('/api/admin/logout')
-def admin_logout(request: Request):
+async def admin_logout(request: Request):
     session = request.headers.get('x-admin-session')
     if not session:
         raise HTTPException(status_code=400, detail='no session token provided')
-    ok = db.revoke_admin_session(session)
+    ok = await adb.revoke_admin_session(session)
     if not ok:
         raise HTTPException(status_code=404, detail='session not found')
     return {'revoked': True}
 
 
 @app.get('/api/admin/sessions')
-def admin_list_sessions(request: Request, limit: int = 100, offset: int = 0):
+async def admin_list_sessions(request: Request, limit: int = Query(100, ge=1, le=1000), offset: int = 0, cursor: str | None = None):
     # require admin (session or master) to list sessions
-    ok, _ = _verify_admin(request)
+    ok, _ = await _verify_admin(request)
     if not ok:
         raise HTTPException(status_code=401, detail='admin required')
-    return db.list_admin_sessions(limit=limit, offset=offset)
+    rows = await adb.list_admin_sessions(limit=limit, offset=offset, cursor=cursor)
+    return page(rows, limit)
 
 
 @app.delete('/api/admin/sessions/{session_token}')
-def admin_revoke_session(request: Request, session_token: str):
-    ok, _ = _verify_admin(request)
+async def admin_revoke_session(request: Request, session_token: str):
+    ok, _ = await _verify_admin(request)
     if not ok:
         raise HTTPException(status_code=401, detail='admin required')
 
@@ -104,30 +117,30 @@ def admin_revoke_session(request: Request, session_token: str):
         ok_jwt, payload = db._verify_jwt(session_token)
         if not ok_jwt:
             # if not valid JWT, still store raw token in revoke list
-            db.revoke_token(session_token, reason='manual_revoke')
+            await adb.revoke_token(session_token, reason='manual_revoke')
             return {'revoked': True}
         sid = payload.get('sid')
         if sid:
-            db.revoke_token(sid, actor=payload.get('actor'), reason='manual_revoke')
+            await adb.revoke_token(sid, actor=payload.get('actor'), reason='manual_revoke')
             try:
-                settings_mod.append_audit_entry('admin', 'revoke_session', old_value=None, new_value=sid, reason='manual revoke')
+                await run_in_threadpool(settings_mod.append_audit_entry, 'admin', 'revoke_session', old_value=None, new_value=sid, reason='manual revoke')
             except Exception:
                 pass
             return {'revoked': True}
-        db.revoke_token(session_token, reason='manual_revoke')
+        await adb.revoke_token(session_token, reason='manual_revoke')
         try:
-            settings_mod.append_audit_entry('admin', 'revoke_session', old_value=None, new_value=session_token, reason='manual revoke')
+            await run_in_threadpool(settings_mod.append_audit_entry, 'admin', 'revoke_session', old_value=None, new_value=session_token, reason='manual revoke')
         except Exception:
             pass
         return {'revoked': True}
 
     # otherwise try to remove from stateful sessions
-    okr = db.revoke_admin_session(session_token)
+    okr = await adb.revoke_admin_session(session_token)
     if okr:
         # also mark token as revoked for good measure
-        db.revoke_token(session_token, reason='manual_revoke')
+        await adb.revoke_token(session_token, reason='manual_revoke')
         try:
-            settings_mod.append_audit_entry('admin', 'revoke_session', old_value=None, new_value=session_token, reason='manual revoke')
+            await run_in_threadpool(settings_mod.append_audit_entry, 'admin', 'revoke_session', old_value=None, new_value=session_token, reason='manual revoke')
         except Exception:
             pass
         return {'revoked': True}
@@ -135,61 +148,71 @@ def admin_revoke_session(request: Request, session_token: str):
 
 
 @app.post('/api/admin/revoke_actor')
-def admin_revoke_actor(request: Request, payload: dict = Body(...)):
-    ok, _ = _verify_admin(request)
+async def admin_revoke_actor(request: Request, payload: dict = Body(...)):
+    ok, _ = await _verify_admin(request)
     if not ok:
         raise HTTPException(status_code=401, detail='admin required')
     actor = payload.get('actor')
     if not actor:
         raise HTTPException(status_code=400, detail='actor required')
-    removed = db.revoke_all_for_actor(actor)
+    removed = await adb.revoke_all_for_actor(actor)
     # append audit entry
     try:
-        settings_mod.append_audit_entry('admin', 'revoke_actor', old_value=0, new_value=removed, reason=f'revoke_all_for_{actor}')
+        await run_in_threadpool(settings_mod.append_audit_entry, 'admin', 'revoke_actor', old_value=0, new_value=removed, reason=f'revoke_all_for_{actor}')
     except Exception:
         pass
     return {'removed_stateful': removed}
 
 
+@app.get('/api/admin/cache_stats')
+async def admin_cache_stats(request: Request):
+    ok, _ = await _verify_admin(request)
+    if not ok:
+        raise HTTPException(status_code=401, detail='admin required')
+    return db.cache_stats()
+
+
 @app.get('/api/admin/session_audit')
-def admin_session_audit(request: Request, limit: int = 100, offset: int = 0):
-    ok, _ = _verify_admin(request)
+async def admin_session_audit(request: Request, limit: int = Query(100, ge=1, le=1000), offset: int = 0, cursor: str | None = None):
+    ok, _ = await _verify_admin(request)
     if not ok:
         raise HTTPException(status_code=401, detail='admin required')
-    return db.list_revoked_tokens(limit=limit, offset=offset)
+    rows = await adb.list_revoked_tokens(limit=limit, offset=offset, cursor=cursor)
+    return page(rows, limit, key=('revoked_at', 'id'))
 
 
 @app.get('/api/admin/session_history')
-def admin_session_history(request: Request, limit: int = 100, offset: int = 0, actor: str | None = None, field: str | None = None, since: int | None = None, until: int | None = None):
-    ok, _ = _verify_admin(request)
+async def admin_session_history(request: Request, limit: int = Query(100, ge=1, le=1000), offset: int = 0, actor: str | None = None, field: str | None = None, since: int | None = None, until: int | None = None, cursor: str | None = None):
+    ok, _ = await _verify_admin(request)
     if not ok:
         raise HTTPException(status_code=401, detail='admin required')
     # Reuse settings.get_audit_logs to return session-related audit entries (session_create, revoke_session, revoke_actor, session_cleanup)
-    return settings_mod.get_audit_logs(limit=limit, offset=offset, actor=actor, field=field, since=since, until=until)
+    return await run_in_threadpool(settings_mod.get_audit_page, limit=limit, offset=offset, actor=actor, field=field, since=since, until=until, cursor=cursor)
 
 
 @app.post("/projects", response_model=ProjectOut)
-def create_project(p: ProjectCreate):
-    project_id = db.create_project(p.title, p.description or "")
-    proj = db.get_project(project_id)
+async def create_project(p: ProjectCreate):
+    project_id = await adb.create_project(p.title, p.description or "")
+    proj = await adb.get_project(project_id)
     return proj
 
 
-@app.get("/projects", response_model=list[ProjectOut])
-def list_projects():
-    return db.list_projects()
+@app.get("/projects")
+async def list_projects(limit: int = Query(100, ge=1, le=1000), cursor: str | None = None):
+    rows = await adb.list_projects(limit=limit, cursor=cursor)
+    return respond(page(rows, limit))
 
 
 @app.get("/projects/{project_id}", response_model=ProjectOut)
-def get_project(project_id: int):
-    proj = db.get_project(project_id)
+async def get_project(project_id: int):
+    proj = await adb.get_project(project_id)
     if not proj:
         raise HTTPException(status_code=404, detail="Project not found")
     return proj
 
 
 @app.post("/commands")
-def post_command(c: CommandCreate, request: Request):
+async def post_command(c: CommandCreate, request: Request):
     # Basic enterprise security check
     es = EnterpriseSecurity()
     ok, msg = es.validate_command_safety(c.command_text)
@@ -199,104 +222,123 @@ def post_command(c: CommandCreate, request: Request):
     # If command looks like device-control, require pairing token header
     pairing_token = request.headers.get("x-pairing-token")
     if "control" in c.command_text.lower() or "device:" in c.command_text.lower():
-        if not pairing_token or not devices.authenticate_device(pairing_token):
+        if not pairing_token or not await adb.verify_device(pairing_token):
             return JSONResponse(status_code=401, content={"error": "Pairing required for device control"})
 
     # Store command for history and get AI response
-    db.create_command(c.command_text)
-    response_text = ai_core.chat(c.command_text)
+    await adb.record_command(c.command_text)
+    # the AI core may call out to external services; keep it off the DB executors
+    response_text = await run_in_threadpool(ai_core.chat, c.command_text)
     return {"response": response_text}
 
 
 @app.get("/history")
-def get_history():
-    return db.get_history()
+async def get_history(limit: int = Query(10, ge=1, le=1000), cursor: str | None = None):
+    rows = await adb.get_history(limit=limit, cursor=cursor)
+    return respond(page(rows, limit))
 
 
 
 
 @app.get("/api/settings")
-def get_settings(request: Request):
-    ok, _ = _verify_admin(request)
+async def get_settings(request: Request):
+    ok, _ = await _verify_admin(request)
     if not ok:
         raise HTTPException(status_code=401, detail="admin token required")
-    return settings_mod.load_settings()
+    return await run_in_threadpool(settings_mod.load_settings)
 
 
 @app.post("/api/settings")
-def post_settings(request: Request, payload: dict = Body(...), reason: str | None = None):
-    ok, actor = _verify_admin(request)
+async def post_settings(request: Request, payload: dict = Body(...), reason: str | None = None):
+    ok, actor = await _verify_admin(request)
     if not ok:
         raise HTTPException(status_code=401, detail="admin token required")
     # payload should be a dict of settings
     if not isinstance(payload, dict):
         raise HTTPException(status_code=400, detail="settings payload must be an object")
-    res = settings_mod.save_settings_atomic(payload, actor=actor or 'admin', reason=reason)
+    res = await run_in_threadpool(settings_mod.save_settings_atomic, payload, actor=actor or 'admin', reason=reason)
     return {"saved": True, "changed": res.get('changed', 0)}
 
 
 @app.get("/api/logs")
-def get_logs(request: Request, limit: int = 200, offset: int = 0, actor: str | None = None, field: str | None = None, since: int | None = None, until: int | None = None):
-    ok, _ = _verify_admin(request)
+async def get_logs(request: Request, limit: int = Query(200, ge=1, le=1000), offset: int = 0, actor: str | None = None, field: str | None = None, since: int | None = None, until: int | None = None, cursor: str | None = None):
+    ok, _ = await _verify_admin(request)
     if not ok:
         raise HTTPException(status_code=401, detail="admin token required")
-    return settings_mod.get_audit_logs(limit=limit, offset=offset, actor=actor, field=field, since=since, until=until)
+    return await run_in_threadpool(settings_mod.get_audit_page, limit=limit, offset=offset, actor=actor, field=field, since=since, until=until, cursor=cursor)
 
 
+@app.get("/api/logs/export")
+async def export_logs(request: Request, format: Literal['ndjson', 'csv'] = 'ndjson', actor: str | None = None, field: str | None = None, since: int | None = None, until: int | None = None):
+    """Stream every matching audit entry, newest first, as NDJSON or CSV.
+
+    The body is produced while the log is read (gzip-compressed when the
+    client accepts it), so a full-history export is one pass in bounded
+    memory instead of many `/api/logs` pages.
+    """
+    ok, _ = await _verify_admin(request)
+    if not ok:
+        raise HTTPException(status_code=401, detail="admin token required")
+    body = settings_mod.export_audit(format, actor=actor, field=field, since=since, until=until)
+    headers = {'Content-Disposition': f'attachment; filename="audit.{format}"', 'Vary': 'Accept-Encoding'}
+    if accepts_gzip(request):
+        body = gzip_chunks(body)
+        headers['Content-Encoding'] = 'gzip'
+    media_type = 'text/csv; charset=utf-8' if format == 'csv' else 'application/x-ndjson'
+    # a sync iterator: Starlette pulls it from a worker thread
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
 
 @app.post("/projects/{project_id}/files")
-def upload_project_file(project_id: int, file: UploadFile = File(...)):
-    data = file.file.read()
-    path = db.add_project_file(project_id, file.filename, data)
+async def upload_project_file(project_id: int, file: UploadFile = File(...)):
+    data = await file.read()
+    path = await adb.add_project_file(project_id, file.filename, data)
     return {"path": path, "filename": file.filename}
 
 
 @app.get("/projects/{project_id}/files")
-def get_project_files(project_id: int):
-    return db.list_project_files(project_id)
+async def get_project_files(project_id: int, limit: int = Query(100, ge=1, le=1000), cursor: str | None = None):
+    rows = await adb.list_project_files(project_id, limit=limit, cursor=cursor)
+    return respond(page(rows, limit))
 
 
 @app.post("/devices/register")
-def register_device(name: str = Form(...), type: str = Form(...), capabilities: str = Form(...)):
+async def register_device(name: str = Form(...), type: str = Form(...), capabilities: str = Form(...)):
     import json
     try:
         capabilities_list = json.loads(capabilities)
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid JSON in capabilities field")
-    token = devices.register_device(name, type, capabilities_list)
+    token = await adb.run_write(devices.register_device, name, type, capabilities_list)
     return {"token": token}
 
 
 @app.get("/devices/commands")
-def get_device_commands(request: Request):
+async def get_device_commands(request: Request):
     token = request.headers.get("x-pairing-token")
-    if not token or not devices.authenticate_device(token):
+    if not token or not await adb.verify_device(token):
         raise HTTPException(status_code=401, detail="Invalid or missing pairing token")
 
-    device = db.get_device(token)
+    device = await adb.get_device(token)
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
 
-    commands = db.get_pending_commands_for_device(device['id'])
-    for cmd in commands:
-        db.update_command_status(cmd['id'], 'in_progress')
-
-    return commands
+    return await adb.claim_pending_commands(device['id'])
 
 
 @app.post("/devices/commands/{command_id}")
-def update_device_command_status(command_id: int, status: str = Form(...), request: Request):
+async def update_device_command_status(command_id: int, request: Request, status: str = Form(...)):
     token = request.headers.get("x-pairing-token")
-    if not token or not devices.authenticate_device(token):
+    if not token or not await adb.verify_device(token):
         raise HTTPException(status_code=401, detail="Invalid or missing pairing token")
 
-    db.update_command_status(command_id, status)
+    await adb.update_command_status(command_id, status)
     return {"status": "updated", "command_id": command_id, "new_status": status}
 
 
 @app.post("/devices/{device_id}/commands")
-def enqueue_device_command(device_id: int, command: str = Form(...), payload: str = Form(None), request: Request):
-    ok, _ = _verify_admin(request)
+async def enqueue_device_command(device_id: int, request: Request, command: str = Form(...), payload: str = Form(None)):
+    ok, _ = await _verify_admin(request)
     if not ok:
         raise HTTPException(status_code=401, detail="admin token required")
 
@@ -308,27 +350,27 @@ def enqueue_device_command(device_id: int, command: str = Form(...), payload: st
         except json.JSONDecodeError:
             raise HTTPException(status_code=400, detail="Invalid JSON in payload")
 
-    db.add_command_to_queue(device_id, command, payload_dict)
+    await adb.add_command_to_queue(device_id, command, payload_dict)
     return {"status": "enqueued", "device_id": device_id, "command": command}
 
 
 @app.post("/projects/{project_id}/snapshot")
-def create_snapshot(project_id: int):
+async def create_snapshot(project_id: int):
     try:
-        sid = db.create_snapshot(project_id)
+        sid = await adb.create_snapshot(project_id)
         return {"snapshot_id": sid}
     except ValueError:
         raise HTTPException(status_code=404, detail="Project not found")
 
 
 @app.get("/projects/{project_id}/snapshots")
-def list_project_snapshots(project_id: int):
-    return db.list_snapshots(project_id)
+async def list_project_snapshots(project_id: int):
+    return await adb.list_snapshots(project_id)
 
 
 @app.post("/snapshots/{snapshot_id}/restore")
-def restore_snapshot(snapshot_id: int):
-    ok = db.restore_snapshot(snapshot_id)
+async def restore_snapshot(snapshot_id: int):
+    ok = await adb.restore_snapshot(snapshot_id)
     if not ok:
         raise HTTPException(status_code=404, detail="Snapshot not found")
     return {"restored": True}
@@ -340,13 +382,18 @@ def _autosave_loop(interval: int = 60):
     def loop():
         while True:
             try:
-                projects = db.list_projects()
-                for p in projects:
-                    try:
-                        db.create_snapshot(p['id'])
-                    except Exception:
-                        # snapshot failure shouldn't kill loop
-                        pass
+                cursor = None
+                while True:
+                    projects = db.list_projects(limit=100, cursor=cursor)
+                    for p in projects:
+                        try:
+                            db.create_snapshot(p['id'])
+                        except Exception:
+                            # snapshot failure shouldn't kill loop
+                            pass
+                    cursor = next_cursor(projects, 100)
+                    if cursor is None:
+                        break
             except Exception:
                 pass
             time.sleep(interval)
@@ -379,6 +426,37 @@ def _revoked_cleanup_loop(interval: int = 3600, retention: int = 60 * 60 * 24 *
     t.start()
 
 
+def _traits_backfill():
+    import threading
+
+    def run():
+        try:
+            db.backfill_traits()
+        except Exception:
+            # organisms left without traits are picked up on the next start
+            pass
+
+    t = threading.Thread(target=run, daemon=True)
+    t.start()
+
+
+def _motif_index_loop(interval: int = 10):
+    import threading, time
+
+    def loop():
+        while True:
+            try:
+                # index organisms stored since the last pass; searches scan
+                # them until then
+                db.backfill_motifs()
+            except Exception:
+                pass
+            time.sleep(interval)
+
+    t = threading.Thread(target=loop, daemon=True)
+    t.start()
+
+
 def _session_cleanup_loop(interval: int = 300):
     import threading, time
 
@@ -430,6 +508,28 @@ def startup_event():
     except Exception:
         retention = 60 * 60 * 24 * 30
     _revoked_cleanup_loop(interval=revoked_interval, retention=retention)
+    # extract traits for organisms stored before trait extraction existed
+    _traits_backfill()
+    # keep the motif search index caught up with new organisms
+    try:
+        motif_interval = int(os.environ.get('JARVIS_MOTIF_INDEX_INTERVAL', '10'))
+    except Exception:
+        motif_interval = 10
+    _motif_index_loop(interval=motif_interval)
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    # stop evolution jobs, drain the DB executors and the group-commit
+    # queue, release pooled sqlite connections and write buffered audit entries
+    organism_core.shutdown()
+    adb.shutdown()
+    db.flush_writes(timeout=10)
+    db.close_all()
+    try:
+        settings_mod.flush_audit(timeout=10)
+    except Exception as e:
+        logging.error(f"audit entries left unwritten at shutdown: {e}")
 
 
 @app.post("/transcribe")
@@ -0,0 +1,148 @@
+"""Async facade over `backend.db` for FastAPI endpoints.
+
+Blocking sqlite calls are dispatched to dedicated executors rather than
+Starlette's shared threadpool: a single writer thread serializes every write
+(SQLite allows only one writer at a time, so more threads would just contend
+on the lock) and a small reader pool serves queries concurrently under WAL.
+Each executor thread keeps its own pooled connection from `db.get_conn`.
+"""
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from backend import db
+
+READER_THREADS = int(os.environ.get("JARVIS_DB_READERS", "4"))
+
+_lock = threading.Lock()
+_executors = {}
+
+
+def _executor(kind: str) -> ThreadPoolExecutor:
+    ex = _executors.get(kind)
+    if ex is None:
+        with _lock:
+            ex = _executors.get(kind)
+            if ex is None:
+                workers = 1 if kind == "writer" else READER_THREADS
+                ex = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"db-{kind}")
+                _executors[kind] = ex
+    return ex
+
+
+async def run_read(fn, *args, **kwargs):
+    """Run a blocking read-only callable on the reader pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor("reader"), functools.partial(fn, *args, **kwargs))
+
+
+async def run_write(fn, *args, **kwargs):
+    """Run a blocking callable that writes on the single writer thread."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor("writer"), functools.partial(fn, *args, **kwargs))
+
+
+def submit_write(fn, *args, **kwargs) -> Future:
+    """Queue a blocking write on the writer thread from outside the event loop.
+
+    For background threads (e.g. evolution jobs) whose writes must not
+    compete with the API's writes for the SQLite lock.
+    """
+    return _executor("writer").submit(fn, *args, **kwargs)
+
+
+def _reader(fn):
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await run_read(fn, *args, **kwargs)
+    return wrapper
+
+
+def _writer(fn):
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await run_write(fn, *args, **kwargs)
+    return wrapper
+
+
+def shutdown():
+    """Wait for queued work and stop the executors (used on app shutdown)."""
+    with _lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for ex in executors:
+        ex.shutdown(wait=True)
+
+
+# projects, files and snapshots
+create_project = _writer(db.create_project)
+get_project = _reader(db.get_project)
+list_projects = _reader(db.list_projects)
+add_project_file = _writer(db.add_project_file)
+list_project_files = _reader(db.list_project_files)
+create_snapshot = _writer(db.create_snapshot)
+list_snapshots = _reader(db.list_snapshots)
+get_snapshot = _reader(db.get_snapshot)
+restore_snapshot = _writer(db.restore_snapshot)
+
+# devices and command queue
+add_device = _writer(db.add_device)
+verify_device = _reader(db.verify_device)
+get_device = _reader(db.get_device)
+list_devices = _reader(db.list_devices)
+find_device_by_name = _reader(db.find_device_by_name)
+add_command_to_queue = _writer(db.add_command_to_queue)
+get_pending_commands_for_device = _reader(db.get_pending_commands_for_device)
+claim_pending_commands = _writer(db.claim_pending_commands)
+update_command_status = _writer(db.update_command_status)
+
+# admin sessions and revocation
+create_admin_session = _writer(db.create_admin_session)
+verify_admin_session = _reader(db.verify_admin_session)
+revoke_admin_session = _writer(db.revoke_admin_session)
+revoke_token = _writer(db.revoke_token)
+is_token_revoked = _reader(db.is_token_revoked)
+revoke_all_for_actor = _writer(db.revoke_all_for_actor)
+list_revoked_tokens = _reader(db.list_revoked_tokens)
+list_admin_sessions = _reader(db.list_admin_sessions)
+
+# chat; in "batched" durability record_command/add_to_history only queue rows
+# for group commit and run on the reader pool, so queue backpressure never
+# blocks the event loop or waits behind other writes. They return the row's
+# Future. In "sync" durability they commit on the writer thread.
+create_command = _writer(db.create_command)
+
+
+def _write_behind(fn):
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        if db.WRITE_DURABILITY == "sync":
+            return await run_write(fn, *args, **kwargs)
+        return await run_read(fn, *args, **kwargs)
+    return wrapper
+
+
+record_command = _write_behind(db.record_command)
+add_to_history = _write_behind(db.add_to_history)
+get_history = _reader(db.get_history)
+
+# organisms
+create_organism = _writer(db.create_organism)
+create_organisms = _writer(db.create_organisms)
+get_organism = _reader(db.get_organism)
+get_genome_range = _reader(db.get_genome_range)
+list_organisms = _reader(db.list_organisms)
+list_organism_summaries = _reader(db.list_organism_summaries)
+get_organism_genomes = _reader(db.get_organism_genomes)
+delete_organism = _writer(db.delete_organism)
+list_organisms_sharing_genome = _reader(db.list_organisms_sharing_genome)
+get_ancestors = _reader(db.get_ancestors)
+get_descendants = _reader(db.get_descendants)
+get_lineage_depth = _reader(db.get_lineage_depth)
+get_common_ancestor = _reader(db.get_common_ancestor)
+find_similar_organisms = _reader(db.find_similar_organisms)
+search_motif = _reader(db.search_motif)
+get_organism_traits = _reader(db.get_organism_traits)
+list_organisms_by_trait = _reader(db.list_organisms_by_trait)
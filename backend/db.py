@@ -1,23 +1,312 @@
+import atexit
+import itertools
+import json
+import logging
+import os
+import queue
 import sqlite3
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from collections.abc import Mapping
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Iterable
+
+from backend.pagination import decode_cursor
 
 DB_PATH = Path(__file__).resolve().parent.parent / "data" / "jarvis.db"
 
+# Per-connection tuning applied once when a pooled connection is opened.
+# Values can be overridden through the environment (e.g. JARVIS_DB_CACHE_SIZE).
+PRAGMAS = {
+    "journal_mode": os.environ.get("JARVIS_DB_JOURNAL_MODE", "WAL"),
+    "synchronous": os.environ.get("JARVIS_DB_SYNCHRONOUS", "NORMAL"),
+    # negative cache_size is in KiB (-20000 ~= 20MB of page cache)
+    "cache_size": os.environ.get("JARVIS_DB_CACHE_SIZE", "-20000"),
+    "mmap_size": os.environ.get("JARVIS_DB_MMAP_SIZE", str(256 * 1024 * 1024)),
+    "busy_timeout": os.environ.get("JARVIS_DB_BUSY_TIMEOUT", "5000"),
+    "temp_store": "MEMORY",
+}
+
+_local = threading.local()
+_pool_lock = threading.Lock()
+# live pooled connections by id; an entry leaves when its thread exits, its
+# key changes or close_all() runs
+_pool: Dict[int, sqlite3.Connection] = {}
+_generation = 0
+# (path, pid) pairs whose schema has been migrated by this process
+_migrated = set()
+_migrate_lock = threading.Lock()
+
 
 def _ensure_db_dir():
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
 
 
-def get_conn():
+def _open_conn() -> sqlite3.Connection:
+    """Open and tune a new connection to `DB_PATH`.
+
+    Connections are owned by a single thread (see `get_conn`) but are opened
+    with `check_same_thread=False` so `close_all` can close them at shutdown.
+    """
     _ensure_db_dir()
-    conn = sqlite3.connect(str(DB_PATH))
+    conn = sqlite3.connect(str(DB_PATH), check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    for name, value in PRAGMAS.items():
+        conn.execute(f"PRAGMA {name}={value}")
+    with _pool_lock:
+        _pool[id(conn)] = conn
     return conn
 
 
-def init_db():
+def _release_conn(conn: sqlite3.Connection):
+    with _pool_lock:
+        pooled = _pool.pop(id(conn), None) is conn
+    if pooled:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+class _ConnHolder:
+    """Thread-local owner of a pooled connection.
+
+    Lives only in its thread's `_local`, so it is collected when the thread
+    exits, and the finalizer closes the connection with it.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.release = weakref.finalize(self, _release_conn, conn)
+
+
+def get_conn() -> sqlite3.Connection:
+    """Return this thread's pooled connection, opening it on first use.
+
+    The connection is reused for the lifetime of the thread and must not be
+    closed by callers; prefer the `connection()` / `transaction()` context
+    managers. A new connection is opened if `DB_PATH` changes or the process
+    has forked since the connection was created. The first connection to a
+    database in each process applies any pending migrations.
+    """
+    key = (str(DB_PATH), os.getpid(), _generation)
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "key", None) != key:
+        old = getattr(_local, "holder", None)
+        if old is not None:
+            if _local.key[1] == key[1]:
+                old.release()
+            else:
+                # inherited across fork: the parent still owns it, so only forget it
+                old.release.detach()
+                with _pool_lock:
+                    _pool.pop(id(old.conn), None)
+        conn = _open_conn()
+        _local.holder = _ConnHolder(conn)
+        _local.conn = conn
+        _local.key = key
+        _local.depth = 0
+        if key[:2] not in _migrated:
+            with _migrate_lock:
+                if key[:2] not in _migrated:
+                    migrate(conn)
+                    _migrated.add(key[:2])
+    return conn
+
+
+@contextmanager
+def connection():
+    """Yield the pooled connection for read-only work."""
+    yield get_conn()
+
+
+@contextmanager
+def transaction():
+    """Yield the pooled connection inside a transaction.
+
+    Commits when the outermost block exits cleanly and rolls back on error.
+    Nested `transaction()` blocks join the enclosing transaction.
+    """
     conn = get_conn()
+    _local.depth += 1
+    try:
+        yield conn
+        if _local.depth == 1:
+            conn.commit()
+    except BaseException:
+        if _local.depth == 1:
+            conn.rollback()
+        raise
+    finally:
+        _local.depth -= 1
+
+
+def close_all():
+    """Close every pooled connection (used on application shutdown).
+
+    Threads that touch the database afterwards transparently reconnect.
+    """
+    global _generation
+    with _pool_lock:
+        conns = list(_pool.values())
+        _pool.clear()
+        _generation += 1
+    for conn in conns:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+# Group commit for append-only inserts (command log, chat history).
+#   "batched" (default): rows are queued and a background thread commits them
+#       in one transaction every WRITE_BATCH_MS or WRITE_BATCH_ROWS rows,
+#       whichever comes first. A crash can lose at most the rows queued in
+#       that window; flush_writes() / process exit drain the queue.
+#   "sync": every row is committed before the call returns.
+# Either way the caller gets a Future that resolves once its row is committed
+# or carries the error that stopped it. A busy/locked database is retried
+# WRITE_RETRIES times with backoff before rows are failed.
+WRITE_DURABILITY = os.environ.get("JARVIS_DB_DURABILITY", "batched")
+WRITE_BATCH_MS = int(os.environ.get("JARVIS_DB_BATCH_MS", "50"))
+WRITE_BATCH_ROWS = int(os.environ.get("JARVIS_DB_BATCH_ROWS", "500"))
+# producers block once this many rows are waiting (backpressure)
+WRITE_QUEUE_SIZE = int(os.environ.get("JARVIS_DB_QUEUE_SIZE", "10000"))
+WRITE_RETRIES = int(os.environ.get("JARVIS_DB_WRITE_RETRIES", "5"))
+
+
+def _is_busy(exc: BaseException) -> bool:
+    return isinstance(exc, sqlite3.OperationalError) and ('locked' in str(exc) or 'busy' in str(exc))
+
+
+class _GroupCommitWriter:
+    """Background thread that batches queued inserts into single transactions."""
+
+    def __init__(self, interval_ms: int, max_rows: int, maxsize: int):
+        self.interval = interval_ms / 1000.0
+        self.max_rows = max_rows
+        self.queue = queue.Queue(maxsize=maxsize)
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._start_lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="db-group-commit", daemon=True)
+                    self._thread.start()
+
+    def submit(self, sql: str, params: tuple) -> Future:
+        """Queue one statement; blocks while the queue is full."""
+        self._ensure_started()
+        future = Future()
+        self.queue.put((sql, params, future))
+        return future
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything queued so far is committed or failed."""
+        if self.queue.unfinished_tasks == 0:
+            return True
+        if self._thread is None or not self._thread.is_alive():
+            return False
+        done = Future()
+        self.queue.put((None, None, done))
+        try:
+            done.result(timeout)
+        except FutureTimeout:
+            return False
+        return True
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.interval
+            # a flush request (sql None) commits what is queued right away
+            while len(batch) < self.max_rows and batch[-1][0] is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._commit(batch)
+            for _ in batch:
+                self.queue.task_done()
+
+    def _commit(self, batch):
+        try:
+            rows = [item for item in batch if item[0] is not None]
+            if rows:
+                self._commit_rows(rows)
+        finally:
+            for sql, _, future in batch:
+                if sql is None:
+                    future.set_result(None)
+
+    def _commit_rows(self, rows):
+        try:
+            _execute_rows(rows)
+        except Exception as e:
+            if len(rows) == 1:
+                logging.error(f"group commit row failed: {e}")
+                rows[0][2].set_exception(e)
+                return
+            # one bad row must not take the rest of the batch with it
+            logging.warning(f"group commit of {len(rows)} rows failed ({e}); committing them one by one")
+            for row in rows:
+                self._commit_rows([row])
+            return
+        for _, _, future in rows:
+            future.set_result(None)
+
+
+def _execute_rows(rows):
+    """Commit `(sql, params, future)` rows in one transaction, retrying while busy."""
+    for attempt in range(WRITE_RETRIES + 1):
+        try:
+            with transaction() as conn:
+                # consecutive rows for the same statement go through one executemany
+                for sql, group in itertools.groupby(rows, key=lambda item: item[0]):
+                    conn.executemany(sql, [params for _, params, _ in group])
+            return
+        except Exception as e:
+            if not _is_busy(e) or attempt == WRITE_RETRIES:
+                raise
+            time.sleep(0.05 * 2 ** attempt)
+
+
+_group_writer = _GroupCommitWriter(WRITE_BATCH_MS, WRITE_BATCH_ROWS, WRITE_QUEUE_SIZE)
+atexit.register(lambda: _group_writer.flush(timeout=5))
+
+
+def _write_behind(sql: str, params: tuple) -> Future:
+    if WRITE_DURABILITY == "sync":
+        # committed before returning, but failures still travel in the Future
+        # as they do for queued rows
+        future = Future()
+        try:
+            _execute_rows([(sql, params, future)])
+        except Exception as e:
+            logging.error(f"write failed: {e}")
+            future.set_exception(e)
+        else:
+            future.set_result(None)
+        return future
+    return _group_writer.submit(sql, params)
+
+
+def flush_writes(timeout: Optional[float] = None) -> bool:
+    """Block until queued write-behind rows are committed (used on shutdown)."""
+    return _group_writer.flush(timeout)
+
+
+def _migration_1_initial_schema(conn: sqlite3.Connection):
     c = conn.cursor()
     c.execute(
         """
@@ -86,8 +375,315 @@ def init_db():
     )
     """
     )
+    c.execute(
+        "CREATE TABLE IF NOT EXISTS project_snapshots (id INTEGER PRIMARY KEY AUTOINCREMENT, project_id INTEGER, meta_json TEXT, snapshot_path TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    )
+    c.execute(
+        "CREATE TABLE IF NOT EXISTS project_files (id INTEGER PRIMARY KEY AUTOINCREMENT, project_id INTEGER, filename TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    )
+    c.execute(
+        "CREATE TABLE IF NOT EXISTS admin_sessions (session_token TEXT PRIMARY KEY, actor TEXT, expires_at INTEGER, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    )
+    # table for revoked tokens (support stateless revocation)
+    c.execute(
+        "CREATE TABLE IF NOT EXISTS revoked_tokens (token TEXT PRIMARY KEY, actor TEXT, reason TEXT, revoked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    )
+
+
+def _migration_2_hot_query_indexes(conn: sqlite3.Connection):
+    c = conn.cursor()
+    # device polling: pending commands for a device, oldest first
+    c.execute("CREATE INDEX IF NOT EXISTS idx_command_queue_device_status ON command_queue (device_id, status, created_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_admin_sessions_actor ON admin_sessions (actor)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_admin_sessions_expires_at ON admin_sessions (expires_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_revoked_tokens_revoked_at ON revoked_tokens (revoked_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_conversation_history_created_at ON conversation_history (created_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_organisms_created_at ON organisms (created_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_projects_created_at ON projects (created_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_devices_created_at ON devices (created_at)")
+    # covering: list_project_files reads only id (rowid) and filename
+    c.execute("CREATE INDEX IF NOT EXISTS idx_project_files_project ON project_files (project_id, created_at, filename)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_project_snapshots_project ON project_snapshots (project_id, created_at)")
+
+
+def _migration_3_keyset_indexes(conn: sqlite3.Connection):
+    c = conn.cursor()
+    # keyset pagination seeks on (created_at, rowid); every index carries rowid
+    c.execute("CREATE INDEX IF NOT EXISTS idx_admin_sessions_created_at ON admin_sessions (created_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_devices_name ON devices (name COLLATE NOCASE)")
+
+
+def _migration_4_packed_genomes(conn: sqlite3.Connection):
+    from organism_designer import genome as genome_codec
+
+    c = conn.cursor()
+    # genome keeps its TEXT declaration; packed values are stored as BLOBs
+    c.execute("ALTER TABLE organisms ADD COLUMN genome_codec INTEGER NOT NULL DEFAULT 0")
+    c.execute("ALTER TABLE organisms ADD COLUMN genome_length INTEGER")
+    last_id = 0
+    while True:
+        rows = c.execute("SELECT id, genome FROM organisms WHERE id>? ORDER BY id LIMIT 1000", (last_id,)).fetchall()
+        if not rows:
+            break
+        updates = []
+        for oid, genome in rows:
+            codec, value = genome_codec.encode(genome)
+            updates.append((value, codec, len(genome), oid))
+        c.executemany("UPDATE organisms SET genome=?, genome_codec=?, genome_length=? WHERE id=?", updates)
+        last_id = rows[-1][0]
+
+
+def _migration_5_lineage_closure(conn: sqlite3.Connection):
+    c = conn.cursor()
+    # one row per (ancestor, descendant) pair, including each organism with
+    # itself at depth 0, so lineage questions are single indexed lookups
+    c.execute(
+        "CREATE TABLE IF NOT EXISTS organism_lineage (ancestor_id INTEGER NOT NULL, descendant_id INTEGER NOT NULL, depth INTEGER NOT NULL, PRIMARY KEY (ancestor_id, descendant_id)) WITHOUT ROWID"
+    )
+    c.execute("CREATE INDEX IF NOT EXISTS idx_organism_lineage_ancestor_depth ON organism_lineage (ancestor_id, depth)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_organism_lineage_descendant_depth ON organism_lineage (descendant_id, depth)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_organisms_parent_id ON organisms (parent_id)")
+    c.execute(
+        """
+    INSERT OR IGNORE INTO organism_lineage (ancestor_id, descendant_id, depth)
+    WITH RECURSIVE walk (ancestor_id, descendant_id, depth) AS (
+        SELECT id, id, 0 FROM organisms
+        UNION ALL
+        SELECT o.parent_id, walk.descendant_id, walk.depth + 1
+        FROM walk JOIN organisms o ON o.id = walk.ancestor_id
+        WHERE o.parent_id IS NOT NULL
+    )
+    SELECT ancestor_id, descendant_id, depth FROM walk
+    """
+    )
+
+
+def _migration_6_similarity_index(conn: sqlite3.Connection):
+    from organism_designer import genome as genome_codec
+
+    c = conn.cursor()
+    c.execute("CREATE TABLE IF NOT EXISTS organism_sketches (organism_id INTEGER PRIMARY KEY, sketch BLOB NOT NULL)")
+    # LSH buckets: organisms whose sketches agree on a whole band share a row key
+    c.execute(
+        "CREATE TABLE IF NOT EXISTS organism_lsh (band INTEGER NOT NULL, bucket INTEGER NOT NULL, organism_id INTEGER NOT NULL, PRIMARY KEY (band, bucket, organism_id)) WITHOUT ROWID"
+    )
+    last_id = 0
+    while True:
+        rows = c.execute(
+            "SELECT id, genome, genome_codec, genome_length FROM organisms WHERE id>? ORDER BY id LIMIT 1000", (last_id,)
+        ).fetchall()
+        if not rows:
+            break
+        _index_sketches(c, [(oid, genome_codec.decode(codec, value, length), None) for oid, value, codec, length in rows])
+        last_id = rows[-1][0]
+
+
+def _migration_7_content_addressed_genomes(conn: sqlite3.Connection):
+    from organism_designer import genome as genome_codec
+
+    c = conn.cursor()
+    # one row per distinct genome, shared by every organism that carries it
+    c.execute(
+        "CREATE TABLE IF NOT EXISTS genomes (hash BLOB PRIMARY KEY, codec INTEGER NOT NULL, length INTEGER NOT NULL, data BLOB NOT NULL, refcount INTEGER NOT NULL)"
+    )
+    c.execute("ALTER TABLE organisms ADD COLUMN genome_hash BLOB")
+    last_id = 0
+    while True:
+        rows = c.execute(
+            "SELECT id, genome, genome_codec, genome_length FROM organisms WHERE id>? ORDER BY id LIMIT 1000", (last_id,)
+        ).fetchall()
+        if not rows:
+            break
+        stored, updates = [], []
+        for oid, value, codec, length in rows:
+            h = genome_codec.digest(genome_codec.decode(codec, value, length))
+            stored.append((h, codec, length, value, 1))
+            updates.append((h, oid))
+        c.executemany(
+            "INSERT INTO genomes (hash, codec, length, data, refcount) VALUES (?, ?, ?, ?, ?) ON CONFLICT (hash) DO UPDATE SET refcount = refcount + excluded.refcount",
+            stored,
+        )
+        c.executemany("UPDATE organisms SET genome_hash=? WHERE id=?", updates)
+        last_id = rows[-1][0]
+    c.execute("CREATE INDEX IF NOT EXISTS idx_organisms_genome_hash ON organisms (genome_hash)")
+    c.execute("ALTER TABLE organisms DROP COLUMN genome")
+    c.execute("ALTER TABLE organisms DROP COLUMN genome_codec")
+
+
+def _migration_8_genome_deltas(conn: sqlite3.Connection):
+    c = conn.cursor()
+    # delta rows (codec 3) store an edit script against base_hash; chain_depth
+    # counts the deltas between a genome and its nearest full keyframe
+    c.execute("ALTER TABLE genomes ADD COLUMN base_hash BLOB")
+    c.execute("ALTER TABLE genomes ADD COLUMN chain_depth INTEGER NOT NULL DEFAULT 0")
+
+
+def _migration_9_motif_index(conn: sqlite3.Connection):
+    c = conn.cursor()
+    # postings are built by backfill_motifs, outside the insert transaction;
+    # search_motif scans organisms above `indexed_upto` directly
+    c.execute(
+        "CREATE TABLE IF NOT EXISTS motif_index (gram INTEGER NOT NULL, organism_id INTEGER NOT NULL, positions BLOB NOT NULL, PRIMARY KEY (gram, organism_id)) WITHOUT ROWID"
+    )
+    c.execute("CREATE TABLE IF NOT EXISTS motif_index_progress (id INTEGER PRIMARY KEY CHECK (id = 1), indexed_upto INTEGER NOT NULL)")
+    c.execute("INSERT OR IGNORE INTO motif_index_progress (id, indexed_upto) VALUES (1, 0)")
+
+
+def _migration_10_organism_traits(conn: sqlite3.Connection):
+    c = conn.cursor()
+    # existing organisms are filled in by backfill_traits, not here
+    c.execute(
+        "CREATE TABLE IF NOT EXISTS organism_traits (organism_id INTEGER NOT NULL, trait TEXT NOT NULL, value REAL NOT NULL, PRIMARY KEY (organism_id, trait)) WITHOUT ROWID"
+    )
+    c.execute("CREATE INDEX IF NOT EXISTS idx_organism_traits_trait_value ON organism_traits (trait, value, organism_id)")
+
+
+def _migration_11_organism_tombstones(conn: sqlite3.Connection):
+    c = conn.cursor()
+    # deletions in the order they happened, so each process can drop deleted
+    # organisms from its row cache (see _sync_organism_deletions)
+    c.execute("CREATE TABLE IF NOT EXISTS organism_tombstones (seq INTEGER PRIMARY KEY AUTOINCREMENT, organism_id INTEGER NOT NULL)")
+
+
+# Ordered schema migrations: (version, description, step). Each step runs in
+# its own transaction and is recorded in `schema_version`; append new steps
+# with the next version number and never edit one that has shipped. Steps use
+# IF NOT EXISTS so databases created before versioning upgrade cleanly.
+MIGRATIONS = [
+    (1, "initial schema", _migration_1_initial_schema),
+    (2, "indexes for hot queries", _migration_2_hot_query_indexes),
+    (3, "indexes for keyset pagination", _migration_3_keyset_indexes),
+    (4, "packed genome storage", _migration_4_packed_genomes),
+    (5, "organism lineage closure table", _migration_5_lineage_closure),
+    (6, "minhash similarity index", _migration_6_similarity_index),
+    (7, "content-addressed genome storage", _migration_7_content_addressed_genomes),
+    (8, "parent-delta genome encoding", _migration_8_genome_deltas),
+    (9, "motif search index", _migration_9_motif_index),
+    (10, "organism traits", _migration_10_organism_traits),
+    (11, "organism deletion feed", _migration_11_organism_tombstones),
+]
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    """Return the highest migration version applied to `conn`'s database."""
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Apply pending `MIGRATIONS` to `conn` and return the resulting version.
+
+    `BEGIN IMMEDIATE` serializes concurrent migrators (e.g. several uvicorn
+    workers starting at once); the version is re-read under the lock.
+    """
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS schema_version (version INTEGER PRIMARY KEY, description TEXT, applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    )
     conn.commit()
-    conn.close()
+    for version, description, step in MIGRATIONS:
+        if version <= schema_version(conn):
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if version > schema_version(conn):
+                step(conn)
+                conn.execute("INSERT INTO schema_version (version, description) VALUES (?, ?)", (version, description))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    return schema_version(conn)
+
+
+def init_db():
+    """Bring the database schema up to date (run once at startup)."""
+    migrate(get_conn())
+
+
+# Read-through cache for hot single-row lookups (organisms, projects, devices).
+# Entries expire after ROW_CACHE_TTL seconds and the least recently used are
+# evicted beyond ROW_CACHE_SIZE; every write to a cached row invalidates it
+# once its transaction has committed. Keys include DB_PATH so switching
+# databases never serves rows from another file. Organisms are cached without
+# their genomes (those go through the genome cache), and deletions made by
+# other processes are picked up from `organism_tombstones` at most
+# ROW_CACHE_RECHECK seconds late.
+ROW_CACHE_SIZE = int(os.environ.get("JARVIS_ROW_CACHE_SIZE", "4096"))
+ROW_CACHE_TTL = float(os.environ.get("JARVIS_ROW_CACHE_TTL", "300"))
+ROW_CACHE_RECHECK = float(os.environ.get("JARVIS_ROW_CACHE_RECHECK", "1"))
+TOMBSTONES_KEPT = 10000  # deletions remembered; a process further behind drops its whole cache
+
+
+class _RowCache:
+    """Thread-safe LRU with a TTL and hit/miss/eviction counters."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        # bumped by every invalidation, so a load that raced a write is not stored
+        self._version = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def get_or_load(self, key, loader):
+        key = (str(DB_PATH), key)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            version = self._version
+        value = loader()
+        if value is not None and self.maxsize > 0:
+            with self._lock:
+                if version == self._version:
+                    self._entries[key] = (now + self.ttl, value)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+                        self.evictions += 1
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._version += 1
+            self._entries.pop((str(DB_PATH), key), None)
+
+    def clear(self):
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+
+_organism_cache = _RowCache(ROW_CACHE_SIZE, ROW_CACHE_TTL)
+_project_cache = _RowCache(ROW_CACHE_SIZE, ROW_CACHE_TTL)
+_device_cache = _RowCache(ROW_CACHE_SIZE, ROW_CACHE_TTL)
+
+
+def cache_stats() -> Dict:
+    """Counters of the row caches, by table."""
+    return {
+        'organisms': _organism_cache.stats(),
+        'projects': _project_cache.stats(),
+        'devices': _device_cache.stats(),
+    }
+
+
+def clear_caches():
+    global _genome_cache_bytes
+    for cache in (_organism_cache, _project_cache, _device_cache):
+        cache.clear()
+    with _genome_cache_lock:
+        _genome_cache.clear()
+        _genome_cache_bytes = 0
 
 
 def create_snapshot(project_id: int) -> int:
@@ -127,39 +723,26 @@ def create_snapshot(project_id: int) -> int:
     with open(meta_path, "w", encoding="utf-8") as f:
         json.dump(meta, f, default=str)
 
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute(
-        "CREATE TABLE IF NOT EXISTS project_snapshots (id INTEGER PRIMARY KEY AUTOINCREMENT, project_id INTEGER, meta_json TEXT, snapshot_path TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
-    )
-    cur.execute("INSERT INTO project_snapshots (project_id, meta_json, snapshot_path) VALUES (?, ?, ?)", (project_id, json.dumps(meta), str(snap_dir)))
-    sid = cur.lastrowid
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        cur = conn.cursor()
+        cur.execute("INSERT INTO project_snapshots (project_id, meta_json, snapshot_path) VALUES (?, ?, ?)", (project_id, json.dumps(meta), str(snap_dir)))
+        sid = cur.lastrowid
     return sid
 
 
 def list_snapshots(project_id: int):
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute(
-        "CREATE TABLE IF NOT EXISTS project_snapshots (id INTEGER PRIMARY KEY AUTOINCREMENT, project_id INTEGER, meta_json TEXT, snapshot_path TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
-    )
-    cur.execute("SELECT id, project_id, snapshot_path, created_at FROM project_snapshots WHERE project_id=? ORDER BY created_at DESC", (project_id,))
-    rows = cur.fetchall()
-    conn.close()
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT id, project_id, snapshot_path, created_at FROM project_snapshots WHERE project_id=? ORDER BY created_at DESC", (project_id,))
+        rows = cur.fetchall()
     return [dict(r) for r in rows]
 
 
 def get_snapshot(snapshot_id: int):
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute(
-        "CREATE TABLE IF NOT EXISTS project_snapshots (id INTEGER PRIMARY KEY AUTOINCREMENT, project_id INTEGER, meta_json TEXT, snapshot_path TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
-    )
-    cur.execute("SELECT id, project_id, meta_json, snapshot_path, created_at FROM project_snapshots WHERE id=?", (snapshot_id,))
-    row = cur.fetchone()
-    conn.close()
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT id, project_id, meta_json, snapshot_path, created_at FROM project_snapshots WHERE id=?", (snapshot_id,))
+        row = cur.fetchone()
     return dict(row) if row else None
 
 
@@ -179,11 +762,10 @@ def restore_snapshot(snapshot_id: int) -> bool:
     with open(Path(snap_path) / "meta.json", "r", encoding="utf-8") as f:
         meta = json.load(f)
 
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("UPDATE projects SET title=?, description=? WHERE id=?", (meta['project']['title'], meta['project'].get('description',''), project_id))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        cur = conn.cursor()
+        cur.execute("UPDATE projects SET title=?, description=? WHERE id=?", (meta['project']['title'], meta['project'].get('description',''), project_id))
+    _project_cache.invalidate(project_id)
 
     # restore files: clear current folder and copy from snapshot
     proj_files_folder = DB_PATH.parent / "projects" / str(project_id)
@@ -198,84 +780,92 @@ def restore_snapshot(snapshot_id: int) -> bool:
 
 def add_device(name: str, type: str, token: str, capabilities: list):
     import json
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute(
-        "INSERT INTO devices (name, type, token, capabilities) VALUES (?, ?, ?, ?)",
-        (name, type, token, json.dumps(capabilities)),
-    )
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "INSERT INTO devices (name, type, token, capabilities) VALUES (?, ?, ?, ?)",
+            (name, type, token, json.dumps(capabilities)),
+        )
 
 
 def verify_device(token: str) -> bool:
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT token FROM devices WHERE token=?", (token,))
-    row = cur.fetchone()
-    conn.close()
-    return bool(row)
+    return get_device(token) is not None
+
+
+def _load_device(token: str) -> Optional[Dict]:
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT id, name, type, capabilities, last_seen FROM devices WHERE token=?", (token,))
+        row = cur.fetchone()
+    return dict(row) if row else None
 
 
 def get_device(token: str) -> Optional[Dict]:
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT id, name, type, capabilities, last_seen FROM devices WHERE token=?", (token,))
-    row = cur.fetchone()
-    conn.close()
+    row = _device_cache.get_or_load(token, lambda: _load_device(token))
     return dict(row) if row else None
 
 
-def list_devices() -> List[Dict]:
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT id, name, type, capabilities, last_seen FROM devices ORDER BY created_at DESC")
-    rows = cur.fetchall()
-    conn.close()
+def list_devices(limit: int = 100, cursor: Optional[str] = None) -> List[Dict]:
+    with connection() as conn:
+        cur = conn.cursor()
+        if cursor is None:
+            cur.execute("SELECT id, name, type, capabilities, last_seen, created_at FROM devices ORDER BY created_at DESC, id DESC LIMIT ?", (limit,))
+        else:
+            cur.execute(
+                "SELECT id, name, type, capabilities, last_seen, created_at FROM devices WHERE (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT ?",
+                (*decode_cursor(cursor), limit),
+            )
+        rows = cur.fetchall()
     return [dict(r) for r in rows]
 
 
+def find_device_by_name(name: str) -> Optional[Dict]:
+    """Case-insensitive lookup of a device by its display name."""
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT id, name, type, capabilities, last_seen FROM devices WHERE name=? COLLATE NOCASE ORDER BY id LIMIT 1", (name,))
+        row = cur.fetchone()
+    return dict(row) if row else None
+
+
 def add_command_to_queue(device_id: int, command: str, payload: Optional[Dict] = None):
     import json
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute(
-        "INSERT INTO command_queue (device_id, command, payload) VALUES (?, ?, ?)",
-        (device_id, command, json.dumps(payload) if payload else None),
-    )
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "INSERT INTO command_queue (device_id, command, payload) VALUES (?, ?, ?)",
+            (device_id, command, json.dumps(payload) if payload else None),
+        )
 
 
 def get_pending_commands_for_device(device_id: int) -> List[Dict]:
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT id, command, payload, status FROM command_queue WHERE device_id=? AND status='pending' ORDER BY created_at ASC",
-        (device_id,)
-    )
-    rows = cur.fetchall()
-    conn.close()
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT id, command, payload, status FROM command_queue WHERE device_id=? AND status='pending' ORDER BY created_at ASC",
+            (device_id,)
+        )
+        rows = cur.fetchall()
     return [dict(r) for r in rows]
 
 
-def update_command_status(command_id: int, status: str):
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("UPDATE command_queue SET status=? WHERE id=?", (status, command_id))
-    conn.commit()
-    conn.close()
+def claim_pending_commands(device_id: int) -> List[Dict]:
+    """Return a device's pending commands and mark them in_progress atomically."""
+    with transaction() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT id, command, payload, status FROM command_queue WHERE device_id=? AND status='pending' ORDER BY created_at ASC",
+            (device_id,)
+        )
+        rows = [dict(r) for r in cur.fetchall()]
+        cur.executemany("UPDATE command_queue SET status=? WHERE id=?", [('in_progress', r['id']) for r in rows])
+    return rows
 
 
-def _ensure_admin_table(conn):
-    cur = conn.cursor()
-    cur.execute(
-        "CREATE TABLE IF NOT EXISTS admin_sessions (session_token TEXT PRIMARY KEY, actor TEXT, expires_at INTEGER, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
-    )
-    # table for revoked tokens (support stateless revocation)
-    cur.execute(
-        "CREATE TABLE IF NOT EXISTS revoked_tokens (token TEXT PRIMARY KEY, actor TEXT, reason TEXT, revoked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
-    )
+def update_command_status(command_id: int, status: str):
+    with transaction() as conn:
+        cur = conn.cursor()
+        cur.execute("UPDATE command_queue SET status=? WHERE id=?", (status, command_id))
 
 
 def _base64url_encode(b: bytes) -> str:
@@ -352,12 +942,9 @@ def create_admin_session(actor: str, ttl_seconds: int = 3600) -> dict:
 
     token = secrets.token_urlsafe(32)
     expires = int(time.time()) + int(ttl_seconds)
-    conn = get_conn()
-    _ensure_admin_table(conn)
-    cur = conn.cursor()
-    cur.execute("INSERT INTO admin_sessions (session_token, actor, expires_at) VALUES (?, ?, ?)", (token, actor, expires))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        cur = conn.cursor()
+        cur.execute("INSERT INTO admin_sessions (session_token, actor, expires_at) VALUES (?, ?, ?)", (token, actor, expires))
 
     # If a session signing key is configured, also emit a signed JWT for convenience
     import os
@@ -395,24 +982,20 @@ def verify_admin_session(session_token: str) -> tuple[bool, str | None]:
             # Check revocation list first
             if is_token_revoked(sid):
                 return False, None
-            conn = get_conn()
-            _ensure_admin_table(conn)
-            cur = conn.cursor()
-            cur.execute("SELECT session_token, actor, expires_at FROM admin_sessions WHERE session_token=?", (sid,))
-            row = cur.fetchone()
-            conn.close()
+            with connection() as conn:
+                cur = conn.cursor()
+                cur.execute("SELECT session_token, actor, expires_at FROM admin_sessions WHERE session_token=?", (sid,))
+                row = cur.fetchone()
             if not row:
                 return False, None
             if int(row['expires_at']) < int(time.time()):
                 return False, None
             return True, row['actor']
 
-    conn = get_conn()
-    _ensure_admin_table(conn)
-    cur = conn.cursor()
-    cur.execute("SELECT session_token, actor, expires_at FROM admin_sessions WHERE session_token=?", (session_token,))
-    row = cur.fetchone()
-    conn.close()
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT session_token, actor, expires_at FROM admin_sessions WHERE session_token=?", (session_token,))
+        row = cur.fetchone()
     if not row:
         return False, None
     if int(row['expires_at']) < int(time.time()):
@@ -421,13 +1004,10 @@ def verify_admin_session(session_token: str) -> tuple[bool, str | None]:
 
 
 def revoke_admin_session(session_token: str) -> bool:
-    conn = get_conn()
-    _ensure_admin_table(conn)
-    cur = conn.cursor()
-    cur.execute("DELETE FROM admin_sessions WHERE session_token=?", (session_token,))
-    changed = cur.rowcount
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM admin_sessions WHERE session_token=?", (session_token,))
+        changed = cur.rowcount
     return bool(changed)
 
 
@@ -436,50 +1016,48 @@ def revoke_token(token: str, actor: str | None = None, reason: str | None = None
 
     Returns True if inserted (or already present), False on error.
     """
-    conn = get_conn()
-    _ensure_admin_table(conn)
-    cur = conn.cursor()
     try:
-        cur.execute("INSERT OR REPLACE INTO revoked_tokens (token, actor, reason) VALUES (?, ?, ?)", (token, actor, reason))
-        conn.commit()
+        with transaction() as conn:
+            cur = conn.cursor()
+            cur.execute("INSERT OR REPLACE INTO revoked_tokens (token, actor, reason) VALUES (?, ?, ?)", (token, actor, reason))
         return True
     except Exception:
-        conn.rollback()
         return False
-    finally:
-        conn.close()
 
 
 def is_token_revoked(token: str) -> bool:
-    conn = get_conn()
-    _ensure_admin_table(conn)
-    cur = conn.cursor()
-    cur.execute("SELECT token FROM revoked_tokens WHERE token=?", (token,))
-    row = cur.fetchone()
-    conn.close()
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT token FROM revoked_tokens WHERE token=?", (token,))
+        row = cur.fetchone()
     return bool(row)
 
 
 def revoke_all_for_actor(actor: str) -> int:
-    conn = get_conn()
-    _ensure_admin_table(conn)
-    cur = conn.cursor()
-    cur.execute("DELETE FROM admin_sessions WHERE actor=?", (actor,))
-    removed_stateful = cur.rowcount
-    # Mark any existing sessions in DB as revoked as well for audit
-    cur.execute("INSERT INTO revoked_tokens (token, actor, reason) SELECT session_token, actor, 'revoke_all' FROM admin_sessions WHERE actor=?", (actor,))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM admin_sessions WHERE actor=?", (actor,))
+        removed_stateful = cur.rowcount
+        # Mark any existing sessions in DB as revoked as well for audit
+        cur.execute("INSERT INTO revoked_tokens (token, actor, reason) SELECT session_token, actor, 'revoke_all' FROM admin_sessions WHERE actor=?", (actor,))
     return removed_stateful
 
 
-def list_revoked_tokens(limit: int = 100, offset: int = 0):
-    conn = get_conn()
-    _ensure_admin_table(conn)
-    cur = conn.cursor()
-    cur.execute("SELECT token, actor, reason, revoked_at FROM revoked_tokens ORDER BY revoked_at DESC LIMIT ? OFFSET ?", (limit, offset))
-    rows = cur.fetchall()
-    conn.close()
+def list_revoked_tokens(limit: int = 100, offset: int = 0, cursor: Optional[str] = None):
+    """Return revoked tokens, most recent first; page with `cursor` (revoked_at, id).
+
+    `offset` is kept for older clients and ignored when a cursor is given.
+    """
+    with connection() as conn:
+        cur = conn.cursor()
+        if cursor is None:
+            cur.execute("SELECT rowid AS id, token, actor, reason, revoked_at FROM revoked_tokens ORDER BY revoked_at DESC, rowid DESC LIMIT ? OFFSET ?", (limit, offset))
+        else:
+            cur.execute(
+                "SELECT rowid AS id, token, actor, reason, revoked_at FROM revoked_tokens WHERE (revoked_at, rowid) < (?, ?) ORDER BY revoked_at DESC, rowid DESC LIMIT ?",
+                (*decode_cursor(cursor), limit),
+            )
+        rows = cur.fetchall()
     return [dict(r) for r in rows]
 
 
@@ -487,13 +1065,10 @@ def cleanup_revoked_tokens(older_than_seconds: int = 60 * 60 * 24 * 30) -> int:
     """Remove revoked token records older than `older_than_seconds` and return number removed."""
     import time
     cutoff = int(time.time()) - int(older_than_seconds)
-    conn = get_conn()
-    _ensure_admin_table(conn)
-    cur = conn.cursor()
-    cur.execute("DELETE FROM revoked_tokens WHERE revoked_at<?", (cutoff,))
-    removed = cur.rowcount
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM revoked_tokens WHERE revoked_at<?", (cutoff,))
+        removed = cur.rowcount
     return removed
 
 
@@ -501,26 +1076,34 @@ def cleanup_expired_admin_sessions() -> int:
     """Delete expired admin sessions and return the number removed."""
     import time
     now = int(time.time())
-    conn = get_conn()
-    _ensure_admin_table(conn)
-    cur = conn.cursor()
-    cur.execute("DELETE FROM admin_sessions WHERE expires_at<?", (now,))
-    removed = cur.rowcount
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM admin_sessions WHERE expires_at<?", (now,))
+        removed = cur.rowcount
     return removed
 
 
-def list_admin_sessions(limit: int = 100, offset: int = 0):
-    """Return non-expired admin sessions (most recent first)."""
+def list_admin_sessions(limit: int = 100, offset: int = 0, cursor: Optional[str] = None):
+    """Return non-expired admin sessions (most recent first).
+
+    Pass the `cursor` from the previous page (keyed on created_at, id) to
+    continue; `offset` is kept for older clients and ignored with a cursor.
+    """
     import time
     now = int(time.time())
-    conn = get_conn()
-    _ensure_admin_table(conn)
-    cur = conn.cursor()
-    cur.execute("SELECT session_token, actor, expires_at, created_at FROM admin_sessions WHERE expires_at>? ORDER BY created_at DESC LIMIT ? OFFSET ?", (now, limit, offset))
-    rows = cur.fetchall()
-    conn.close()
+    with connection() as conn:
+        cur = conn.cursor()
+        if cursor is None:
+            cur.execute(
+                "SELECT rowid AS id, session_token, actor, expires_at, created_at FROM admin_sessions WHERE expires_at>? ORDER BY created_at DESC, rowid DESC LIMIT ? OFFSET ?",
+                (now, limit, offset),
+            )
+        else:
+            cur.execute(
+                "SELECT rowid AS id, session_token, actor, expires_at, created_at FROM admin_sessions WHERE expires_at>? AND (created_at, rowid) < (?, ?) ORDER BY created_at DESC, rowid DESC LIMIT ?",
+                (now, *decode_cursor(cursor), limit),
+            )
+        rows = cur.fetchall()
     return [dict(r) for r in rows]
 
 
@@ -537,111 +1120,896 @@ def add_project_file(project_id: int, filename: str, content: bytes) -> str:
         f.write(content)
 
     # store metadata
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute(
-        "CREATE TABLE IF NOT EXISTS project_files (id INTEGER PRIMARY KEY AUTOINCREMENT, project_id INTEGER, filename TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
-    )
-    cur.execute("INSERT INTO project_files (project_id, filename) VALUES (?, ?)", (project_id, filename))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        cur = conn.cursor()
+        cur.execute("INSERT INTO project_files (project_id, filename) VALUES (?, ?)", (project_id, filename))
     return str(file_path)
 
 
-def list_project_files(project_id: int):
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute(
-        "CREATE TABLE IF NOT EXISTS project_files (id INTEGER PRIMARY KEY AUTOINCREMENT, project_id INTEGER, filename TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
-    )
-    cur.execute("SELECT id, filename FROM project_files WHERE project_id=? ORDER BY created_at DESC", (project_id,))
-    rows = cur.fetchall()
-    conn.close()
+def list_project_files(project_id: int, limit: int = 100, cursor: Optional[str] = None):
+    with connection() as conn:
+        cur = conn.cursor()
+        if cursor is None:
+            cur.execute(
+                "SELECT id, filename, created_at FROM project_files WHERE project_id=? ORDER BY created_at DESC, id DESC LIMIT ?",
+                (project_id, limit),
+            )
+        else:
+            cur.execute(
+                "SELECT id, filename, created_at FROM project_files WHERE project_id=? AND (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT ?",
+                (project_id, *decode_cursor(cursor), limit),
+            )
+        rows = cur.fetchall()
     return [dict(r) for r in rows]
 
 
 def create_project(title: str, description: str = "") -> int:
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("INSERT INTO projects (title, description) VALUES (?, ?)", (title, description))
-    pid = cur.lastrowid
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        cur = conn.cursor()
+        cur.execute("INSERT INTO projects (title, description) VALUES (?, ?)", (title, description))
+        pid = cur.lastrowid
     return pid
 
 
-def list_projects() -> List[Dict]:
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT id, title, description FROM projects ORDER BY created_at DESC")
-    rows = cur.fetchall()
-    conn.close()
+def list_projects(limit: int = 100, cursor: Optional[str] = None) -> List[Dict]:
+    with connection() as conn:
+        cur = conn.cursor()
+        if cursor is None:
+            cur.execute("SELECT id, title, description, created_at FROM projects ORDER BY created_at DESC, id DESC LIMIT ?", (limit,))
+        else:
+            cur.execute(
+                "SELECT id, title, description, created_at FROM projects WHERE (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT ?",
+                (*decode_cursor(cursor), limit),
+            )
+        rows = cur.fetchall()
     return [dict(r) for r in rows]
 
 
+def _load_project(project_id: int) -> Optional[Dict]:
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT id, title, description FROM projects WHERE id=?", (project_id,))
+        row = cur.fetchone()
+    return dict(row) if row else None
+
+
 def get_project(project_id: int) -> Optional[Dict]:
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT id, title, description FROM projects WHERE id=?", (project_id,))
-    row = cur.fetchone()
-    conn.close()
+    row = _project_cache.get_or_load(project_id, lambda: _load_project(project_id))
     return dict(row) if row else None
 
 
 def create_command(command_text: str) -> int:
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("INSERT INTO commands (command_text) VALUES (?)", (command_text,))
-    cid = cur.lastrowid
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        cur = conn.cursor()
+        cur.execute("INSERT INTO commands (command_text) VALUES (?)", (command_text,))
+        cid = cur.lastrowid
     return cid
 
 
-def add_to_history(user_message: str, jarvis_response: str):
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("INSERT INTO conversation_history (user_message, jarvis_response) VALUES (?, ?)", (user_message, jarvis_response))
-    conn.commit()
-    conn.close()
-
+def record_command(command_text: str) -> Future:
+    """Log a command without waiting for the commit (see `WRITE_DURABILITY`).
 
-def get_history(limit: int = 10) -> List[Dict]:
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT user_message, jarvis_response FROM conversation_history ORDER BY created_at DESC LIMIT ?", (limit,))
-    rows = cur.fetchall()
-    conn.close()
+    The returned Future resolves once the row is committed, or raises the
+    error that stopped it.
+    """
+    return _write_behind("INSERT INTO commands (command_text) VALUES (?)", (command_text,))
+
+
+def add_to_history(user_message: str, jarvis_response: str) -> Future:
+    return _write_behind("INSERT INTO conversation_history (user_message, jarvis_response) VALUES (?, ?)", (user_message, jarvis_response))
+
+
+def get_history(limit: int = 10, cursor: Optional[str] = None) -> List[Dict]:
+    # read-your-writes: make queued chat turns visible first
+    flush_writes()
+    with connection() as conn:
+        cur = conn.cursor()
+        if cursor is None:
+            cur.execute("SELECT id, user_message, jarvis_response, created_at FROM conversation_history ORDER BY created_at DESC, id DESC LIMIT ?", (limit,))
+        else:
+            cur.execute(
+                "SELECT id, user_message, jarvis_response, created_at FROM conversation_history WHERE (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT ?",
+                (*decode_cursor(cursor), limit),
+            )
+        rows = cur.fetchall()
     return [dict(r) for r in rows]
 
+
+# Parent-delta genome storage. When enabled, a new genome whose organism has a
+# parent is stored as an edit script against the parent's genome if that is
+# much smaller than a full copy. Every GENOME_DELTA_MAX_DEPTH generations a
+# full keyframe is stored instead, which bounds reconstruction to that many
+# patches; rebuilt genomes are kept in an LRU keyed by (immutable) hash.
+GENOME_DELTA = os.environ.get("JARVIS_GENOME_DELTA", "0") == "1"
+GENOME_DELTA_MAX_DEPTH = int(os.environ.get("JARVIS_GENOME_DELTA_MAX_DEPTH", "16"))
+GENOME_CACHE_SIZE = int(os.environ.get("JARVIS_GENOME_CACHE_SIZE", "1024"))
+GENOME_CACHE_BYTES = int(os.environ.get("JARVIS_GENOME_CACHE_BYTES", str(64 * 1024 * 1024)))
+
+_genome_cache: "OrderedDict[bytes, str]" = OrderedDict()
+_genome_cache_lock = threading.Lock()
+_genome_cache_bytes = 0  # total length of the cached genomes
+
+
+def _cache_genome(genome_hash: bytes, genome: str):
+    global _genome_cache_bytes
+    if len(genome) > GENOME_CACHE_BYTES:
+        return
+    with _genome_cache_lock:
+        old = _genome_cache.pop(genome_hash, None)
+        if old is not None:
+            _genome_cache_bytes -= len(old)
+        _genome_cache[genome_hash] = genome
+        _genome_cache_bytes += len(genome)
+        while _genome_cache and (len(_genome_cache) > GENOME_CACHE_SIZE or _genome_cache_bytes > GENOME_CACHE_BYTES):
+            _, evicted = _genome_cache.popitem(last=False)
+            _genome_cache_bytes -= len(evicted)
+
+
+def _load_genome(cur: sqlite3.Cursor, genome_hash: bytes) -> Optional[str]:
+    from organism_designer import genome as genome_codec
+
+    with _genome_cache_lock:
+        genome = _genome_cache.get(genome_hash)
+        if genome is not None:
+            _genome_cache.move_to_end(genome_hash)
+            return genome
+    cur.execute("SELECT codec, length, data, base_hash FROM genomes WHERE hash=?", (genome_hash,))
+    row = cur.fetchone()
+    if row is None:
+        return None
+    codec, length, data, base_hash = row
+    if codec == genome_codec.CODEC_DELTA:
+        genome = genome_codec.patch(_load_genome(cur, base_hash), data)
+    else:
+        genome = genome_codec.decode(codec, data, length)
+    _cache_genome(genome_hash, genome)
+    return genome
+
+
+def get_genome(genome_hash: bytes) -> Optional[str]:
+    """Return the genome stored under `genome_hash`, rebuilding deltas."""
+    with connection() as conn:
+        return _load_genome(conn.cursor(), genome_hash)
+
+
+class OrganismRow(Mapping):
+    """Read-only organism record that decodes its packed genome on first access.
+
+    Behaves like the plain dicts returned elsewhere in this module (and
+    exposes keys as attributes for pydantic's `from_attributes`), but listing
+    organisms no longer pays to unpack genomes nobody reads. A row built
+    without genome data (codec None) loads the genome by hash.
+    """
+
+    __slots__ = ('_data', '_packed')
+
+    def __init__(self, row):
+        data = dict(row)
+        self._packed = (data.pop('genome_codec'), data.pop('genome'), data.get('genome_hash'))
+        if isinstance(data.get('genome_hash'), bytes):
+            data['genome_hash'] = data['genome_hash'].hex()
+        self._data = data
+
+    def __getitem__(self, key):
+        if key == 'genome' and 'genome' not in self._data:
+            from organism_designer import genome as genome_codec
+
+            codec, value, genome_hash = self._packed
+            if codec is None or codec == genome_codec.CODEC_DELTA:
+                self._data['genome'] = get_genome(genome_hash)
+            else:
+                self._data['genome'] = genome_codec.decode(codec, value, self._data['genome_length'])
+        return self._data[key]
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __iter__(self):
+        yield from self._data
+        if 'genome' not in self._data:
+            yield 'genome'
+
+    def __len__(self):
+        return len(self._data) + ('genome' not in self._data)
+
+    def __repr__(self):
+        return f"OrganismRow({dict(self)!r})"
+
+
 def create_organism(name: str, genome: str, parent_id: Optional[int] = None) -> int:
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute(
-        "INSERT INTO organisms (name, genome, parent_id) VALUES (?, ?, ?)",
-        (name, genome, parent_id),
+    with transaction() as conn:
+        return _insert_organisms(conn.cursor(), [{'name': name, 'genome': genome, 'parent_id': parent_id}])[0]
+
+
+def create_organisms(records: Iterable[Dict], refs: Optional[Dict[str, int]] = None) -> List[int]:
+    """Insert a batch of organisms in one transaction and return their ids.
+
+    Each record has `name`, `genome` and optionally `parent_id`. A record may
+    also carry an upload-local `ref`, and name an earlier record's ref as its
+    `parent`; `refs` maps refs to ids and is updated in place so it can be
+    shared by all the batches of one bulk import. A precomputed similarity
+    `sketch` is used as is.
+    """
+    with transaction() as conn:
+        return _insert_organisms(conn.cursor(), records, {} if refs is None else refs)
+
+
+_UPSERT_GENOME = "INSERT INTO genomes (hash, codec, length, data, refcount, base_hash, chain_depth) VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (hash) DO UPDATE SET refcount = refcount + excluded.refcount"
+
+
+def _insert_organisms(cur: sqlite3.Cursor, records: Iterable[Dict], refs: Optional[Dict[str, int]] = None) -> List[int]:
+    from organism_designer import genome as genome_codec
+
+    ids, links, rows, genomes = [], [], [], []
+    stored: Dict[bytes, list] = {}
+    texts: Dict[bytes, str] = {}  # genomes of this batch, by hash
+    batch_hashes: Dict[int, bytes] = {}
+    oid = None
+    for rec in records:
+        parent_id = refs[rec['parent']] if rec.get('parent') is not None else rec.get('parent_id')
+        genome = rec['genome']
+        h = genome_codec.digest(genome)
+        if h in stored:
+            stored[h][4] += 1
+        else:
+            # a genome that is already stored keeps its row (only its refcount
+            # changes), so in-batch children must chain from its real depth
+            cur.execute("SELECT chain_depth FROM genomes WHERE hash=?", (h,))
+            existing = cur.fetchone()
+            codec, value = genome_codec.encode(genome)
+            stored[h] = [h, codec, len(genome), value, 1, None, existing[0] if existing else 0]
+            texts[h] = genome
+            if GENOME_DELTA and parent_id is not None and existing is None:
+                _delta_against_parent(cur, stored, texts, h, batch_hashes.get(parent_id), parent_id)
+        row = (rec['name'], h, len(genome), parent_id)
+        if oid is None:
+            # the first insert takes the write lock and allocates an id above
+            # every id ever used (AUTOINCREMENT), so the rest of the batch can
+            # be numbered up front and inserted with one executemany
+            cur.execute("INSERT INTO organisms (name, genome_hash, genome_length, parent_id) VALUES (?, ?, ?, ?)", row)
+            oid = cur.lastrowid
+        else:
+            oid += 1
+            rows.append((oid,) + row)
+        ids.append(oid)
+        links.append((oid, parent_id))
+        genomes.append((oid, genome, rec.get('sketch')))
+        batch_hashes[oid] = h
+        if rec.get('ref') is not None:
+            refs[rec['ref']] = oid
+    cur.executemany("INSERT INTO organisms (id, name, genome_hash, genome_length, parent_id) VALUES (?, ?, ?, ?, ?)", rows)
+    cur.executemany(_UPSERT_GENOME, stored.values())
+    # a delta keeps its base alive: count it as one more reference
+    cur.executemany(
+        "UPDATE genomes SET refcount = refcount + 1 WHERE hash=?",
+        [(entry[5],) for entry in stored.values() if entry[5] is not None],
+    )
+    _record_lineage(cur, links)
+    _index_sketches(cur, genomes)
+    _store_traits(cur, [(oid, genome) for oid, genome, _ in genomes])
+    return ids
+
+
+def _delta_against_parent(cur: sqlite3.Cursor, stored: Dict[bytes, list], texts: Dict[bytes, str], h: bytes, parent_hash: Optional[bytes], parent_id: int):
+    """Turn the pending `stored[h]` entry into a delta if that pays off."""
+    from organism_designer import genome as genome_codec
+
+    if parent_hash is None:
+        cur.execute("SELECT genome_hash FROM organisms WHERE id=?", (parent_id,))
+        row = cur.fetchone()
+        if row is None:
+            return
+        parent_hash = row[0]
+    if parent_hash in stored:
+        depth = stored[parent_hash][6]
+    else:
+        cur.execute("SELECT chain_depth FROM genomes WHERE hash=?", (parent_hash,))
+        row = cur.fetchone()
+        if row is None:
+            return
+        depth = row[0]
+    if depth >= GENOME_DELTA_MAX_DEPTH:
+        return  # store a full keyframe
+    base = texts.get(parent_hash)
+    if base is None:
+        base = _load_genome(cur, parent_hash)
+    entry = stored[h]
+    script = genome_codec.diff(base, texts[h])
+    if len(script) * 2 < len(entry[3]):
+        entry[1], entry[3], entry[5], entry[6] = genome_codec.CODEC_DELTA, script, parent_hash, depth + 1
+        _cache_genome(h, texts[h])
+
+
+def _record_lineage(cur: sqlite3.Cursor, links: List[tuple]):
+    """Add closure rows for new `(organism_id, parent_id)` links, parents first."""
+    cur.executemany(
+        "INSERT INTO organism_lineage (ancestor_id, descendant_id, depth) VALUES (?, ?, 0)",
+        [(oid, oid) for oid, _ in links],
+    )
+    cur.executemany(
+        "INSERT INTO organism_lineage (ancestor_id, descendant_id, depth) SELECT ancestor_id, ?, depth + 1 FROM organism_lineage WHERE descendant_id=?",
+        [(oid, parent_id) for oid, parent_id in links if parent_id is not None],
     )
-    oid = cur.lastrowid
-    conn.commit()
-    conn.close()
-    return oid
 
 
-def get_organism(organism_id: int) -> Optional[Dict]:
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT id, name, genome, parent_id, created_at FROM organisms WHERE id=?", (organism_id,))
-    row = cur.fetchone()
-    conn.close()
+def get_organism_genomes(organism_ids: Optional[List[int]] = None, limit: int = 1000, max_bases: Optional[int] = None) -> List[tuple]:
+    """Return decoded `(id, genome)` pairs for a batch of organisms.
+
+    With `organism_ids` the pairs follow that order (unknown ids are
+    skipped); otherwise they are the newest `limit` organisms. Raises
+    ValueError, before decoding anything, if the genomes total more than
+    `max_bases` bases.
+    """
+    from organism_designer import genome as genome_codec
+
+    with connection() as conn:
+        cur = conn.cursor()
+        if organism_ids is None:
+            cur.execute(
+                "SELECT o.genome_length FROM organisms o ORDER BY o.created_at DESC, o.id DESC LIMIT ?",
+                (limit,),
+            )
+        else:
+            cur.execute(
+                "SELECT o.genome_length FROM organisms o WHERE o.id IN (SELECT value FROM json_each(?))",
+                (json.dumps(organism_ids),),
+            )
+        total = sum(length for (length,) in cur.fetchall())
+        if max_bases is not None and total > max_bases:
+            raise ValueError(f"population has {total} bases, more than {max_bases}")
+        if organism_ids is None:
+            cur.execute(
+                "SELECT o.id, o.genome_length, o.genome_hash, g.codec, g.data FROM organisms o JOIN genomes g ON g.hash = o.genome_hash ORDER BY o.created_at DESC, o.id DESC LIMIT ?",
+                (limit,),
+            )
+        else:
+            cur.execute(
+                "SELECT o.id, o.genome_length, o.genome_hash, g.codec, g.data FROM organisms o JOIN genomes g ON g.hash = o.genome_hash WHERE o.id IN (SELECT value FROM json_each(?))",
+                (json.dumps(organism_ids),),
+            )
+        genomes = {}
+        for oid, length, genome_hash, codec, data in cur.fetchall():
+            if codec == genome_codec.CODEC_DELTA:
+                genomes[oid] = _load_genome(cur, genome_hash)
+            else:
+                genomes[oid] = genome_codec.decode(codec, data, length)
+    order = organism_ids if organism_ids is not None else genomes
+    return [(oid, genomes[oid]) for oid in order if oid in genomes]
+
+
+def delete_organism(organism_id: int) -> bool:
+    """Delete a leaf organism; False if it does not exist.
+
+    Raises ValueError if other organisms descend from it. Its genome is
+    released, and dropped once no organism references it any more.
+    """
+    from organism_designer import similarity
+
+    with transaction() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT genome_hash FROM organisms WHERE id=?", (organism_id,))
+        row = cur.fetchone()
+        if row is None:
+            return False
+        cur.execute("SELECT 1 FROM organisms WHERE parent_id=? LIMIT 1", (organism_id,))
+        if cur.fetchone() is not None:
+            raise ValueError("organism has descendants")
+        genome_hash = row[0]
+        cur.execute("SELECT sketch FROM organism_sketches WHERE organism_id=?", (organism_id,))
+        sketch = cur.fetchone()
+        if sketch is not None:
+            keys = similarity.band_keys(similarity.unpack(sketch[0]))
+            cur.executemany(
+                "DELETE FROM organism_lsh WHERE band=? AND bucket=? AND organism_id=?",
+                [(band, key, organism_id) for band, key in enumerate(keys)],
+            )
+        cur.execute("DELETE FROM organism_sketches WHERE organism_id=?", (organism_id,))
+        _unindex_motifs(cur, organism_id, genome_hash)
+        cur.execute("DELETE FROM organism_traits WHERE organism_id=?", (organism_id,))
+        cur.execute("DELETE FROM organism_lineage WHERE descendant_id=?", (organism_id,))
+        cur.execute("DELETE FROM organisms WHERE id=?", (organism_id,))
+        _release_genome(cur, genome_hash)
+        cur.execute("INSERT INTO organism_tombstones (organism_id) VALUES (?)", (organism_id,))
+        cur.execute("DELETE FROM organism_tombstones WHERE seq <= ?", (cur.lastrowid - TOMBSTONES_KEPT,))
+    _organism_cache.invalidate(organism_id)
+    return True
+
+
+def _release_genome(cur: sqlite3.Cursor, genome_hash: bytes):
+    # dropping a delta releases the reference it held on its base
+    while genome_hash is not None:
+        cur.execute("UPDATE genomes SET refcount = refcount - 1 WHERE hash=?", (genome_hash,))
+        cur.execute("SELECT refcount, base_hash FROM genomes WHERE hash=?", (genome_hash,))
+        row = cur.fetchone()
+        if row is None or row[0] > 0:
+            return
+        cur.execute("DELETE FROM genomes WHERE hash=?", (genome_hash,))
+        genome_hash = row[1]
+
+
+def list_organisms_sharing_genome(organism_id: int, limit: int = 100, cursor: Optional[str] = None) -> Optional[List[Dict]]:
+    """Return every organism (itself included) with the same genome, by id.
+
+    None means the organism does not exist. Paged by an id `cursor`.
+    """
+    (id_after,) = decode_cursor(cursor, size=1) if cursor else (0,)
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT genome_hash FROM organisms WHERE id=?", (organism_id,))
+        row = cur.fetchone()
+        if row is None:
+            return None
+        cur.execute(
+            "SELECT id, name, parent_id, created_at FROM organisms WHERE genome_hash=? AND id > ? ORDER BY id LIMIT ?",
+            (row[0], id_after, limit),
+        )
+        rows = cur.fetchall()
+    return [dict(r) for r in rows]
+
+
+def _index_sketches(cur: sqlite3.Cursor, genomes: List[tuple]):
+    """Store MinHash sketches and LSH buckets for `(organism_id, genome, sketch)`.
+
+    `sketch` may be None, or precomputed by the caller (e.g. in a worker process).
+    """
+    from organism_designer import similarity
+
+    sketches, buckets = [], []
+    for oid, genome, sig in genomes:
+        if sig is None:
+            sig = similarity.sketch(genome)
+        sketches.append((oid, similarity.pack(sig)))
+        buckets.extend((band, key, oid) for band, key in enumerate(similarity.band_keys(sig)))
+    cur.executemany("INSERT OR REPLACE INTO organism_sketches (organism_id, sketch) VALUES (?, ?)", sketches)
+    cur.executemany("INSERT OR IGNORE INTO organism_lsh (band, bucket, organism_id) VALUES (?, ?, ?)", buckets)
+
+
+def _index_motifs(cur: sqlite3.Cursor, genomes: List[tuple]):
+    """Store sampled q-gram postings for `(organism_id, genome)`; only A/C/G/T genomes are indexed."""
+    from organism_designer import genome as genome_codec
+    from organism_designer import motifs
+
+    cur.executemany(
+        "INSERT INTO motif_index (gram, organism_id, positions) VALUES (?, ?, ?)",
+        ((gram, oid, positions) for oid, genome in genomes if genome_codec.is_nucleotide(genome) for gram, positions in motifs.grams(genome)),
+    )
+
+
+def _unindex_motifs(cur: sqlite3.Cursor, organism_id: int, genome_hash: bytes):
+    # postings are keyed by gram, so recompute the organism's grams rather
+    # than keep a second (organism_id, gram) index as large as the first
+    from organism_designer import genome as genome_codec
+    from organism_designer import motifs
+
+    if organism_id > _motifs_indexed_upto(cur):
+        return
+    genome = _load_genome(cur, genome_hash)
+    if genome_codec.is_nucleotide(genome):
+        cur.executemany(
+            "DELETE FROM motif_index WHERE gram=? AND organism_id=?",
+            [(gram, organism_id) for gram, _ in motifs.grams(genome)],
+        )
+
+
+def _motifs_indexed_upto(cur: sqlite3.Cursor) -> int:
+    cur.execute("SELECT indexed_upto FROM motif_index_progress WHERE id=1")
+    return cur.fetchone()[0]
+
+
+def backfill_motifs(batch_size: int = 200) -> int:
+    """Build motif search postings for organisms not indexed yet; returns how many.
+
+    Organisms are indexed in id order, one transaction per batch, and the
+    highest indexed id is recorded so the next run carries on from there.
+    """
+    done = 0
+    while True:
+        with transaction() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT id, genome_hash FROM organisms WHERE id > ? ORDER BY id LIMIT ?", (_motifs_indexed_upto(cur), batch_size))
+            rows = cur.fetchall()
+            if not rows:
+                return done
+            _index_motifs(cur, [(oid, _load_genome(cur, h)) for oid, h in rows])
+            cur.execute("UPDATE motif_index_progress SET indexed_upto=? WHERE id=1", (rows[-1][0],))
+        done += len(rows)
+
+
+def _store_traits(cur: sqlite3.Cursor, genomes: List[tuple]):
+    """Store the extracted traits of `(organism_id, genome)` pairs."""
+    from organism_designer import traits
+
+    cur.executemany(
+        "INSERT OR REPLACE INTO organism_traits (organism_id, trait, value) VALUES (?, ?, ?)",
+        ((oid, name, value) for oid, genome in genomes for name, value in traits.extract(genome).items()),
+    )
+
+
+def backfill_traits(batch_size: int = 500) -> int:
+    """Extract traits for organisms that have none yet; returns how many.
+
+    Runs in batches of one transaction each, so it can work through a large
+    table in the background while the application keeps writing.
+    """
+    done = 0
+    last_id = 0
+    while True:
+        with transaction() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT o.id, o.genome_hash FROM organisms o WHERE o.id > ? AND NOT EXISTS (SELECT 1 FROM organism_traits t WHERE t.organism_id = o.id) ORDER BY o.id LIMIT ?",
+                (last_id, batch_size),
+            )
+            rows = cur.fetchall()
+            if not rows:
+                return done
+            _store_traits(cur, [(oid, _load_genome(cur, h)) for oid, h in rows])
+        done += len(rows)
+        last_id = rows[-1][0]
+
+
+def get_organism_traits(organism_id: int) -> Optional[Dict[str, float]]:
+    """Return an organism's traits by name, or None if it does not exist."""
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT 1 FROM organisms WHERE id=?", (organism_id,))
+        if cur.fetchone() is None:
+            return None
+        cur.execute("SELECT trait, value FROM organism_traits WHERE organism_id=?", (organism_id,))
+        return {trait: value for trait, value in cur.fetchall()}
+
+
+def list_organisms_by_trait(trait: str, min_value: Optional[float] = None, max_value: Optional[float] = None, descending: bool = False, limit: int = 100, cursor: Optional[str] = None) -> List[Dict]:
+    """Return organisms whose `trait` lies in [min_value, max_value], sorted by it.
+
+    Ties are broken by id; paged by a `(value, id)` cursor. Organisms the
+    trait does not apply to are left out.
+    """
+    lo = float('-inf') if min_value is None else min_value
+    hi = float('inf') if max_value is None else max_value
+    with connection() as conn:
+        cur = conn.cursor()
+        if cursor is None:
+            sql = (
+                "SELECT o.id, o.name, o.parent_id, t.value FROM organism_traits t JOIN organisms o ON o.id = t.organism_id WHERE t.trait=? AND t.value BETWEEN ? AND ? ORDER BY t.value DESC, t.organism_id DESC LIMIT ?"
+                if descending else
+                "SELECT o.id, o.name, o.parent_id, t.value FROM organism_traits t JOIN organisms o ON o.id = t.organism_id WHERE t.trait=? AND t.value BETWEEN ? AND ? ORDER BY t.value, t.organism_id LIMIT ?"
+            )
+            cur.execute(sql, (trait, lo, hi, limit))
+        else:
+            sql = (
+                "SELECT o.id, o.name, o.parent_id, t.value FROM organism_traits t JOIN organisms o ON o.id = t.organism_id WHERE t.trait=? AND (t.value, t.organism_id) < (?, ?) AND t.value >= ? ORDER BY t.value DESC, t.organism_id DESC LIMIT ?"
+                if descending else
+                "SELECT o.id, o.name, o.parent_id, t.value FROM organism_traits t JOIN organisms o ON o.id = t.organism_id WHERE t.trait=? AND (t.value, t.organism_id) > (?, ?) AND t.value <= ? ORDER BY t.value, t.organism_id LIMIT ?"
+            )
+            # the seek starts at the cursor; only the far bound is left to check
+            cur.execute(sql, (trait, *decode_cursor(cursor), lo if descending else hi, limit))
+        rows = cur.fetchall()
+    return [dict(r) for r in rows]
+
+
+def _load_organism(organism_id: int) -> Optional[Dict]:
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT o.id, o.name, o.genome_length, o.genome_hash, o.parent_id, o.created_at FROM organisms o WHERE o.id=?", (organism_id,))
+        row = cur.fetchone()
     return dict(row) if row else None
 
 
-def list_organisms(limit: int = 50) -> List[Dict]:
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT id, name, genome, parent_id, created_at FROM organisms ORDER BY created_at DESC LIMIT ?", (limit,))
-    rows = cur.fetchall()
-    conn.close()
+_tombstones_lock = threading.Lock()
+_tombstones_seen = {'path': None, 'seq': 0, 'checked': 0.0}
+
+
+def _sync_organism_deletions():
+    """Drop organisms deleted by any process from the row cache.
+
+    Reads the deletion feed at most every ROW_CACHE_RECHECK seconds; a process
+    that fell more than TOMBSTONES_KEPT deletions behind clears the cache.
+    """
+    now = time.monotonic()
+    with _tombstones_lock:
+        seen = _tombstones_seen
+        if seen['path'] == str(DB_PATH) and now - seen['checked'] < ROW_CACHE_RECHECK:
+            return
+        with connection() as conn:
+            cur = conn.cursor()
+            if seen['path'] != str(DB_PATH):
+                # entries cached before the first check may predate any deletion
+                _organism_cache.clear()
+                cur.execute("SELECT MAX(seq) FROM organism_tombstones")
+                seen.update(path=str(DB_PATH), seq=cur.fetchone()[0] or 0, checked=now)
+                return
+            cur.execute("SELECT seq, organism_id FROM organism_tombstones WHERE seq > ? ORDER BY seq", (seen['seq'],))
+            rows = cur.fetchall()
+        if rows and rows[0][0] != seen['seq'] + 1:
+            _organism_cache.clear()
+        else:
+            for _, organism_id in rows:
+                _organism_cache.invalidate(organism_id)
+        if rows:
+            seen['seq'] = rows[-1][0]
+        seen['checked'] = now
+
+
+def get_organism(organism_id: int) -> Optional[Dict]:
+    """Return one organism, served from the row cache when possible.
+
+    Every call gets its own row; the cache only holds the genome-free fields.
+    """
+    _sync_organism_deletions()
+    row = _organism_cache.get_or_load(organism_id, lambda: _load_organism(organism_id))
+    return OrganismRow(dict(row, genome=None, genome_codec=None)) if row else None
+
+
+def get_genome_range(organism_id: int, start: int = 0, end: Optional[int] = None) -> Optional[Dict]:
+    """Return bases `start:end` of an organism's genome, or None if it does not exist.
+
+    Bounds follow Python slice rules (negative values count from the end) and
+    are reported clamped, with the full `length`. 2-bit packed genomes are
+    read through incremental blob I/O and plain text with `substr`, so only
+    the requested window is loaded; zlib and delta genomes are rebuilt whole
+    (and cached).
+    """
+    from organism_designer import genome as genome_codec
+
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT o.genome_length, o.genome_hash, g.rowid, g.codec FROM organisms o JOIN genomes g ON g.hash = o.genome_hash WHERE o.id=?",
+            (organism_id,),
+        )
+        row = cur.fetchone()
+        if row is None:
+            return None
+        length, genome_hash, rowid, codec = row
+        start, end, _ = slice(start, end).indices(length)
+        end = max(start, end)
+        if start == end:
+            sequence = ''
+        elif codec == genome_codec.CODEC_2BIT:
+            first, last = start // 4, (end + 3) // 4
+            if hasattr(conn, 'blobopen'):
+                with conn.blobopen('genomes', 'data', rowid, readonly=True) as blob:
+                    blob.seek(first)
+                    data = blob.read(last - first)
+            else:
+                cur.execute("SELECT substr(data, ?, ?) FROM genomes WHERE rowid=?", (first + 1, last - first, rowid))
+                data = cur.fetchone()[0]
+            sequence = genome_codec.unpack_2bit_range(data, start, end)
+        elif codec == genome_codec.CODEC_TEXT:
+            cur.execute("SELECT substr(data, ?, ?) FROM genomes WHERE rowid=?", (start + 1, end - start, rowid))
+            sequence = cur.fetchone()[0]
+        else:
+            sequence = _load_genome(cur, genome_hash)[start:end]
+    return {'id': organism_id, 'start': start, 'end': end, 'length': length, 'sequence': sequence}
+
+
+def list_organisms(limit: int = 50, cursor: Optional[str] = None) -> List[Dict]:
+    """Return organisms newest first; genomes are decoded lazily per row."""
+    with connection() as conn:
+        cur = conn.cursor()
+        if cursor is None:
+            cur.execute(
+                "SELECT o.id, o.name, g.data AS genome, g.codec AS genome_codec, o.genome_length, o.genome_hash, o.parent_id, o.created_at FROM organisms o JOIN genomes g ON g.hash = o.genome_hash ORDER BY o.created_at DESC, o.id DESC LIMIT ?",
+                (limit,),
+            )
+        else:
+            cur.execute(
+                "SELECT o.id, o.name, g.data AS genome, g.codec AS genome_codec, o.genome_length, o.genome_hash, o.parent_id, o.created_at FROM organisms o JOIN genomes g ON g.hash = o.genome_hash WHERE (o.created_at, o.id) < (?, ?) ORDER BY o.created_at DESC, o.id DESC LIMIT ?",
+                (*decode_cursor(cursor), limit),
+            )
+        rows = cur.fetchall()
+    return [OrganismRow(r) for r in rows]
+
+
+def list_organism_summaries(limit: int = 50, cursor: Optional[str] = None) -> List[Dict]:
+    """Return organisms newest first without their genomes.
+
+    Rows carry `genome_length` and the hex `genome_hash` instead, and are read
+    from `organisms` alone, so no genome is fetched or decoded.
+    """
+    with connection() as conn:
+        cur = conn.cursor()
+        if cursor is None:
+            cur.execute(
+                "SELECT id, name, genome_length, genome_hash, parent_id, created_at FROM organisms ORDER BY created_at DESC, id DESC LIMIT ?",
+                (limit,),
+            )
+        else:
+            cur.execute(
+                "SELECT id, name, genome_length, genome_hash, parent_id, created_at FROM organisms WHERE (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT ?",
+                (*decode_cursor(cursor), limit),
+            )
+        rows = cur.fetchall()
+    summaries = []
+    for r in rows:
+        item = dict(r)
+        if item['genome_hash'] is not None:
+            item['genome_hash'] = item['genome_hash'].hex()
+        summaries.append(item)
+    return summaries
+
+
+def get_ancestors(organism_id: int) -> Optional[List[Dict]]:
+    """Return the organism's ancestors nearest first, or None if it does not exist."""
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT o.id, o.name, o.parent_id, o.created_at, l.depth FROM organism_lineage l JOIN organisms o ON o.id = l.ancestor_id WHERE l.descendant_id=? ORDER BY l.depth",
+            (organism_id,),
+        )
+        rows = cur.fetchall()
+    if not rows:
+        return None
+    # depth 0 is the organism itself
+    return [dict(r) for r in rows[1:]]
+
+
+def get_descendants(organism_id: int, max_depth: Optional[int] = None, limit: int = 100, cursor: Optional[str] = None) -> Optional[List[Dict]]:
+    """Return descendants breadth first (by depth, then id), paged by `cursor`.
+
+    None if the organism does not exist.
+    """
+    depth_after, id_after = decode_cursor(cursor) if cursor else (0, sys.maxsize)  # skip the depth-0 self row
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT 1 FROM organisms WHERE id=?", (organism_id,))
+        if cur.fetchone() is None:
+            return None
+        cur.execute(
+            "SELECT o.id, o.name, o.parent_id, o.created_at, l.depth FROM organism_lineage l JOIN organisms o ON o.id = l.descendant_id WHERE l.ancestor_id=? AND (l.depth, l.descendant_id) > (?, ?) AND l.depth <= ? ORDER BY l.depth, l.descendant_id LIMIT ?",
+            (organism_id, depth_after, id_after, max_depth if max_depth is not None else sys.maxsize, limit),
+        )
+        rows = cur.fetchall()
     return [dict(r) for r in rows]
 
 
+def get_lineage_depth(organism_id: int) -> Optional[int]:
+    """Return the number of generations above the organism (0 for a root)."""
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT MAX(depth) FROM organism_lineage WHERE descendant_id=?", (organism_id,))
+        row = cur.fetchone()
+    return row[0]
+
+
+def get_common_ancestor(organism_a: int, organism_b: int) -> Optional[Dict]:
+    """Return the nearest common ancestor of two organisms (either may be it)."""
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT o.id, o.name, o.parent_id, o.created_at, a.depth AS depth_a, b.depth AS depth_b FROM organism_lineage a JOIN organism_lineage b ON b.ancestor_id = a.ancestor_id AND b.descendant_id=? JOIN organisms o ON o.id = a.ancestor_id WHERE a.descendant_id=? ORDER BY a.depth LIMIT 1",
+            (organism_b, organism_a),
+        )
+        row = cur.fetchone()
+    return dict(row) if row else None
+
+
+SIMILAR_BUCKET_LIMIT = 1000  # rows read per LSH bucket; bounds work on huge buckets
+SIMILAR_MAX_CANDIDATES = 500  # candidates scored exactly, by number of shared bands
+
+
+def find_similar_organisms(genome: Optional[str] = None, organism_id: Optional[int] = None, k: int = 10) -> Optional[List[Dict]]:
+    """Return the `k` organisms whose genomes are most similar to a query.
+
+    The query is either a genome or a stored organism (which is excluded from
+    its own results); None means that organism does not exist. Candidates come
+    from the LSH buckets the query's sketch falls into, so the cost depends on
+    how many organisms are similar rather than on the population size. Each
+    result carries `similarity`, the estimated Jaccard similarity of k-mer sets.
+    """
+    from organism_designer import similarity
+
+    with connection() as conn:
+        cur = conn.cursor()
+        if organism_id is not None:
+            cur.execute("SELECT sketch FROM organism_sketches WHERE organism_id=?", (organism_id,))
+            row = cur.fetchone()
+            if row is None:
+                return None
+            sig = similarity.unpack(row[0])
+        else:
+            sig = similarity.sketch(genome)
+        hits: Dict[int, int] = {}
+        for band, key in enumerate(similarity.band_keys(sig)):
+            cur.execute(
+                "SELECT organism_id FROM organism_lsh WHERE band=? AND bucket=? LIMIT ?",
+                (band, key, SIMILAR_BUCKET_LIMIT),
+            )
+            for (oid,) in cur.fetchall():
+                hits[oid] = hits.get(oid, 0) + 1
+        hits.pop(organism_id, None)
+        candidates = sorted(hits, key=hits.__getitem__, reverse=True)[:SIMILAR_MAX_CANDIDATES]
+        scored = []
+        for oid in candidates:
+            cur.execute(
+                "SELECT o.id, o.name, o.parent_id, o.created_at, s.sketch FROM organism_sketches s JOIN organisms o ON o.id = s.organism_id WHERE s.organism_id=?",
+                (oid,),
+            )
+            row = cur.fetchone()
+            if row is not None:
+                item = dict(row)
+                item['similarity'] = similarity.similarity(sig, similarity.unpack(item.pop('sketch')))
+                scored.append(item)
+    scored.sort(key=lambda r: (-r['similarity'], r['id']))
+    return scored[:k]
+
+
+MOTIF_BATCH = 200  # candidate organisms examined per round of a motif search
+
+
+def search_motif(motif: str, limit: int = 100, cursor: Optional[str] = None) -> List[Dict]:
+    """Return organisms containing `motif` (IUPAC codes allowed), by id.
+
+    Each row carries the sorted 0-based `positions` of every (possibly
+    overlapping) occurrence. Indexed organisms are only looked at when the
+    sampled postings hold a candidate start, which is then checked against
+    the genome; organisms stored since the last `backfill_motifs` run, and
+    motifs too short to probe, are scanned. Only A/C/G/T genomes are
+    searched. Paged by an id `cursor`; raises ValueError for a bad motif.
+    """
+    from organism_designer import genome as genome_codec
+    from organism_designer import motifs
+
+    motif = motifs.normalize(motif)
+    lead, probes = motifs.probes(motif)
+    check, scan = motifs.pattern(motif), motifs.finder(motif)
+    (after,) = decode_cursor(cursor, size=1) if cursor else (0,)
+    results = []
+    with connection() as conn:
+        cur = conn.cursor()
+        upto = _motifs_indexed_upto(cur) if probes is not None else 0
+        while len(results) < limit:
+            if after < upto:
+                candidates = set()
+                for _, ranges in probes:
+                    for lo, hi in ranges:
+                        cur.execute(
+                            "SELECT DISTINCT organism_id FROM motif_index WHERE gram >= ? AND gram < ? AND organism_id > ? AND organism_id <= ? ORDER BY organism_id LIMIT ?",
+                            (lo, hi, after, upto, MOTIF_BATCH),
+                        )
+                        candidates.update(oid for (oid,) in cur.fetchall())
+                batch = sorted(candidates)[:MOTIF_BATCH]
+                if not batch:
+                    after = upto
+                    continue
+                after = batch[-1]
+                starts: Dict[int, set] = {oid: set() for oid in batch}
+                for off, ranges in probes:
+                    for lo, hi in ranges:
+                        cur.execute(
+                            "SELECT organism_id, positions FROM motif_index WHERE organism_id IN (SELECT value FROM json_each(?)) AND gram >= ? AND gram < ?",
+                            (json.dumps(batch), lo, hi),
+                        )
+                        for oid, packed in cur.fetchall():
+                            starts[oid].update(p - off - lead for p in motifs.unpack_positions(packed) if p >= off + lead)
+                cur.execute(
+                    "SELECT id, name, parent_id, genome_hash FROM organisms WHERE id IN (SELECT value FROM json_each(?)) ORDER BY id",
+                    (json.dumps([oid for oid in batch if starts[oid]]),),
+                )
+                rows = cur.fetchall()
+            else:
+                cur.execute("SELECT id, name, parent_id, genome_hash FROM organisms WHERE id > ? ORDER BY id LIMIT ?", (after, MOTIF_BATCH))
+                rows = cur.fetchall()
+                if not rows:
+                    break
+                after = rows[-1]['id']
+                starts = None
+            for row in rows:
+                genome = _load_genome(cur, row['genome_hash'])
+                if starts is not None:
+                    positions = [p for p in sorted(starts[row['id']]) if check.match(genome, p)]
+                elif genome_codec.is_nucleotide(genome):
+                    positions = [m.start() for m in scan.finditer(genome)]
+                else:
+                    positions = []
+                if positions:
+                    results.append({'id': row['id'], 'name': row['name'], 'parent_id': row['parent_id'], 'positions': positions})
+                    if len(results) == limit:
+                        break
+    return results
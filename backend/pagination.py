@@ -0,0 +1,44 @@
+"""Opaque keyset cursors shared by the db list functions and HTTP routes.
+
+A cursor encodes the sort key of the last row on a page, typically
+(created_at, id). The next page is fetched with a `WHERE (created_at, id) <
+(?, ?)` seek on an index instead of an OFFSET scan, so deep pages cost the
+same as the first one.
+"""
+import base64
+import json
+from typing import Dict, List, Optional, Sequence
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(*key) -> str:
+    raw = json.dumps(list(key), separators=(',', ':'), default=str).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def decode_cursor(cursor: str, size: int = 2) -> list:
+    """Decode a cursor produced by `encode_cursor` into its `size` key values."""
+    try:
+        pad = '=' * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode((cursor + pad).encode('ascii')))
+    except Exception:
+        raise InvalidCursor('malformed cursor')
+    if not isinstance(key, list) or len(key) != size:
+        raise InvalidCursor('malformed cursor')
+    return key
+
+
+def next_cursor(rows: List[Dict], limit: int, key: Sequence[str] = ('created_at', 'id')) -> Optional[str]:
+    """Return the cursor for the page after `rows`, or None after a short page."""
+    if not rows or len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor(*(last[k] for k in key))
+
+
+def page(rows: List[Dict], limit: int, key: Sequence[str] = ('created_at', 'id')) -> Dict:
+    """Wrap a list of rows in the `{"items", "next_cursor"}` response envelope."""
+    return {'items': rows, 'next_cursor': next_cursor(rows, limit, key)}
@@ -0,0 +1,67 @@
+"""Fast JSON responses for routes that return rows straight from `backend.db`.
+
+FastAPI validates a route's return value against its `response_model` and
+then runs it through `jsonable_encoder` before encoding, which dominates CPU
+time for large lists. The rows these routes return come from the database
+layer and are already well formed, so with JARVIS_FAST_RESPONSES=1 they are
+encoded directly (with orjson when it is installed) and sent as is; the
+response model then only documents the shape. Request bodies are validated
+as before. Streamed exports are compressed on the fly with `gzip_chunks`.
+"""
+import json
+import os
+import zlib
+from collections.abc import Mapping
+
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder is used instead
+    orjson = None
+
+FAST_RESPONSES = os.environ.get("JARVIS_FAST_RESPONSES", "0") == "1"
+
+
+def _default(obj):
+    # lazily decoded rows (db.OrganismRow) are Mappings rather than dicts
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    if isinstance(obj, bytes):
+        return obj.hex()
+    raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, default=_default, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def respond(content):
+    """Return `content` as a FastJSONResponse when the fast path is enabled.
+
+    Otherwise `content` is returned unchanged for FastAPI to validate.
+    """
+    return FastJSONResponse(content) if FAST_RESPONSES else content
+
+
+def accepts_gzip(request) -> bool:
+    return 'gzip' in request.headers.get('accept-encoding', '').lower()
+
+
+def gzip_chunks(chunks):
+    """Gzip-compress an iterable of byte chunks as a single stream."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
@@ -1,9 +1,25 @@
+import atexit
+import collections
+import contextlib
+import copy
+import itertools
+import logging
 import os
 import json
+import struct
+import threading
 import time
+import zlib
 from pathlib import Path
 import tempfile
 
+from backend.pagination import decode_cursor, encode_cursor
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; the index is then only guarded per process
+    fcntl = None
+
 DATA_DIR = Path(__file__).resolve().parent.parent / 'data'
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -22,16 +38,123 @@ def _read_json_file(path: Path):
         return {}
 
 
+# Settings are read through a process-wide cache. A cached copy is trusted
+# for JARVIS_SETTINGS_RECHECK_SECONDS; after that one stat() of the file
+# (inode, mtime, size) decides whether it changed. Our own atomic writes
+# refresh the cache directly, and writes by other processes (other uvicorn
+# workers, or an edited file) are picked up within the recheck interval.
+# Functions registered with `subscribe` are called with (old, new) settings on
+# every change; while any are registered a background thread keeps checking,
+# so they hear about external edits even when nothing calls load_settings.
+SETTINGS_RECHECK_SECONDS = float(os.environ.get('JARVIS_SETTINGS_RECHECK_SECONDS', '1.0'))
+
+
+def _file_stamp(path: Path):
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+class _SettingsCache:
+    """The parsed settings file, revalidated by file stamp."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.value = None
+        self.path = None
+        self.stamp = None
+        self.checked = 0.0
+        self.subscribers = []
+        self._watcher = None
+
+    def get(self, revalidate: bool = False) -> dict:
+        now = time.monotonic()
+        with self.lock:
+            fresh = self.value is not None and self.path == SETTINGS_PATH
+            if fresh and not revalidate and now - self.checked < SETTINGS_RECHECK_SECONDS:
+                return self.value
+            stamp = _file_stamp(SETTINGS_PATH)
+            if fresh and stamp == self.stamp:
+                self.checked = now
+                return self.value
+            old = self.value if fresh else None
+            value = _read_json_file(SETTINGS_PATH)
+            self.value, self.path, self.stamp, self.checked = value, SETTINGS_PATH, stamp, now
+        if old is not None and old != value:
+            self._notify(old, value)
+        return value
+
+    def store(self, value: dict):
+        """Record settings this process just wrote to SETTINGS_PATH."""
+        with self.lock:
+            old = self.value if self.path == SETTINGS_PATH else None
+            self.value, self.path = value, SETTINGS_PATH
+            self.stamp, self.checked = _file_stamp(SETTINGS_PATH), time.monotonic()
+        if old is not None and old != value:
+            self._notify(old, value)
+
+    def subscribe(self, callback):
+        with self.lock:
+            self.subscribers.append(callback)
+            if self._watcher is None or not self._watcher.is_alive():
+                self._watcher = threading.Thread(target=self._watch, name='settings-watcher', daemon=True)
+                self._watcher.start()
+
+        def unsubscribe():
+            with self.lock:
+                if callback in self.subscribers:
+                    self.subscribers.remove(callback)
+        return unsubscribe
+
+    def _notify(self, old: dict, new: dict):
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for callback in subscribers:
+            try:
+                callback(copy.deepcopy(old), copy.deepcopy(new))
+            except Exception as e:
+                logging.error(f"settings subscriber {callback!r} failed: {e}")
+
+    def _watch(self):
+        while True:
+            with self.lock:
+                if not self.subscribers:
+                    self._watcher = None
+                    return
+            try:
+                self.get()
+            except Exception as e:
+                logging.error(f"settings reload failed: {e}")
+            time.sleep(max(SETTINGS_RECHECK_SECONDS, 0.05))
+
+
+_settings_cache = _SettingsCache()
+
+
 def load_settings():
-    return _read_json_file(SETTINGS_PATH)
+    """Current settings, from the cache while the file is unchanged."""
+    return copy.deepcopy(_settings_cache.get())
 
 
-def save_settings_atomic(new_settings: dict, actor: str = "unknown", reason: str | None = None):
-    """Atomically save `new_settings` to `SETTINGS_PATH` and append per-field audit entries.
+def subscribe(callback):
+    """Call `callback(old, new)` whenever the settings change.
 
-    Each audit entry is a JSON line with: timestamp, actor, reason, field, old_value, new_value
+    Changes saved by this process are reported from the saving thread;
+    external changes from a background thread within
+    SETTINGS_RECHECK_SECONDS. Returns a function that unsubscribes.
     """
-    old = load_settings()
+    return _settings_cache.subscribe(callback)
+
+
+_settings_lock = threading.Lock()  # serializes diff + replace within this process
+
+
+def _replace_settings(new_settings: dict) -> list:
+    """Write `new_settings` and return `(key, old, new)` for each changed key."""
+    # diff against the file as it is now, not a copy another worker replaced
+    old = _settings_cache.get(revalidate=True)
 
     # compute changed keys (including added/removed)
     changed = []
@@ -60,6 +183,19 @@ def save_settings_atomic(new_settings: dict, actor: str = "unknown", reason: str
             except Exception:
                 pass
 
+    # cache what a reader of the file would get back
+    _settings_cache.store(json.loads(json.dumps(new_settings, ensure_ascii=False)))
+    return changed
+
+
+def save_settings_atomic(new_settings: dict, actor: str = "unknown", reason: str | None = None):
+    """Atomically save `new_settings` to `SETTINGS_PATH` and append per-field audit entries.
+
+    Each audit entry is a JSON line with: timestamp, actor, reason, field, old_value, new_value
+    """
+    with _settings_lock:
+        changed = _replace_settings(new_settings)
+
     # append audit log entries
     ts = int(time.time())
     entries = []
@@ -75,9 +211,7 @@ def save_settings_atomic(new_settings: dict, actor: str = "unknown", reason: str
         entries.append(entry)
 
     if entries:
-        with LOG_PATH.open('a', encoding='utf-8') as f:
-            for e in entries:
-                f.write(json.dumps(e, ensure_ascii=False) + '\n')
+        _audit_writer.submit(LOG_PATH, entries)
 
     return {'changed': len(entries)}
 
@@ -92,45 +226,789 @@ def append_audit_entry(actor: str, field: str, old_value, new_value, reason: str
         'old_value': old_value,
         'new_value': new_value,
     }
-    with LOG_PATH.open('a', encoding='utf-8') as f:
-        f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+    _audit_writer.submit(LOG_PATH, [entry])
+
+
+# Audit entries are appended by one background writer per process. Callers
+# put entries in a bounded in-memory buffer and return; the writer appends
+# them in batches with a single open/write/fsync and updates the index.
+# JARVIS_AUDIT_DURABILITY selects when a batch is written:
+#   "interval" (default): every JARVIS_AUDIT_FLUSH_MS; a crash can lose the
+#       entries buffered in that window.
+#   "entry": every entry is on disk before the call returns (concurrent
+#       callers still share one fsync).
+#   "shutdown": only when the buffer fills up, on flush_audit() and at exit.
+# Callers block while JARVIS_AUDIT_BUFFER_SIZE entries are waiting. A batch
+# whose write fails stays buffered and is retried with backoff; flushes (and
+# so "entry" mode submits) raise the error meanwhile. Queries merge buffered
+# entries in, so a process always reads its own writes.
+AUDIT_DURABILITY = os.environ.get('JARVIS_AUDIT_DURABILITY', 'interval')
+AUDIT_FLUSH_MS = int(os.environ.get('JARVIS_AUDIT_FLUSH_MS', '50'))
+AUDIT_BUFFER_SIZE = int(os.environ.get('JARVIS_AUDIT_BUFFER_SIZE', '10000'))
+
+# segment number given to buffered entries in sort keys: they are newer than
+# anything on disk
+_PENDING_SEQ = 2 ** 62
+# longest pause between retries of a failed write; entries stay buffered meanwhile
+_AUDIT_RETRY_MAX_SECONDS = 5.0
+
+
+class _AuditWriter:
+    """Background thread that appends buffered audit entries in batches."""
+
+    def __init__(self, mode: str, interval_ms: int, capacity: int):
+        self.mode = mode
+        self.interval = interval_ms / 1000.0
+        self.capacity = capacity
+        self.pending = collections.deque()  # (log path, ordinal, entry, JSON line)
+        self._cond = threading.Condition()
+        self._submitted = 0
+        self._written = 0
+        self._requested = 0
+        self._failures = 0  # failed write attempts so far
+        self._error = None  # why the last attempt failed, until one succeeds
+        self._thread = None
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._cond:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                    self._thread.start()
+
+    def submit(self, path: Path, entries: list):
+        """Buffer `entries` for `path`; waits for the write in "entry" mode.
+
+        Raises if an entry cannot be serialized, or if the buffer is full and
+        the writer's next attempt fails (the error `flush` would raise).
+        """
+        lines = [json.dumps(e, ensure_ascii=False) + '\n' for e in entries]
+        self._ensure_started()
+        with self._cond:
+            while len(self.pending) >= self.capacity:
+                self._requested = self._submitted
+                self._cond.notify_all()
+                failures = self._failures
+                self._cond.wait()
+                if self._failures > failures and len(self.pending) >= self.capacity:
+                    raise self._error
+            for e, line in zip(entries, lines):
+                self._submitted += 1
+                self.pending.append((path, self._submitted, e, line))
+            last = self._submitted
+            self._cond.notify_all()
+        if self.mode == 'entry':
+            self.flush(upto=last)
+
+    def snapshot(self, path: Path) -> list:
+        """`(ordinal, entry)` for entries of `path` not yet written."""
+        with self._cond:
+            return [(n, e) for p, n, e, _ in self.pending if p == path]
+
+    def flush(self, timeout: float | None = None, upto: int | None = None) -> bool:
+        """Wait until everything buffered so far (or up to `upto`) is written.
+
+        If the writer's next attempt fails first, its error is raised; the
+        entries stay buffered and are retried.
+        """
+        with self._cond:
+            target = self._submitted if upto is None else upto
+            if self._written >= target:
+                return True
+            if self._thread is None or not self._thread.is_alive():
+                return False
+            self._requested = max(self._requested, target)
+            failures = self._failures
+            self._cond.notify_all()
+            done = self._cond.wait_for(lambda: self._written >= target or self._failures > failures, timeout)
+            if self._written < target and self._failures > failures:
+                raise self._error
+            return done
+
+    def _due(self) -> bool:
+        return self._requested > self._written or len(self.pending) >= self.capacity
+
+    def _run(self):
+        retries = 0
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self.pending)
+                if self.mode == 'interval':
+                    self._cond.wait_for(self._due, self.interval)
+                elif self.mode == 'shutdown':
+                    self._cond.wait_for(self._due)
+                batch = list(self.pending)
+            paths, done, error = [], 0, None
+            # readers take _index_lock to see an entry either buffered or
+            # indexed, never both or neither
+            with _index_lock:
+                for path, group in itertools.groupby(batch, key=lambda item: item[0]):
+                    group = list(group)
+                    try:
+                        self._append(path, [(e, line) for _, _, e, line in group])
+                    except Exception as e:
+                        error = e
+                        break
+                    done += len(group)
+                    if path not in paths:
+                        paths.append(path)
+                # entries from the failed write on stay buffered for the retry
+                with self._cond:
+                    for _ in range(done):
+                        self.pending.popleft()
+            if LOG_PATH in paths:
+                try:
+                    _maybe_rotate()
+                except Exception as e:
+                    logging.error(f"audit log rotation failed: {e}")
+            with self._cond:
+                if done:
+                    self._written = batch[done - 1][1]
+                self._error = error
+                if error is not None:
+                    self._failures += 1
+                self._cond.notify_all()
+            if error is None:
+                retries = 0
+                continue
+            retries += 1
+            logging.error(f"writing {len(batch) - done} audit entries failed (attempt {retries}, retrying): {error}")
+            time.sleep(min(_AUDIT_RETRY_MAX_SECONDS, 0.05 * 2 ** retries))
+
+    def _append(self, path: Path, entries: list):
+        """Append `(entry, line)` pairs in one write and fsync; raises if that fails."""
+        # in timestamp order, so a batch never adds to the index's disorder
+        data = ''.join(line for _, line in sorted(entries, key=lambda item: _entry_timestamp(item[0]))).encode('utf-8')
+        with open(path, 'ab', buffering=0) as f:
+            start = os.fstat(f.fileno()).st_size
+            try:
+                view = memoryview(data)
+                while view:
+                    view = view[f.write(view):]
+                os.fsync(f.fileno())
+            except BaseException:
+                # drop a partial batch so the retry does not duplicate lines
+                try:
+                    os.ftruncate(f.fileno(), start)
+                except OSError:
+                    pass
+                raise
+        try:
+            _sync_index(path, path.with_name(path.name + '.idx'))
+        except Exception as e:
+            # the entries are written; readers sync the index themselves
+            logging.error(f"indexing {path} failed: {e}")
+
+
+def _entry_timestamp(entry) -> int:
+    try:
+        return int(entry.get('timestamp', 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+_audit_writer = _AuditWriter(AUDIT_DURABILITY, AUDIT_FLUSH_MS, AUDIT_BUFFER_SIZE)
+def _flush_at_exit():
+    try:
+        _audit_writer.flush(timeout=5)
+    except Exception as e:
+        logging.error(f"audit entries left unwritten at exit: {e}")
+
+
+atexit.register(_flush_at_exit)
+
+
+def flush_audit(timeout: float | None = None) -> bool:
+    """Block until buffered audit entries are written (used on shutdown).
+
+    Raises the error of a failed write; the entries stay buffered.
+    """
+    return _audit_writer.flush(timeout)
+
+
+# Sidecar index of an audit log (LOG_PATH + '.idx'): a header followed by one
+# fixed-size record per log line, in file order, holding the entry's
+# timestamp, byte offset and hashes of its actor and field. The header records
+# how many log bytes are covered (plus a checksum of their tail, so a log that
+# was rewritten rather than appended to is detected and reindexed) and the
+# disorder: how far any timestamp lies below the largest one before it. Every
+# record is then within `disorder` seconds of sorted order, so queries bisect
+# to the newest wanted record with bounds widened by the disorder and walk the
+# index backwards, holding back only the records a not yet read one could
+# outrank and reading only the log lines they return. The writer sorts each
+# batch, so only entries submitted out of order across batches add disorder.
+_IDX_MAGIC = b'JAX2'
+_IDX_HEADER = struct.Struct('<4sQIqq')  # magic, covered bytes, tail crc, disorder, max timestamp
+_IDX_RECORD = struct.Struct('<qQII')  # timestamp, offset, actor hash, field hash
+_IDX_TAIL = 64
+_IDX_BLOCK = 4096  # records read per backwards step
+
+_index_lock = threading.RLock()
+
+
+def _index_path() -> Path:
+    return LOG_PATH.with_name(LOG_PATH.name + '.idx')
+
+
+def _key_hash(value) -> int:
+    return zlib.crc32(str(value).encode('utf-8'))
+
+
+def _tail_crc(log, size: int) -> int:
+    start = max(0, size - _IDX_TAIL)
+    log.seek(start)
+    return zlib.crc32(log.read(size - start))
+
+
+def _sync_index(log_path: Path | None = None, idx_path: Path | None = None):
+    """Index log lines appended since the last sync.
+
+    Returns `(records, disorder, max timestamp)`, or None when there is no log.
+    A log that shrank or whose indexed tail changed is reindexed from the start.
+    """
+    log_path = LOG_PATH if log_path is None else log_path
+    path = _index_path() if idx_path is None else idx_path
+    if not log_path.exists():
+        return None
+    with _index_lock, open(path, 'a+b') as idx:
+        if fcntl is not None:
+            fcntl.flock(idx.fileno(), fcntl.LOCK_EX)
+        idx.seek(0)
+        head = idx.read(_IDX_HEADER.size)
+        if len(head) == _IDX_HEADER.size and head[:4] == _IDX_MAGIC:
+            _, covered, crc, disorder, max_ts = _IDX_HEADER.unpack(head)
+        else:
+            covered, crc, disorder, max_ts = 0, 0, 0, -(2 ** 63)
+        with log_path.open('rb') as log:
+            size = os.fstat(log.fileno()).st_size
+            if covered and (covered > size or _tail_crc(log, covered) != crc):
+                covered, disorder, max_ts = 0, 0, -(2 ** 63)
+            if covered == 0:
+                idx.truncate(_IDX_HEADER.size)
+            if covered < size:
+                log.seek(covered)
+                records = []
+                pos = covered
+                for raw in log:
+                    if not raw.endswith(b'\n'):
+                        break  # a line still being written
+                    line_offset = pos
+                    pos += len(raw)
+                    try:
+                        e = json.loads(raw)
+                        ts = int(e.get('timestamp', 0))
+                    except Exception:
+                        continue
+                    disorder = max(disorder, max_ts - ts)
+                    max_ts = max(max_ts, ts)
+                    records.append(_IDX_RECORD.pack(ts, line_offset, _key_hash(e.get('actor')), _key_hash(e.get('field'))))
+                idx.seek(0, os.SEEK_END)
+                idx.write(b''.join(records))
+                covered = pos
+                crc = _tail_crc(log, covered)
+        header = _IDX_HEADER.pack(_IDX_MAGIC, covered, crc, disorder, max_ts)
+        if head != header:
+            # 'a+b' appends every write; rewrite the header through a second handle
+            with open(path, 'r+b') as out:
+                out.write(header)
+        idx.seek(0, os.SEEK_END)
+        count = (idx.tell() - _IDX_HEADER.size) // _IDX_RECORD.size
+    return count, disorder, max_ts
+
+
+def _index_record(idx, i: int):
+    idx.seek(_IDX_HEADER.size + i * _IDX_RECORD.size)
+    return _IDX_RECORD.unpack(idx.read(_IDX_RECORD.size))
+
 
+def _newest_first(idx, count: int, disorder: int, seq: int, until: int | None, after: list | None):
+    """Yield index records by descending (timestamp, offset), skipping those after `until`/`after`."""
+    import heapq
 
-def get_audit_logs(limit: int = 100, offset: int = 0, actor: str | None = None, field: str | None = None, since: int | None = None, until: int | None = None):
+    # bisect for a record past which nothing is wanted: with disorder d, every
+    # later record is at least its timestamp minus d
+    lo, hi = 0, count
+    while lo < hi:
+        mid = (lo + hi) // 2
+        ts, off = _index_record(idx, mid)[:2]
+        if (until is not None and ts - disorder > until) or (after is not None and [ts - disorder, seq, off] >= after):
+            hi = mid
+        else:
+            lo = mid + 1
+    pos = lo
+    # a record not read yet is at most `disorder` newer than any record read
+    held, lowest = [], None
+    while pos > 0:
+        start = max(0, pos - _IDX_BLOCK)
+        idx.seek(_IDX_HEADER.size + start * _IDX_RECORD.size)
+        block = list(_IDX_RECORD.iter_unpack(idx.read((pos - start) * _IDX_RECORD.size)))
+        pos = start
+        if not disorder:
+            yield from reversed(block)
+            continue
+        for rec in block:
+            heapq.heappush(held, (-rec[0], -rec[1], rec))
+            lowest = rec[0] if lowest is None else min(lowest, rec[0])
+        while held and (not pos or -held[0][0] >= lowest + disorder):
+            yield heapq.heappop(held)[2]
+
+
+# Rotation. Once the active log reaches AUDIT_ROTATE_BYTES, or its oldest
+# entry is AUDIT_ROTATE_SECONDS old, it is moved with its index into the
+# segments directory (LOG_PATH + '.segments') and gzip-compressed. Segment
+# indexes stay uncompressed and keep their offsets, so a segment is only
+# decompressed when one of its entries is returned. `manifest.json` lists the
+# segments with their min/max timestamps; queries skip segments outside
+# since/until. Segments older than AUDIT_RETENTION_DAYS, or beyond the newest
+# AUDIT_RETENTION_SEGMENTS, are deleted (0 disables either limit).
+#
+# Readers pin what they read: the active log and its index are opened while
+# rotation is held off (`lock`), and a shared lock on `readers` is held for
+# the whole read. Retention only deletes segments when it can take that lock
+# exclusively, and otherwise leaves them for the next rotation, so a long
+# query or export never loses a segment it has yet to open.
+AUDIT_ROTATE_BYTES = int(os.environ.get('JARVIS_AUDIT_ROTATE_BYTES', str(16 * 1024 * 1024)))
+AUDIT_ROTATE_SECONDS = int(os.environ.get('JARVIS_AUDIT_ROTATE_SECONDS', str(24 * 60 * 60)))
+AUDIT_RETENTION_DAYS = int(os.environ.get('JARVIS_AUDIT_RETENTION_DAYS', '365'))
+AUDIT_RETENTION_SEGMENTS = int(os.environ.get('JARVIS_AUDIT_RETENTION_SEGMENTS', '0'))
+
+_rotate_lock = threading.Lock()
+_readers_guard = threading.Lock()
+_active_readers = 0  # in this process; other processes hold `readers` shared
+
+
+def _segments_dir() -> Path:
+    return LOG_PATH.with_name(LOG_PATH.name + '.segments')
+
+
+def _read_manifest() -> dict:
+    manifest = _read_json_file(_segments_dir() / 'manifest.json')
+    return manifest if manifest else {'next_seq': 1, 'segments': []}
+
+
+def _write_manifest(manifest: dict):
+    path = _segments_dir() / 'manifest.json'
+    with tempfile.NamedTemporaryFile('w', dir=path.parent, delete=False, encoding='utf-8') as tf:
+        json.dump(manifest, tf, indent=2)
+    Path(tf.name).replace(path)
+
+
+def _index_bounds(idx_path: Path):
+    """`(records, disorder, min timestamp, max timestamp)` of a complete index."""
+    with open(idx_path, 'rb') as idx:
+        _, _, _, disorder, max_ts = _IDX_HEADER.unpack(idx.read(_IDX_HEADER.size))
+        data = idx.read()
+    count = len(data) // _IDX_RECORD.size
+    if not count:
+        return 0, 0, None, None
+    if not disorder:
+        min_ts = _IDX_RECORD.unpack_from(data)[0]
+    else:
+        min_ts = min(r[0] for r in _IDX_RECORD.iter_unpack(data[:count * _IDX_RECORD.size]))
+    return count, disorder, min_ts, max_ts
+
+
+def _maybe_rotate():
+    """Rotate the active log if it is over the size or age limit."""
+    try:
+        size = LOG_PATH.stat().st_size
+    except FileNotFoundError:
+        return
+    if not size:
+        return
+    due = AUDIT_ROTATE_BYTES and size >= AUDIT_ROTATE_BYTES
+    if not due and AUDIT_ROTATE_SECONDS:
+        try:
+            with LOG_PATH.open('rb') as f:
+                first = int(json.loads(f.readline()).get('timestamp', 0))
+        except Exception:
+            return
+        due = first <= time.time() - AUDIT_ROTATE_SECONDS
+    if due:
+        rotate_audit_log()
+
+
+def rotate_audit_log():
+    """Move the active audit log into a new compressed segment.
+
+    Returns the segment's manifest entry, or None if the log was empty.
+    A rotation interrupted part way is completed by the next call.
+    """
+    import gzip
+    import shutil
+
+    segdir = _segments_dir()
+    segdir.mkdir(parents=True, exist_ok=True)
+    with _rotate_lock, open(segdir / 'lock', 'a') as lockf:
+        if fcntl is not None:
+            fcntl.flock(lockf.fileno(), fcntl.LOCK_EX)
+        manifest = _read_manifest()
+        seq = manifest['next_seq']
+        raw = segdir / f'{seq:08d}.log'
+        idx_path = segdir / f'{seq:08d}.idx'
+        if not raw.exists():
+            with _index_lock:
+                if not LOG_PATH.exists() or not LOG_PATH.stat().st_size:
+                    return None
+                _sync_index()
+                os.replace(LOG_PATH, raw)
+                os.replace(_index_path(), idx_path)
+        # index lines appended by writers that still had the old file open
+        _sync_index(raw, idx_path)
+        count, disorder, min_ts, max_ts = _index_bounds(idx_path)
+        manifest['next_seq'] = seq + 1
+        meta = None
+        if count:
+            gz = segdir / f'{seq:08d}.log.gz'
+            tmp = segdir / f'{seq:08d}.log.gz.tmp'
+            with raw.open('rb') as src, gzip.open(tmp, 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            os.replace(tmp, gz)
+            meta = {'seq': seq, 'file': gz.name, 'index': idx_path.name, 'entries': count, 'disorder': disorder, 'min_ts': min_ts, 'max_ts': max_ts}
+            manifest['segments'].append(meta)
+        else:
+            idx_path.unlink()
+        _apply_retention(manifest)
+        raw.unlink()
+    return meta
+
+
+def _apply_retention(manifest: dict):
+    """Write `manifest`, first dropping expired segments if no reader is active."""
+    segments = manifest['segments']
+    keep = segments
+    if AUDIT_RETENTION_DAYS:
+        horizon = time.time() - AUDIT_RETENTION_DAYS * 24 * 60 * 60
+        keep = [s for s in keep if s['max_ts'] >= horizon]
+    if AUDIT_RETENTION_SEGMENTS:
+        keep = keep[-AUDIT_RETENTION_SEGMENTS:]
+    if len(keep) < len(segments):
+        segdir = _segments_dir()
+        with _readers_guard, open(segdir / 'readers', 'a') as lockf:
+            if not _active_readers and _try_lock_exclusive(lockf):
+                # readers that start now wait for the new manifest
+                manifest['segments'] = keep
+                _write_manifest(manifest)
+                for seg in segments:
+                    if seg not in keep:
+                        (segdir / seg['file']).unlink(missing_ok=True)
+                        (segdir / seg['index']).unlink(missing_ok=True)
+                return
+    _write_manifest(manifest)
+
+
+def _try_lock_exclusive(f) -> bool:
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    return True
+
+
+@contextlib.contextmanager
+def _pin_audit():
+    """Keep retention from deleting segments while the caller reads them."""
+    global _active_readers
+    with _readers_guard:
+        _active_readers += 1
+    segdir = _segments_dir()
+    segdir.mkdir(parents=True, exist_ok=True)
+    try:
+        with open(segdir / 'readers', 'a') as lockf:
+            if fcntl is not None:
+                fcntl.flock(lockf.fileno(), fcntl.LOCK_SH)
+            yield
+    finally:
+        with _readers_guard:
+            _active_readers -= 1
+
+
+_SEGMENT_READ = 64 * 1024  # compressed bytes read, and decompressed bytes produced, per step
+_SEGMENT_CHECKPOINT = 1024 * 1024  # decompressed bytes between checkpoints
+
+
+class _SegmentReader:
+    """Seekable line reader over a gzip segment that never inflates all of it.
+
+    Decompresses forward on demand, keeping only the latest chunk and a copy
+    of the decompressor every _SEGMENT_CHECKPOINT bytes of output. Readers
+    walk a segment newest first, so a seek backwards resumes from the nearest
+    checkpoint instead of the start of the file (as GzipFile would).
+    """
+
+    def __init__(self, f):
+        self._f = f
+        self._pos = 0
+        # (output offset, file offset, decompressor, compressed bytes it has not taken yet)
+        self._checkpoints = [(0, 0, zlib.decompressobj(31), b'')]
+        self._resume = None  # the same, just past the current chunk
+        self._chunk_start, self._chunk = 0, b''
+
+    def seek(self, offset: int):
+        self._pos = offset
+
+    def close(self):
+        self._f.close()
+
+    def readline(self) -> bytes:
+        start = self._pos
+        line = b''
+        while True:
+            if not self._chunk_start <= start < self._chunk_start + len(self._chunk):
+                if not self._load(start):
+                    break
+            data = self._chunk[start - self._chunk_start:]
+            end = data.find(b'\n')
+            if end >= 0:
+                line += data[:end + 1]
+                break
+            line += data
+            start = self._chunk_start + len(self._chunk)
+        self._pos += len(line)
+        return line
+
+    def _load(self, offset: int) -> bool:
+        """Make the current chunk the one holding `offset`; False past the end."""
+        state = max((cp for cp in self._checkpoints if cp[0] <= offset), key=lambda cp: cp[0])
+        if self._resume is not None and state[0] <= self._resume[0] <= offset:
+            out_pos, in_pos, inflate, tail = self._resume
+        else:
+            out_pos, in_pos, inflate, tail = state
+            inflate = inflate.copy()
+        self._f.seek(in_pos)
+        while True:
+            if not tail:
+                tail = self._f.read(_SEGMENT_READ)
+                if not tail:
+                    return False
+                in_pos += len(tail)
+            chunk = inflate.decompress(tail, _SEGMENT_READ)
+            tail = inflate.unconsumed_tail
+            self._chunk_start, self._chunk = out_pos, chunk
+            out_pos += len(chunk)
+            self._resume = (out_pos, in_pos, inflate, tail)
+            if out_pos >= self._checkpoints[-1][0] + _SEGMENT_CHECKPOINT:
+                self._checkpoints.append((out_pos, in_pos, inflate.copy(), tail))
+            if offset < out_pos:
+                return True
+
+
+def _open_segment(f):
+    return _SegmentReader(f)
+
+
+def _audit_sources(since: int | None, until: int | None, pinned: contextlib.ExitStack) -> list:
+    """The sources that may hold entries in [since, until], newest first.
+
+    Must run inside `_pin_audit`. The active log and its index are opened
+    here (and closed with `pinned`), so a rotation that moves them
+    afterwards does not change what this read sees; entries still in the
+    writer's buffer come as one more source.
+    """
+    segdir = _segments_dir()
+    sources = []
+    # rotation takes `lock` before _index_lock; so do readers
+    with open(segdir / 'lock', 'a') as lockf:
+        if fcntl is not None:
+            fcntl.flock(lockf.fileno(), fcntl.LOCK_SH)
+        with _index_lock:
+            manifest = _read_manifest()
+            buffered = _audit_writer.snapshot(LOG_PATH)
+            state = _sync_index()
+            if state is not None:
+                count, disorder, max_ts = state
+                idx = pinned.enter_context(open(_index_path(), 'rb'))
+                log = pinned.enter_context(LOG_PATH.open('rb'))
+                sources.append({'seq': manifest['next_seq'], 'index': lambda: idx, 'count': count, 'disorder': disorder,
+                                'max_ts': max_ts, 'open': lambda: log})
+    if buffered:
+        sources.append({'seq': _PENDING_SEQ, 'max_ts': max(int(e.get('timestamp', 0)) for _, e in buffered), 'buffered': buffered})
+    for seg in manifest['segments']:
+        if (since is not None and seg['max_ts'] < since) or (until is not None and seg['min_ts'] > until):
+            continue
+        log_path, idx_path = segdir / seg['file'], segdir / seg['index']
+        sources.append({'seq': seg['seq'], 'index': lambda p=idx_path: open(p, 'rb'), 'count': seg['entries'], 'disorder': seg['disorder'],
+                        'max_ts': seg['max_ts'], 'open': lambda p=log_path: _open_segment(open(p, 'rb'))})
+    sources.sort(key=lambda s: (s['max_ts'], s['seq']), reverse=True)
+    return sources
+
+
+def _source_entries(src: dict, actor: str | None, field: str | None, since: int | None, until: int | None, after: list | None):
+    """Yield `(key, entry)` for one log or segment, newest first, with filters applied."""
+    actor_hash = _key_hash(actor) if actor else None
+    field_hash = _key_hash(field) if field else None
+    seq = src['seq']
+    log = None
+    try:
+        idx = src['index']()
+    except FileNotFoundError:
+        # deleted behind our back (retention never removes a pinned segment)
+        logging.warning(f"audit segment {seq} is missing; skipping it")
+        return
+    try:
+        with idx:
+            for ts, line_offset, a_hash, f_hash in _newest_first(idx, src['count'], src['disorder'], seq, until, after):
+                if since is not None and ts < since:
+                    break
+                if until is not None and ts > until:
+                    continue
+                if after is not None and [ts, seq, line_offset] >= after:
+                    continue
+                if (actor_hash is not None and a_hash != actor_hash) or (field_hash is not None and f_hash != field_hash):
+                    continue
+                if log is None:
+                    log = src['open']()
+                log.seek(line_offset)
+                try:
+                    e = json.loads(log.readline())
+                except Exception:
+                    continue
+                # hashes can collide; confirm on the entry itself
+                if actor and str(e.get('actor')) != str(actor):
+                    continue
+                if field and str(e.get('field')) != str(field):
+                    continue
+                yield (ts, seq, line_offset), e
+    finally:
+        if log is not None:
+            log.close()
+
+
+def _buffered_entries(buffered: list, actor: str | None, field: str | None, since: int | None, until: int | None, after: list | None):
+    """Yield `(key, entry)` for entries still in the writer's buffer, newest first."""
+    found = []
+    for n, e in buffered:
+        # match what a reader gets back once the entry is on disk
+        e = json.loads(json.dumps(e, ensure_ascii=False))
+        ts = int(e.get('timestamp', 0))
+        if (since is not None and ts < since) or (until is not None and ts > until):
+            continue
+        if after is not None and [ts, _PENDING_SEQ, n] >= after:
+            continue
+        if (actor and str(e.get('actor')) != str(actor)) or (field and str(e.get('field')) != str(field)):
+            continue
+        found.append(((ts, _PENDING_SEQ, n), e))
+    found.sort(key=lambda item: item[0], reverse=True)
+    yield from found
+
+
+def _iter_audit(actor: str | None = None, field: str | None = None, since: int | None = None, until: int | None = None, cursor: str | None = None):
+    """Yield `(key, entry)` pairs newest first across the log and its segments.
+
+    The key is (timestamp, segment, byte offset). A source is only opened once
+    the merge reaches its newest timestamp, so a query satisfied by the
+    active log never touches older segments. Entries still buffered by the
+    writer are merged in, keyed after everything on disk; a cursor taken
+    inside them may repeat an entry once it has been written. Everything
+    read is pinned until the generator is exhausted or closed.
+    """
+    import heapq
+
+    after = decode_cursor(cursor, size=3) if cursor else None
+    until = int(until) if until is not None else None
+    since = int(since) if since is not None else None
+    with _pin_audit(), contextlib.ExitStack() as pinned:
+        sources = _audit_sources(since, until, pinned)
+        heap, iters = [], []
+        try:
+            while True:
+                while sources and (not heap or sources[0]['max_ts'] >= -heap[0][0][0]):
+                    src = sources.pop(0)
+                    if 'buffered' in src:
+                        it = _buffered_entries(src['buffered'], actor, field, since, until, after)
+                    else:
+                        it = _source_entries(src, actor, field, since, until, after)
+                    iters.append(it)
+                    first = next(it, None)
+                    if first is not None:
+                        heapq.heappush(heap, (tuple(-k for k in first[0]), len(iters), first, it))
+                if not heap:
+                    return
+                _, n, item, it = heapq.heappop(heap)
+                yield item
+                nxt = next(it, None)
+                if nxt is not None:
+                    heapq.heappush(heap, (tuple(-k for k in nxt[0]), n, nxt, it))
+        finally:
+            for it in iters:
+                it.close()
+
+
+def _query_audit(limit: int, offset: int, actor: str | None, field: str | None, since: int | None, until: int | None, cursor: str | None):
+    """Return `(key, entry)` pairs newest first, skipping `offset` matches.
+
+    Candidates come from the sidecar indexes, so only the returned entries
+    (and any hash collisions) are read; the walk stops after `offset + limit`
+    matches or at `since`. A `cursor` already marks
+    where the page starts, so `offset` is ignored with one.
+    """
+    if cursor is not None:
+        offset = 0
+    found = []
+    # close the walk (and unpin its sources) as soon as the page is full
+    with contextlib.closing(_iter_audit(actor, field, since, until, cursor)) as items:
+        for item in items:
+            if offset:
+                offset -= 1
+                continue
+            found.append(item)
+            if len(found) == limit:
+                break
+    return found
+
+
+def get_audit_logs(limit: int = 100, offset: int = 0, actor: str | None = None, field: str | None = None, since: int | None = None, until: int | None = None, cursor: str | None = None):
     """Return audit log entries with basic filtering and pagination.
 
     - `limit` and `offset` implement pagination (most recent first ordering).
+    - `cursor` continues after the last entry of a page from `get_audit_page`;
+      `offset` is ignored with a cursor.
     - `actor` and `field` filter by exact match.
     - `since` and `until` are Unix timestamps (seconds) to filter time range inclusive.
     """
-    if not LOG_PATH.exists():
-        return []
-    entries = []
-    with LOG_PATH.open('r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                e = json.loads(line)
-            except Exception:
-                continue
-            entries.append(e)
+    return [e for _, e in _query_audit(limit, offset, actor, field, since, until, cursor)]
 
-    # order by timestamp newest first (robust to file ordering)
-    entries.sort(key=lambda e: int(e.get('timestamp', 0)), reverse=True)
 
-    def keep(e):
-        if actor and str(e.get('actor')) != str(actor):
-            return False
-        if field and str(e.get('field')) != str(field):
-            return False
-        ts = int(e.get('timestamp', 0))
-        if since is not None and ts < int(since):
-            return False
-        if until is not None and ts > int(until):
-            return False
-        return True
+def get_audit_page(limit: int = 100, offset: int = 0, actor: str | None = None, field: str | None = None, since: int | None = None, until: int | None = None, cursor: str | None = None):
+    """Like `get_audit_logs` but returns `{"items", "next_cursor"}`."""
+    found = _query_audit(limit, offset, actor, field, since, until, cursor)
+    nxt = encode_cursor(*found[-1][0]) if found and len(found) == limit else None
+    return {'items': [e for _, e in found], 'next_cursor': nxt}
+
+
+AUDIT_FIELDS = ('timestamp', 'actor', 'reason', 'field', 'old_value', 'new_value')
+_EXPORT_CHUNK = 64 * 1024
+
+
+def export_audit(format: str = 'ndjson', actor: str | None = None, field: str | None = None, since: int | None = None, until: int | None = None):
+    """Yield every matching audit entry, newest first, as NDJSON or CSV bytes.
+
+    Entries come from one lazy pass over the log and its segments and are
+    emitted in chunks of about 64 KiB, so memory does not grow with the
+    export. The pass pins its sources until the generator finishes or is
+    closed, so rotation and retention during a long export do not cut it
+    short. In CSV, values that are not strings are written as JSON.
+    """
+    import csv
+    import io
 
-    filtered = [e for e in entries if keep(e)]
-    return filtered[offset: offset + limit]
+    if format not in ('ndjson', 'csv'):
+        raise ValueError(f"unsupported export format: {format}")
+    buf = io.StringIO()
+    writer = csv.writer(buf) if format == 'csv' else None
+    if writer is not None:
+        writer.writerow(AUDIT_FIELDS)
+    for _, e in _iter_audit(actor, field, since, until):
+        if writer is None:
+            buf.write(json.dumps(e, ensure_ascii=False) + '\n')
+        else:
+            writer.writerow([v if isinstance(v, str) or v is None else json.dumps(v, ensure_ascii=False)
+                             for v in (e.get(k) for k in AUDIT_FIELDS)])
+        if buf.tell() >= _EXPORT_CHUNK:
+            yield buf.getvalue().encode('utf-8')
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode('utf-8')
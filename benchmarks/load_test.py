@@ -0,0 +1,73 @@
+"""Closed-loop HTTP load test for a running backend.
+
+Runs `--concurrency` client threads against one endpoint for `--duration`
+seconds and reports throughput and latency percentiles, so runs before and
+after a change can be compared at the same p99. Defaults to the device poll
+endpoint; register a device first and pass its token with `--token`.
+
+    python -m benchmarks.load_test --url http://127.0.0.1:8000/devices/commands --token <pairing token>
+"""
+import argparse
+import threading
+import time
+import urllib.error
+import urllib.request
+
+
+def _worker(url: str, headers: dict, deadline: float, latencies: list, errors: list):
+    while time.perf_counter() < deadline:
+        req = urllib.request.Request(url, headers=headers)
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=30) as resp:
+                resp.read()
+        except (urllib.error.URLError, OSError) as e:
+            errors.append(e)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+def _percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def run(url: str, concurrency: int = 32, duration: float = 10.0, headers: dict | None = None) -> dict:
+    latencies: list = []
+    errors: list = []
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=_worker, args=(url, headers or {}, deadline, latencies, errors), daemon=True)
+        for _ in range(concurrency)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'rps': len(latencies) / duration,
+        'p50_ms': _percentile(latencies, 50) * 1000,
+        'p99_ms': _percentile(latencies, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:8000/devices/commands')
+    parser.add_argument('--token', help='x-pairing-token header value')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10.0)
+    args = parser.parse_args()
+    headers = {'x-pairing-token': args.token} if args.token else {}
+    out = run(args.url, concurrency=args.concurrency, duration=args.duration, headers=headers)
+    print(f"{out['requests']} requests, {out['errors']} errors, "
+          f"{out['rps']:.1f} req/s, p50 {out['p50_ms']:.1f} ms, p99 {out['p99_ms']:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
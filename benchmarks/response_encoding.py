@@ -0,0 +1,69 @@
+"""Compare the stock FastAPI response path with `backend.responses` on big pages.
+
+The stock path validates the payload against its response model, runs
+`jsonable_encoder` and encodes with `JSONResponse`; the fast path encodes the
+rows directly. Both are timed in-process on the same synthetic page of
+organism rows, without HTTP overhead.
+
+    python -m benchmarks.response_encoding --rows 10000
+"""
+import argparse
+import random
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from backend.responses import dumps, orjson
+from organism_designer import models
+
+
+def _rows(n: int, genome_length: int) -> list:
+    rng = random.Random(1)
+    return [
+        {
+            'id': n - i,
+            'name': f'organism-{n - i}',
+            'genome': ''.join(rng.choice('ACGT') for _ in range(genome_length)),
+            'genome_hash': f'{rng.getrandbits(256):064x}',
+            'parent_id': None if i % 10 == 0 else n - i - 1,
+            'genome_length': genome_length,
+            'created_at': '2024-01-01 00:00:00',
+        }
+        for i in range(n)
+    ]
+
+
+def _stock(content: dict) -> bytes:
+    validated = models.OrganismPage.model_validate(content)
+    return JSONResponse(jsonable_encoder(validated)).body
+
+
+def _fast(content: dict) -> bytes:
+    return dumps(content)
+
+
+def _time(fn, content, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(content)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--genome-length', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    content = {'items': _rows(args.rows, args.genome_length), 'next_cursor': None}
+    stock = _time(_stock, content, args.repeat)
+    fast = _time(_fast, content, args.repeat)
+    encoder = 'orjson' if orjson is not None else 'json'
+    print(f"{args.rows} rows: stock {stock * 1000:.1f} ms, fast ({encoder}) {fast * 1000:.1f} ms, {stock / fast:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
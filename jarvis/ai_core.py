@@ -1,6 +1,7 @@
 import time
 from datetime import datetime
 from backend import db
+from backend.pagination import next_cursor
 from jarvis import weather
 
 class BasicAICore:
@@ -47,7 +48,13 @@ class BasicAICore:
                     return "Of course. Which city's weather are you interested in? (e.g., 'weather in New York')"
 
             elif "list devices" in message_lower:
-                all_devices = db.list_devices()
+                all_devices, cursor = [], None
+                while True:
+                    rows = db.list_devices(limit=100, cursor=cursor)
+                    all_devices.extend(rows)
+                    cursor = next_cursor(rows, 100)
+                    if cursor is None:
+                        break
                 if not all_devices:
                     return "There are no devices registered with me yet."
                 response_lines = ["Here are your registered devices:"]
@@ -64,12 +71,7 @@ class BasicAICore:
                 command = parts[2]
                 payload_str = parts[3] if len(parts) > 3 else None
 
-                all_devices = db.list_devices()
-                target_device = None
-                for d in all_devices:
-                    if d['name'].lower() == device_name.lower():
-                        target_device = d
-                        break
+                target_device = db.find_device_by_name(device_name)
 
                 if not target_device:
                     return f"I could not find a registered device named '{device_name}'. You can ask me to 'list devices'."
@@ -0,0 +1,194 @@
+# Vectorized population statistics over genome strings
+#
+# Populations are converted once into flat NumPy byte arrays (every genome
+# back to back, plus per-genome lengths and offsets) or a padded
+# organisms x positions matrix, and every statistic is computed with whole
+# array operations rather than a Python loop per organism.
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+BASES = 'ACGT'
+SYMBOLS = BASES + 'N'  # N: any other character
+MAX_SPECTRUM_K = 6  # 4**6 = 4096 columns per organism
+MAX_EDIT_CELLS = 100_000_000  # dynamic-programming cells per edit-distance matrix
+MAX_POPULATION_BASES = 20_000_000  # total genome length of one Population (~10 bytes each)
+
+_CODES = np.full(256, 4, dtype=np.uint8)
+for _i, _b in enumerate(BASES):
+    _CODES[ord(_b)] = _CODES[ord(_b.lower())] = _i
+
+
+class Population:
+    """Genomes of a population as flat arrays.
+
+    `raw` holds the genomes' bytes back to back (one byte per character; any
+    non-ASCII character becomes '?'), `codes` the same positions mapped to
+    0-3 for A/C/G/T and 4 for anything else, `owner` the organism index of
+    each position and `pos` its offset within that organism's genome (both
+    int32, which MAX_POPULATION_BASES keeps in range). Raises ValueError for
+    a population of more than MAX_POPULATION_BASES bases.
+    """
+
+    def __init__(self, genomes: Sequence[str]):
+        self.size = len(genomes)
+        self.lengths = np.fromiter(map(len, genomes), dtype=np.int64, count=self.size)
+        total = int(self.lengths.sum())
+        if total > MAX_POPULATION_BASES:
+            raise ValueError(f'population has {total} bases, more than {MAX_POPULATION_BASES}')
+        self.offsets = np.concatenate(([0], np.cumsum(self.lengths)[:-1])) if self.size else self.lengths
+        self.raw = np.frombuffer(''.join(genomes).encode('ascii', 'replace'), dtype=np.uint8)
+        self.codes = _CODES[self.raw]
+        self.owner = np.repeat(np.arange(self.size, dtype=np.int32), self.lengths)
+        self.pos = np.arange(total, dtype=np.int32) - np.repeat(self.offsets.astype(np.int32), self.lengths)
+
+    def matrix(self) -> np.ndarray:
+        """Organisms x max-length matrix of raw bytes, zero-padded."""
+        width = int(self.lengths.max()) if self.size else 0
+        out = np.zeros((self.size, width), dtype=np.uint8)
+        out[self.owner, self.pos] = self.raw
+        return out
+
+
+def base_composition(pop: Population) -> np.ndarray:
+    """Counts of A, C, G, T and other characters, one row per organism."""
+    counts = np.bincount(pop.owner * 5 + pop.codes, minlength=pop.size * 5)
+    return counts.reshape(pop.size, 5)
+
+
+def gc_content(pop: Population) -> np.ndarray:
+    """Fraction of G and C per organism (0 for empty genomes)."""
+    comp = base_composition(pop)
+    return (comp[:, 1] + comp[:, 2]) / np.maximum(pop.lengths, 1)
+
+
+def kmer_spectra(pop: Population, k: int) -> np.ndarray:
+    """Counts of every A/C/G/T k-mer per organism, as an n x 4**k matrix.
+
+    Column `i` is the k-mer whose bases are the base-4 digits of `i` (see
+    `kmer_labels`); windows containing other characters are skipped.
+    """
+    if not 1 <= k <= MAX_SPECTRUM_K:
+        raise ValueError(f'k must be between 1 and {MAX_SPECTRUM_K}')
+    n_windows = max(len(pop.codes) - k + 1, 0)
+    index = np.zeros(n_windows, dtype=np.int64)
+    for j in range(k):
+        index = index * 4 + pop.codes[j:j + n_windows]
+    bad = np.concatenate(([0], np.cumsum(pop.codes >= 4)))
+    valid = (bad[k:k + n_windows] == bad[:n_windows]) & (pop.pos[:n_windows] <= pop.lengths[pop.owner[:n_windows]] - k)
+    counts = np.bincount(pop.owner[:n_windows][valid] * 4 ** k + index[valid], minlength=pop.size * 4 ** k)
+    return counts.reshape(pop.size, 4 ** k)
+
+
+def kmer_labels(k: int) -> List[str]:
+    labels = ['']
+    for _ in range(k):
+        labels = [prefix + b for prefix in labels for b in BASES]
+    return labels
+
+
+def hamming_matrix(pop: Population, block: int = 2048) -> np.ndarray:
+    """Pairwise mismatches by position; a length difference counts as mismatches.
+
+    Matches are counted as one-hot matrix products (per symbol, per block of
+    positions), so the work runs in BLAS instead of n**2 Python comparisons.
+    """
+    mat = pop.matrix()
+    matches = np.zeros((pop.size, pop.size))
+    for start in range(0, mat.shape[1], block):
+        sub = mat[:, start:start + block]
+        for symbol in np.unique(sub):
+            if symbol == 0:
+                continue  # padding
+            onehot = (sub == symbol).astype(np.float32)
+            matches += onehot @ onehot.T
+    longest = np.maximum.outer(pop.lengths, pop.lengths)
+    return (longest - matches).astype(np.int64)
+
+
+def _edit_distances(query: np.ndarray, targets: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    # Levenshtein distance of `query` to each row of `targets`, one DP row
+    # per query character across all targets at once; insertions are resolved
+    # with a running minimum instead of a left-to-right scan
+    cols = np.arange(targets.shape[1] + 1)
+    prev = np.broadcast_to(cols, (len(targets), len(cols))).copy()
+    for i, ch in enumerate(query, 1):
+        cur = np.empty_like(prev)
+        cur[:, 0] = i
+        np.minimum(prev[:, :-1] + (targets != ch), prev[:, 1:] + 1, out=cur[:, 1:])
+        prev = np.minimum.accumulate(cur - cols, axis=1) + cols
+    return prev[np.arange(len(targets)), lengths]
+
+
+def edit_distance_matrix(pop: Population) -> np.ndarray:
+    """Pairwise Levenshtein distances (insertions, deletions, substitutions)."""
+    cells = float(pop.lengths.sum()) * float(pop.lengths.max() if pop.size else 0) * pop.size / 2
+    if cells > MAX_EDIT_CELLS:
+        raise ValueError('population too large for an edit-distance matrix; use hamming')
+    mat = pop.matrix()
+    out = np.zeros((pop.size, pop.size), dtype=np.int64)
+    for i in range(pop.size - 1):
+        query = mat[i, :pop.lengths[i]]
+        d = _edit_distances(query, mat[i + 1:], pop.lengths[i + 1:])
+        out[i, i + 1:] = d
+        out[i + 1:, i] = d
+    return out
+
+
+def distance_matrix(pop: Population, metric: str = 'hamming') -> np.ndarray:
+    if metric == 'edit':
+        return edit_distance_matrix(pop)
+    return hamming_matrix(pop)
+
+
+def positional_entropy(pop: Population) -> np.ndarray:
+    """Shannon entropy (bits) of the A/C/G/T/other mix at each position.
+
+    Position `i` only counts the organisms whose genome is longer than `i`.
+    """
+    width = int(pop.lengths.max()) if pop.size else 0
+    counts = np.bincount(pop.pos * 5 + pop.codes, minlength=width * 5).reshape(width, 5)
+    freq = counts / np.maximum(counts.sum(axis=1, keepdims=True), 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        terms = np.where(freq > 0, freq * np.log2(freq), 0.0)
+    return 0.0 - terms.sum(axis=1)
+
+
+def organism_profile(genome: str, k: int = 3) -> Dict:
+    """Length, GC content, composition and non-zero k-mer counts of one genome."""
+    pop = Population([genome])
+    comp = base_composition(pop)[0]
+    spectrum = kmer_spectra(pop, k)[0]
+    labels = kmer_labels(k)
+    return {
+        'length': len(genome),
+        'gc_content': float(gc_content(pop)[0]),
+        'composition': dict(zip(SYMBOLS, comp.tolist())),
+        'kmers': {labels[i]: int(spectrum[i]) for i in np.flatnonzero(spectrum)},
+    }
+
+
+def population_kmers(pop: Population, k: int = 3) -> Dict[str, int]:
+    """Non-zero k-mer counts summed over the whole population."""
+    total = kmer_spectra(pop, k).sum(axis=0)
+    labels = kmer_labels(k)
+    return {labels[i]: int(total[i]) for i in np.flatnonzero(total)}
+
+
+def population_summary(pop: Population) -> Dict:
+    """Population-wide length, GC and composition statistics."""
+    if not pop.size:
+        return {'count': 0}
+    gc = gc_content(pop)
+    comp = base_composition(pop).sum(axis=0)
+    return {
+        'count': pop.size,
+        'length': {
+            'min': int(pop.lengths.min()),
+            'max': int(pop.lengths.max()),
+            'mean': float(pop.lengths.mean()),
+        },
+        'gc_content': {'mean': float(gc.mean()), 'std': float(gc.std()), 'min': float(gc.min()), 'max': float(gc.max())},
+        'composition': dict(zip(SYMBOLS, (comp / max(int(comp.sum()), 1)).tolist())),
+        'mean_positional_entropy': float(positional_entropy(pop).mean()),
+    }
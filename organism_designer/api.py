@@ -1,30 +1,320 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
-from backend import db
-from . import models
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from typing import List, Literal, Optional
+from starlette.concurrency import run_in_threadpool
+from backend import async_db as adb
+from backend.pagination import decode_cursor, next_cursor, page
+from backend.responses import FastJSONResponse, dumps, respond
+from . import analytics, core, importers, models, traits
 
 router = APIRouter()
 
+# rows fetched per keyset page while streaming a listing
+STREAM_BATCH = 500
+# organisms per listing: JSON page default, and the most one request returns
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+
 @router.post("/organisms", response_model=models.Organism)
-def create_organism(organism: models.OrganismCreate):
+async def create_organism(organism: models.OrganismCreate):
     """Create a new organism."""
-    org_id = db.create_organism(
+    org_id = await adb.create_organism(
         name=organism.name,
         genome=organism.genome,
         parent_id=organism.parent_id
     )
-    db_organism = db.get_organism(org_id)
+    db_organism = await adb.get_organism(org_id)
     return db_organism
 
-@router.get("/organisms", response_model=List[models.Organism])
-def list_organisms(limit: int = 50):
-    """List all organisms."""
-    return db.list_organisms(limit=limit)
+@router.post("/organisms/import", response_model=models.ImportResult)
+async def import_organisms(request: Request, format: Optional[str] = None):
+    """Bulk-create organisms from an NDJSON or FASTA request body.
+
+    The body is streamed and inserted in batches; records may link to earlier
+    records of the same upload with `ref`/`parent`. Invalid records are
+    skipped and reported by line number.
+    """
+    if format is None:
+        format = 'fasta' if 'fasta' in request.headers.get('content-type', '') else 'ndjson'
+    if format not in importers.PARSERS:
+        raise HTTPException(status_code=400, detail=f"Unsupported import format: {format}")
+    return await importers.import_organisms(request.stream(), format)
+
+@router.post("/organisms/similar", response_model=List[models.SimilarOrganism])
+async def find_similar(query: models.SimilarityQuery):
+    """Organisms whose genomes are most similar to the given genome."""
+    return await adb.find_similar_organisms(genome=query.genome, k=query.k)
+
+async def _stream_organisms(fetch, limit: int, cursor: Optional[str]):
+    # walk keyset pages so memory stays bounded by STREAM_BATCH rows
+    remaining = limit
+    while remaining > 0:
+        batch = min(STREAM_BATCH, remaining)
+        rows = await fetch(limit=batch, cursor=cursor)
+        for row in rows:
+            yield dumps(row) + b"\n"
+        remaining -= len(rows)
+        cursor = next_cursor(rows, batch)
+        if cursor is None:
+            return
+    # a full stream ends with the cursor of the next one
+    yield dumps({'next_cursor': cursor}) + b"\n"
+
+@router.get("/organisms", response_model=models.OrganismPage)
+async def list_organisms(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Literal['full', 'summary'] = 'full',
+    format: Optional[Literal['json', 'ndjson']] = None,
+):
+    """List organisms newest first, one keyset page at a time.
+
+    `fields=summary` leaves genomes out (rows carry `genome_length` and
+    `genome_hash` instead). With `format=ndjson` (or an `application/x-ndjson`
+    Accept header) rows are streamed one per line as they are read, up to
+    `limit` rows (MAX_PAGE_SIZE by default); a stream that stops at the limit
+    ends with a `{"next_cursor": ...}` line.
+    """
+    fetch = adb.list_organism_summaries if fields == 'summary' else adb.list_organisms
+    if format is None:
+        format = 'ndjson' if 'application/x-ndjson' in request.headers.get('accept', '') else 'json'
+    if format == 'ndjson':
+        if cursor is not None:
+            decode_cursor(cursor)  # reject a bad cursor before the stream starts
+        return StreamingResponse(_stream_organisms(fetch, limit or MAX_PAGE_SIZE, cursor), media_type="application/x-ndjson")
+    limit = limit or PAGE_SIZE
+    rows = await fetch(limit=limit, cursor=cursor)
+    if fields == 'summary':
+        # summary rows do not fit the full-row response model
+        return FastJSONResponse(page(rows, limit))
+    return respond(page(rows, limit))
 
 @router.get("/organisms/{organism_id}", response_model=models.Organism)
-def get_organism(organism_id: int):
+async def get_organism(organism_id: int):
     """Get a single organism by its ID."""
-    db_organism = db.get_organism(organism_id)
+    db_organism = await adb.get_organism(organism_id)
     if db_organism is None:
         raise HTTPException(status_code=404, detail="Organism not found")
     return db_organism
+
+@router.get("/organisms/{organism_id}/genome", response_model=models.GenomeRange)
+async def get_genome_range(organism_id: int, start: int = 0, end: Optional[int] = None):
+    """Bases `start:end` of an organism's genome (Python slice semantics)."""
+    window = await adb.get_genome_range(organism_id, start, end)
+    if window is None:
+        raise HTTPException(status_code=404, detail="Organism not found")
+    return window
+
+def _parse_range(header: str):
+    """`(start, end)` for a single `bytes=` range, or None to serve everything."""
+    unit, _, spec = header.partition('=')
+    if unit.strip() != 'bytes' or ',' in spec:
+        return None
+    first, sep, last = spec.strip().partition('-')
+    try:
+        if not sep or not (first or last):
+            return None
+        if not first:
+            n = int(last)  # suffix: the last n bytes
+            return (-n, None) if n else (0, 0)
+        if not last:
+            return int(first), None
+        if int(last) < int(first):
+            return None
+        return int(first), int(last) + 1
+    except ValueError:
+        return None
+
+@router.get("/organisms/{organism_id}/genome/raw")
+async def download_genome(organism_id: int, request: Request):
+    """Raw genome as text/plain, honouring a single HTTP `Range: bytes=` request.
+
+    Offsets are sequence positions, which equal byte offsets for the ASCII
+    alphabets genomes are written in.
+    """
+    wanted = _parse_range(request.headers.get('range', ''))
+    start, end = wanted if wanted is not None else (0, None)
+    window = await adb.get_genome_range(organism_id, start, end)
+    if window is None:
+        raise HTTPException(status_code=404, detail="Organism not found")
+    length = window['length']
+    headers = {'Accept-Ranges': 'bytes'}
+    if wanted is None:
+        return PlainTextResponse(window['sequence'], headers=headers)
+    if window['start'] == window['end']:
+        headers['Content-Range'] = f"bytes */{length}"
+        raise HTTPException(status_code=416, detail="Range not satisfiable", headers=headers)
+    headers['Content-Range'] = f"bytes {window['start']}-{window['end'] - 1}/{length}"
+    return PlainTextResponse(window['sequence'], status_code=206, headers=headers)
+
+@router.delete("/organisms/{organism_id}")
+async def delete_organism(organism_id: int):
+    """Delete an organism that has no descendants."""
+    try:
+        deleted = await adb.delete_organism(organism_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Organism not found")
+    return {"status": "deleted", "id": organism_id}
+
+@router.get("/organisms/{organism_id}/clones", response_model=models.OrganismRefPage)
+async def list_clones(organism_id: int, limit: int = Query(100, ge=1, le=1000), cursor: Optional[str] = None):
+    """Organisms carrying exactly the same genome (the organism included)."""
+    rows = await adb.list_organisms_sharing_genome(organism_id, limit=limit, cursor=cursor)
+    if rows is None:
+        raise HTTPException(status_code=404, detail="Organism not found")
+    return page(rows, limit, key=('id',))
+
+@router.get("/organisms/{organism_id}/ancestors", response_model=List[models.LineageEntry])
+async def get_ancestors(organism_id: int):
+    """Ancestors of an organism, nearest (parent) first."""
+    ancestors = await adb.get_ancestors(organism_id)
+    if ancestors is None:
+        raise HTTPException(status_code=404, detail="Organism not found")
+    return ancestors
+
+@router.get("/organisms/{organism_id}/descendants", response_model=models.LineagePage)
+async def get_descendants(organism_id: int, max_depth: Optional[int] = None, limit: int = Query(100, ge=1, le=1000), cursor: Optional[str] = None):
+    """Descendants of an organism, generation by generation."""
+    rows = await adb.get_descendants(organism_id, max_depth=max_depth, limit=limit, cursor=cursor)
+    if rows is None:
+        raise HTTPException(status_code=404, detail="Organism not found")
+    return page(rows, limit, key=('depth', 'id'))
+
+@router.get("/organisms/{organism_id}/depth")
+async def get_lineage_depth(organism_id: int):
+    """Number of generations between an organism and its root ancestor."""
+    depth = await adb.get_lineage_depth(organism_id)
+    if depth is None:
+        raise HTTPException(status_code=404, detail="Organism not found")
+    return {"id": organism_id, "depth": depth}
+
+@router.get("/organisms/{organism_id}/common_ancestor/{other_id}", response_model=models.CommonAncestor)
+async def get_common_ancestor(organism_id: int, other_id: int):
+    """Nearest common ancestor of two organisms."""
+    ancestor = await adb.get_common_ancestor(organism_id, other_id)
+    if ancestor is None:
+        raise HTTPException(status_code=404, detail="No common ancestor")
+    return ancestor
+
+@router.get("/organisms/{organism_id}/similar", response_model=List[models.SimilarOrganism])
+async def get_similar(organism_id: int, k: int = Query(10, ge=1, le=100)):
+    """Organisms most similar to a stored one, best match first."""
+    similar = await adb.find_similar_organisms(organism_id=organism_id, k=k)
+    if similar is None:
+        raise HTTPException(status_code=404, detail="Organism not found")
+    return similar
+
+@router.get("/organisms/{organism_id}/analysis")
+async def analyse_organism(organism_id: int, k: int = Query(3, ge=1, le=analytics.MAX_SPECTRUM_K)):
+    """GC content, base composition and k-mer counts of one organism."""
+    organism = await adb.get_organism(organism_id)
+    if organism is None:
+        raise HTTPException(status_code=404, detail="Organism not found")
+    profile = await run_in_threadpool(lambda: analytics.organism_profile(organism['genome'], k))
+    return {"id": organism_id, **profile}
+
+@router.get("/motifs/{motif}/organisms", response_model=models.MotifMatchPage)
+async def search_motif(motif: str, limit: int = Query(100, ge=1, le=1000), cursor: Optional[str] = None):
+    """Organisms containing a motif (IUPAC codes allowed) with every match offset."""
+    try:
+        rows = await adb.search_motif(motif, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return page(rows, limit, key=('id',))
+
+@router.get("/organisms/{organism_id}/traits")
+async def get_organism_traits(organism_id: int):
+    """Traits extracted from an organism's genome, by name."""
+    values = await adb.get_organism_traits(organism_id)
+    if values is None:
+        raise HTTPException(status_code=404, detail="Organism not found")
+    return {"id": organism_id, "traits": values}
+
+@router.get("/traits")
+async def list_traits():
+    """Names of the traits that organisms can be filtered and sorted by."""
+    return sorted(traits.TRAITS)
+
+@router.get("/traits/{trait}/organisms", response_model=models.TraitMatchPage)
+async def list_organisms_by_trait(
+    trait: str,
+    min: Optional[float] = None,
+    max: Optional[float] = None,
+    order: Literal['asc', 'desc'] = 'asc',
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+):
+    """Organisms with `trait` in [min, max], sorted by its value."""
+    if trait not in traits.TRAITS:
+        raise HTTPException(status_code=404, detail="Unknown trait")
+    rows = await adb.list_organisms_by_trait(trait, min, max, descending=order == 'desc', limit=limit, cursor=cursor)
+    return respond(page(rows, limit, key=('value', 'id')))
+
+async def _population(organism_ids: Optional[List[int]], limit: int = 1000):
+    try:
+        rows = await adb.get_organism_genomes(organism_ids, limit=limit, max_bases=analytics.MAX_POPULATION_BASES)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    ids = [oid for oid, _ in rows]
+    return ids, await run_in_threadpool(analytics.Population, [genome for _, genome in rows])
+
+@router.post("/analysis/population")
+async def analyse_population(query: models.PopulationQuery):
+    """Population-wide length, GC content and composition statistics."""
+    _, pop = await _population(query.organism_ids, query.limit)
+    return await run_in_threadpool(analytics.population_summary, pop)
+
+@router.post("/analysis/kmers")
+async def analyse_kmers(query: models.KmerQuery):
+    """k-mer spectrum of the whole population."""
+    ids, pop = await _population(query.organism_ids, query.limit)
+    kmers = await run_in_threadpool(analytics.population_kmers, pop, query.k)
+    return {"count": len(ids), "k": query.k, "kmers": kmers}
+
+@router.post("/analysis/diversity")
+async def analyse_diversity(query: models.PopulationQuery):
+    """Per-position Shannon entropy (bits) across the population."""
+    ids, pop = await _population(query.organism_ids, query.limit)
+    entropy = await run_in_threadpool(analytics.positional_entropy, pop)
+    return {"count": len(ids), "entropy": entropy.tolist()}
+
+@router.post("/analysis/distances")
+async def analyse_distances(query: models.DistanceQuery):
+    """Pairwise Hamming or edit distances between the given organisms."""
+    ids, pop = await _population(query.organism_ids)
+    try:
+        matrix = await run_in_threadpool(analytics.distance_matrix, pop, query.metric)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"ids": ids, "metric": query.metric, "matrix": matrix.tolist()}
+
+@router.post("/evolution/jobs", status_code=202)
+async def start_evolution(request: models.EvolutionRequest):
+    """Start a server-side evolution run; poll the returned job for progress."""
+    try:
+        return core.start_evolution(request.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/evolution/jobs")
+async def list_evolution_jobs():
+    """Evolution jobs of this process, newest first."""
+    return core.list_jobs()
+
+@router.get("/evolution/jobs/{job_id}")
+async def get_evolution_job(job_id: str):
+    """Progress, per-generation fitness and current population of a job."""
+    job = core.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.delete("/evolution/jobs/{job_id}")
+async def cancel_evolution_job(job_id: str):
+    """Stop a job after the generation in progress has been stored."""
+    if not core.cancel_job(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"status": "cancelling", "id": job_id}
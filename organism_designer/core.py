@@ -1 +1,350 @@
 # Core logic for the Organism Designer
+#
+# Server-side evolution: a job evolves a population for a number of
+# generations (tournament selection, crossover, point mutation, fitness
+# scoring) and persists every generation as organisms whose `parent_id`
+# points at the parent they were bred from.
+#
+# Breeding and fitness scoring run in a process pool, CHUNK_SIZE children per
+# work unit, so they scale with cores; selection happens in the job thread.
+# Each chunk gets its own seed derived from the job seed, so a run is
+# reproducible whatever the number of workers. While the pool breeds
+# generation g+1, the job thread bulk-inserts generation g.
+import itertools
+import math
+import multiprocessing
+import os
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from backend import async_db as adb
+from backend import db
+from . import similarity
+
+EVOLUTION_WORKERS = int(os.environ.get("JARVIS_EVOLUTION_WORKERS", str(os.cpu_count() or 1)))
+CHUNK_SIZE = int(os.environ.get("JARVIS_EVOLUTION_CHUNK", "256"))
+# organisms per insert transaction, so one generation never holds the write
+# lock for long
+WRITE_BATCH = int(os.environ.get("JARVIS_EVOLUTION_WRITE_BATCH", "500"))
+# finished jobs are forgotten after JOB_TTL seconds, or sooner beyond MAX_FINISHED_JOBS
+JOB_TTL = int(os.environ.get("JARVIS_EVOLUTION_JOB_TTL", "3600"))
+MAX_FINISHED_JOBS = int(os.environ.get("JARVIS_EVOLUTION_MAX_FINISHED_JOBS", "100"))
+TOURNAMENT_SIZE = 3
+ALPHABET = 'ACGT'
+
+
+# fitness functions: module-level so worker processes can unpickle them
+
+def gc_fitness(genome: str, params: Dict) -> float:
+    """GC fraction, or closeness to `target_gc` when one is given."""
+    gc = (genome.count('G') + genome.count('C')) / max(len(genome), 1)
+    if params.get('target_gc') is not None:
+        return 1.0 - abs(gc - params['target_gc'])
+    return gc
+
+
+def target_fitness(genome: str, params: Dict) -> float:
+    """Fraction of positions matching the `target` genome."""
+    target = params['target']
+    matches = sum(a == b for a, b in zip(genome, target))
+    return matches / max(len(genome), len(target), 1)
+
+
+def motif_fitness(genome: str, params: Dict) -> float:
+    """Number of non-overlapping occurrences of `motif`."""
+    return float(genome.count(params['motif']))
+
+
+FITNESS_FUNCTIONS = {
+    'gc_content': gc_fitness,
+    'target': target_fitness,
+    'motif': motif_fitness,
+}
+_REQUIRED_PARAMS = {'target': ('target',), 'motif': ('motif',)}
+
+
+def mutate(genome: str, rate: float, rng: random.Random) -> str:
+    """Substitute each base with probability `rate` (geometric skipping)."""
+    if rate <= 0 or not genome:
+        return genome
+    bases = None
+    log_keep = math.log1p(-rate) if rate < 1 else None
+    pos = -1
+    while True:
+        pos += 1 if log_keep is None else int(math.log(1.0 - rng.random()) / log_keep) + 1
+        if pos >= len(genome):
+            break
+        if bases is None:
+            bases = list(genome)
+        bases[pos] = rng.choice(ALPHABET.replace(bases[pos], '') or ALPHABET)
+    return genome if bases is None else ''.join(bases)
+
+
+def crossover(a: str, b: str, rng: random.Random) -> str:
+    """Single-point crossover: a prefix of `a` followed by the rest of `b`."""
+    if not a or not b:
+        return a
+    cut = rng.randrange(1, max(min(len(a), len(b)), 2))
+    return a[:cut] + b[cut:]
+
+
+def _breed_chunk(task: Tuple) -> List[Tuple[str, float, tuple]]:
+    # work unit run in a worker process: one child per parent pair, with its
+    # fitness and similarity sketch so the job thread only has to store it
+    seed, pairs, mutation_rate, crossover_rate, fitness, params = task
+    rng = random.Random(seed)
+    score = FITNESS_FUNCTIONS[fitness]
+    out = []
+    for a, b in pairs:
+        child = crossover(a, b, rng) if b is not None and rng.random() < crossover_rate else a
+        child = mutate(child, mutation_rate, rng)
+        out.append((child, score(child, params), similarity.sketch(child)))
+    return out
+
+
+def _score_chunk(task: Tuple) -> List[float]:
+    genomes, fitness, params = task
+    score = FITNESS_FUNCTIONS[fitness]
+    return [score(g, params) for g in genomes]
+
+
+class _InlineExecutor(Executor):
+    # JARVIS_EVOLUTION_WORKERS=0: run work units in the calling thread
+    def submit(self, fn, *args, **kwargs):
+        f = Future()
+        try:
+            f.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            f.set_exception(e)
+        return f
+
+
+_pool_lock = threading.Lock()
+_pool: Optional[Executor] = None
+
+
+def _executor() -> Executor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            if EVOLUTION_WORKERS <= 0:
+                _pool = _InlineExecutor()
+            else:
+                # spawn: forking a threaded server that holds sqlite
+                # connections is unsafe
+                _pool = ProcessPoolExecutor(EVOLUTION_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+class EvolutionJob:
+    """State of one evolution run, updated by its thread and read by the API."""
+
+    def __init__(self, config: Dict):
+        self.id = uuid.uuid4().hex
+        self.config = config
+        self.status = 'queued'
+        self.generation = 0
+        self.history: List[Dict] = []
+        self.population: List[int] = []
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.cancelled = threading.Event()
+        self.done = threading.Event()
+
+    def snapshot(self, full: bool = True) -> Dict:
+        generations = self.config['generations']
+        out = {
+            'id': self.id,
+            'status': self.status,
+            'generation': self.generation,
+            'generations': generations,
+            'progress': self.generation / generations if generations else 1.0,
+            'best': self.history[-1] if self.history else None,
+            'error': self.error,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at,
+        }
+        if full:
+            out['history'] = list(self.history)
+            out['population'] = list(self.population)
+        return out
+
+
+_jobs: Dict[str, EvolutionJob] = {}
+_jobs_lock = threading.Lock()
+
+
+def _prune_jobs():
+    # caller holds _jobs_lock
+    finished = sorted((j for j in _jobs.values() if j.finished_at is not None), key=lambda j: j.finished_at, reverse=True)
+    horizon = time.time() - JOB_TTL
+    for i, job in enumerate(finished):
+        if i >= MAX_FINISHED_JOBS or job.finished_at < horizon:
+            del _jobs[job.id]
+
+
+def start_evolution(config: Dict) -> Dict:
+    """Start an evolution job in the background and return its snapshot.
+
+    `config` keys: `fitness` (a FITNESS_FUNCTIONS name) and `params` for it,
+    `generations`, `population_size`, `mutation_rate`, `crossover_rate`,
+    `elite`, `seed`, and either `seed_ids` (organisms to start from) or
+    `genome_length` for a random initial population.
+    """
+    if config['fitness'] not in FITNESS_FUNCTIONS:
+        raise ValueError(f"unknown fitness function {config['fitness']!r}")
+    for name in _REQUIRED_PARAMS.get(config['fitness'], ()):
+        if not config['params'].get(name):
+            raise ValueError(f"fitness {config['fitness']!r} needs params.{name}")
+    job = EvolutionJob(config)
+    with _jobs_lock:
+        _prune_jobs()
+        _jobs[job.id] = job
+    threading.Thread(target=_run, args=(job,), name=f'evolution-{job.id[:8]}', daemon=True).start()
+    return job.snapshot()
+
+
+def get_job(job_id: str) -> Optional[Dict]:
+    job = _jobs.get(job_id)
+    return job.snapshot() if job else None
+
+
+def list_jobs() -> List[Dict]:
+    with _jobs_lock:
+        _prune_jobs()
+        jobs = sorted(_jobs.values(), key=lambda j: j.created_at, reverse=True)
+    return [j.snapshot(full=False) for j in jobs]
+
+
+def cancel_job(job_id: str) -> bool:
+    job = _jobs.get(job_id)
+    if job is None:
+        return False
+    job.cancelled.set()
+    return True
+
+
+def wait_job(job_id: str, timeout: Optional[float] = None) -> Optional[Dict]:
+    """Block until a job finishes (or `timeout` passes); return its snapshot."""
+    job = _jobs.get(job_id)
+    if job is None:
+        return None
+    job.done.wait(timeout)
+    return job.snapshot()
+
+
+def shutdown():
+    """Cancel running jobs and stop the worker processes (app shutdown)."""
+    global _pool
+    with _jobs_lock:
+        jobs = list(_jobs.values())
+    for job in jobs:
+        job.cancelled.set()
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _chunks(items: List, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _store(records: List[Dict]) -> List[int]:
+    """Insert organisms in WRITE_BATCH transactions on the API's writer thread."""
+    ids = []
+    for chunk in _chunks(records, WRITE_BATCH):
+        ids += adb.submit_write(db.create_organisms, chunk).result()
+    return ids
+
+
+def _select(fitness: List[float], count: int, rng: random.Random) -> List[int]:
+    # tournament selection: best of TOURNAMENT_SIZE random individuals
+    n = len(fitness)
+    return [max((rng.randrange(n) for _ in range(TOURNAMENT_SIZE)), key=fitness.__getitem__) for _ in range(count)]
+
+
+def _submit_breeding(pool: Executor, genomes: List[str], fitness: List[float], config: Dict, rng: random.Random):
+    count = config['population_size'] - min(config['elite'], len(genomes))
+    first = _select(fitness, count, rng)
+    second = _select(fitness, count, rng)
+    pairs = [(genomes[a], genomes[b] if a != b else None) for a, b in zip(first, second)]
+    futures = [
+        pool.submit(_breed_chunk, (rng.getrandbits(64), chunk, config['mutation_rate'], config['crossover_rate'], config['fitness'], config['params']))
+        for chunk in _chunks(pairs, CHUNK_SIZE)
+    ]
+    return first, futures
+
+
+def _initial_population(job: EvolutionJob, pool: Executor, rng: random.Random):
+    config = job.config
+    if config.get('seed_ids'):
+        rows = db.get_organism_genomes(config['seed_ids'])
+        if not rows:
+            raise ValueError('none of the seed organisms exist')
+        ids = [oid for oid, _ in rows]
+        genomes = [g for _, g in rows]
+    else:
+        genomes = [''.join(rng.choices(ALPHABET, k=config['genome_length'])) for _ in range(config['population_size'])]
+        ids = _store([{'name': f'evo-{job.id[:8]}-g0-{i}', 'genome': g} for i, g in enumerate(genomes)])
+    futures = [pool.submit(_score_chunk, (chunk, config['fitness'], config['params'])) for chunk in _chunks(genomes, CHUNK_SIZE)]
+    fitness = list(itertools.chain.from_iterable(f.result() for f in futures))
+    return ids, genomes, fitness
+
+
+def _record(job: EvolutionJob, ids: List[int], fitness: List[float]):
+    best = max(range(len(fitness)), key=fitness.__getitem__)
+    job.history.append({
+        'generation': job.generation,
+        'best_fitness': fitness[best],
+        'mean_fitness': sum(fitness) / len(fitness),
+        'best_id': ids[best],
+    })
+    job.population = ids
+
+
+def _run(job: EvolutionJob):
+    config = job.config
+    rng = random.Random(config.get('seed'))
+    job.status = 'running'
+    try:
+        pool = _executor()
+        ids, genomes, fitness = _initial_population(job, pool, rng)
+        _record(job, ids, fitness)
+        parents, futures = _submit_breeding(pool, genomes, fitness, config, rng)
+        for gen in range(1, config['generations'] + 1):
+            children = list(itertools.chain.from_iterable(f.result() for f in futures))
+            elite = sorted(range(len(fitness)), key=fitness.__getitem__, reverse=True)[:config['elite']]
+            next_genomes = [genomes[i] for i in elite] + [g for g, _, _ in children]
+            next_fitness = [fitness[i] for i in elite] + [f for _, f, _ in children]
+            pending = None
+            if gen < config['generations'] and not job.cancelled.is_set():
+                # breed the following generation while this one is stored
+                pending = _submit_breeding(pool, next_genomes, next_fitness, config, rng)
+            child_ids = _store([
+                {'name': f'evo-{job.id[:8]}-g{gen}-{i}', 'genome': g, 'parent_id': ids[p], 'sketch': sig}
+                for i, ((g, _, sig), p) in enumerate(zip(children, parents))
+            ])
+            ids = [ids[i] for i in elite] + child_ids
+            genomes, fitness = next_genomes, next_fitness
+            job.generation = gen
+            _record(job, ids, fitness)
+            if job.cancelled.is_set():
+                job.status = 'cancelled'
+                break
+            if pending is not None:
+                parents, futures = pending
+        else:
+            job.status = 'completed'
+    except Exception as e:
+        job.status = 'failed'
+        job.error = str(e)
+    finally:
+        job.finished_at = time.time()
+        job.done.set()
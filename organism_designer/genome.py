@@ -0,0 +1,162 @@
+# Compact storage encodings for organism genomes
+import hashlib
+import zlib
+from typing import List, Tuple, Union
+
+CODEC_TEXT = 0  # plain text (legacy rows, or too short to benefit from packing)
+CODEC_2BIT = 1  # A/C/G/T packed four bases per byte
+CODEC_ZLIB = 2  # zlib-compressed UTF-8 for any other alphabet
+CODEC_DELTA = 3  # edit script against a base genome (see `diff`/`patch`)
+
+NUCLEOTIDES = 'ACGT'
+
+_DIGITS = str.maketrans(NUCLEOTIDES, '0123')
+_STRIP_NUCLEOTIDES = str.maketrans('', '', NUCLEOTIDES)
+# byte value -> the four bases it encodes, most significant pair first
+_UNPACK4 = [
+    ''.join(NUCLEOTIDES[(b >> shift) & 3] for shift in (6, 4, 2, 0))
+    for b in range(256)
+]
+
+
+def is_nucleotide(genome: str) -> bool:
+    return not genome.translate(_STRIP_NUCLEOTIDES)
+
+
+def pack_2bit(genome: str) -> bytes:
+    """Pack an A/C/G/T string into ceil(len/4) bytes (tail padded with A)."""
+    nbytes = (len(genome) + 3) // 4
+    digits = genome.translate(_DIGITS).ljust(nbytes * 4, '0')
+    # base-4 int parsing is linear in CPython (power-of-two base)
+    return int(digits, 4).to_bytes(nbytes, 'big') if nbytes else b''
+
+
+def unpack_2bit(data: bytes, length: int) -> str:
+    return ''.join(map(_UNPACK4.__getitem__, data))[:length]
+
+
+def unpack_2bit_range(data: bytes, start: int, end: int) -> str:
+    """Bases `start:end` from the packed bytes that begin at byte `start // 4`."""
+    offset = start - start % 4
+    return unpack_2bit(data, end - offset)[start - offset:]
+
+
+def encode(genome: str) -> Tuple[int, Union[str, bytes]]:
+    """Return `(codec, value)` with the most compact stored form of `genome`."""
+    if is_nucleotide(genome):
+        return CODEC_2BIT, pack_2bit(genome)
+    raw = genome.encode('utf-8')
+    packed = zlib.compress(raw, 6)
+    if len(packed) < len(raw):
+        return CODEC_ZLIB, packed
+    return CODEC_TEXT, genome
+
+
+def decode(codec: int, value: Union[str, bytes], length: int) -> str:
+    """Inverse of `encode`; `length` is the genome length in characters.
+
+    CODEC_DELTA values need their base genome and are rebuilt with `patch`.
+    """
+    if codec == CODEC_DELTA:
+        raise ValueError('delta-encoded genome needs its base; use patch()')
+    if codec == CODEC_2BIT:
+        return unpack_2bit(value, length)
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(value).decode('utf-8')
+    if isinstance(value, bytes):
+        return value.decode('utf-8')
+    return value
+
+
+def digest(genome: str) -> bytes:
+    """Content address of a genome: identical sequences share one stored copy."""
+    return hashlib.sha256(genome.encode('utf-8')).digest()
+
+
+_BLOCK = 64
+
+
+def _varint(n: int, out: bytearray):
+    while n >= 0x80:
+        out.append(n & 0x7F | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    n = shift = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+def _first_mismatch(a: str, b: str) -> int:
+    # compare whole blocks first so long shared stretches stay in C
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i:i + _BLOCK] == b[i:i + _BLOCK]:
+        i += _BLOCK
+    while i < n and a[i] == b[i]:
+        i += 1
+    return min(i, n)
+
+
+def _edits(base: str, target: str) -> List[Tuple[int, int, str]]:
+    """Edits `(position in base, deleted length, inserted text)`, in order."""
+    if len(base) != len(target):
+        # an indel: replace the span between the common prefix and suffix
+        start = _first_mismatch(base, target)
+        end = _first_mismatch(base[start:][::-1], target[start:][::-1])
+        return [(start, len(base) - start - end, target[start:len(target) - end])]
+    edits = []
+    for i in range(0, len(base), _BLOCK):
+        if base[i:i + _BLOCK] == target[i:i + _BLOCK]:
+            continue
+        for j in range(i, min(i + _BLOCK, len(base))):
+            if base[j] != target[j]:
+                if edits and edits[-1][0] + edits[-1][1] == j:
+                    pos, size, _ = edits[-1]
+                    edits[-1] = (pos, size + 1, target[pos:j + 1])
+                else:
+                    edits.append((j, 1, target[j]))
+    return edits
+
+
+def diff(base: str, target: str) -> bytes:
+    """Encode `target` as a compact edit script against `base`.
+
+    Point mutations become one edit each; a length change becomes a single
+    replacement of the differing middle, so the script is only small when the
+    genomes are close (callers compare its size to a full encoding).
+    """
+    out = bytearray()
+    prev = 0
+    for pos, size, text in _edits(base, target):
+        raw = text.encode('utf-8')
+        _varint(pos - prev, out)
+        _varint(size, out)
+        _varint(len(raw), out)
+        out += raw
+        prev = pos + size
+    return bytes(out)
+
+
+def patch(base: str, script: bytes) -> str:
+    """Apply a `diff` edit script to `base`."""
+    parts = []
+    prev = pos = 0
+    while pos < len(script):
+        gap, pos = _read_varint(script, pos)
+        size, pos = _read_varint(script, pos)
+        nbytes, pos = _read_varint(script, pos)
+        start = prev + gap
+        parts.append(base[prev:start])
+        parts.append(script[pos:pos + nbytes].decode('utf-8'))
+        pos += nbytes
+        prev = start + size
+    parts.append(base[prev:])
+    return ''.join(parts)
@@ -0,0 +1,117 @@
+# Streaming bulk import of organisms from NDJSON or FASTA uploads
+import json
+from typing import AsyncIterator, Dict, List, Tuple
+
+from pydantic import ValidationError
+
+from backend import async_db as adb
+from . import models
+
+BATCH_SIZE = 5000  # records per executemany / transaction
+MAX_REPORTED_ERRORS = 100
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, str]]:
+    """Split a byte stream into `(line_number, text)` pairs without buffering it."""
+    tail = b''
+    lineno = 0
+    async for chunk in chunks:
+        lines = (tail + chunk).split(b'\n')
+        tail = lines.pop()
+        for raw in lines:
+            lineno += 1
+            yield lineno, raw.decode('utf-8', errors='replace').rstrip('\r')
+    if tail:
+        yield lineno + 1, tail.decode('utf-8', errors='replace').rstrip('\r')
+
+
+async def parse_ndjson(lines: AsyncIterator[Tuple[int, str]]):
+    """One JSON object per line: {"name", "genome", "parent_id"?, "ref"?, "parent"?}."""
+    async for lineno, line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield lineno, json.loads(line)
+        except ValueError as e:
+            yield lineno, ValueError(f'invalid JSON: {e}')
+
+
+def _fasta_header(header: str) -> Dict:
+    # ">name ref=r1 parent=r0 parent_id=12"; other tokens are description
+    tokens = header.split()
+    rec = {'name': tokens[0] if tokens else ''}
+    for token in tokens[1:]:
+        key, sep, value = token.partition('=')
+        if sep and key in ('ref', 'parent', 'parent_id'):
+            rec[key] = value
+    return rec
+
+
+async def parse_fasta(lines: AsyncIterator[Tuple[int, str]]):
+    """FASTA records; `ref=`, `parent=` and `parent_id=` header tokens link them."""
+    rec, start, seq = None, 0, []
+    async for lineno, line in lines:
+        if line.startswith('>'):
+            if rec is not None:
+                rec['genome'] = ''.join(seq)
+                yield start, rec
+            rec, start, seq = _fasta_header(line[1:]), lineno, []
+        elif line.startswith(';') or not line.strip():
+            continue
+        elif rec is None:
+            yield lineno, ValueError('sequence data before the first header')
+        else:
+            seq.append(''.join(line.split()))
+    if rec is not None:
+        rec['genome'] = ''.join(seq)
+        yield start, rec
+
+
+PARSERS = {'ndjson': parse_ndjson, 'fasta': parse_fasta}
+
+
+async def validate(records, result: Dict):
+    """Yield valid records as dicts; failures are counted in `result`."""
+    refs = set()
+    async for lineno, rec in records:
+        try:
+            if isinstance(rec, Exception):
+                raise rec
+            item = models.OrganismImport.model_validate(rec)
+            if item.parent is not None:
+                if item.parent_id is not None:
+                    raise ValueError('give either parent or parent_id, not both')
+                if item.parent not in refs:
+                    raise ValueError(f'unknown parent ref {item.parent!r} (parents must come first)')
+            if item.ref is not None:
+                if item.ref in refs:
+                    raise ValueError(f'duplicate ref {item.ref!r}')
+                refs.add(item.ref)
+        except (ValueError, ValidationError) as e:
+            result['failed'] += 1
+            if len(result['errors']) < MAX_REPORTED_ERRORS:
+                result['errors'].append({'line': lineno, 'error': str(e)})
+            continue
+        yield item.model_dump()
+
+
+async def batched(records, size: int) -> AsyncIterator[List[Dict]]:
+    batch = []
+    async for rec in records:
+        batch.append(rec)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def import_organisms(chunks: AsyncIterator[bytes], fmt: str = 'ndjson', batch_size: int = BATCH_SIZE) -> Dict:
+    """Parse, validate and insert an upload; each batch commits on its own."""
+    result = {'imported': 0, 'failed': 0, 'errors': []}
+    refs: Dict[str, int] = {}
+    records = validate(PARSERS[fmt](iter_lines(chunks)), result)
+    async for batch in batched(records, batch_size):
+        ids = await adb.create_organisms(batch, refs)
+        result['imported'] += len(ids)
+    return result
@@ -1,18 +1,148 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Any, Dict, Literal, Optional, List
+
+# genomes are stored packed and can be read by range, so large ones are fine
+MAX_GENOME_LENGTH = 1_000_000
 
 
 class OrganismCreate(BaseModel):
     name: str = Field(..., min_length=1, max_length=100)
-    genome: str = Field(..., min_length=1, max_length=10000)
+    genome: str = Field(..., min_length=1, max_length=MAX_GENOME_LENGTH)
     parent_id: Optional[int] = None
 
 
+class OrganismImport(OrganismCreate):
+    """One record of a bulk import; `parent` names an earlier record's `ref`."""
+    ref: Optional[str] = Field(None, min_length=1, max_length=100)
+    parent: Optional[str] = Field(None, min_length=1, max_length=100)
+
+
+class ImportFailure(BaseModel):
+    line: int
+    error: str
+
+
+class ImportResult(BaseModel):
+    imported: int
+    failed: int
+    errors: List[ImportFailure]
+
+
 class Organism(BaseModel):
     id: int
     name: str
     genome: str
+    genome_hash: Optional[str] = None
     parent_id: Optional[int] = None
 
     class Config:
         from_attributes = True
+
+
+class GenomeRange(BaseModel):
+    id: int
+    start: int
+    end: int
+    length: int
+    sequence: str
+
+
+class OrganismPage(BaseModel):
+    items: List[Organism]
+    next_cursor: Optional[str] = None
+
+
+class LineageEntry(BaseModel):
+    id: int
+    name: str
+    parent_id: Optional[int] = None
+    depth: int
+
+
+class LineagePage(BaseModel):
+    items: List[LineageEntry]
+    next_cursor: Optional[str] = None
+
+
+class CommonAncestor(BaseModel):
+    id: int
+    name: str
+    parent_id: Optional[int] = None
+    depth_a: int
+    depth_b: int
+
+
+class SimilarityQuery(BaseModel):
+    genome: str = Field(..., min_length=1, max_length=MAX_GENOME_LENGTH)
+    k: int = Field(10, ge=1, le=100)
+
+
+class SimilarOrganism(BaseModel):
+    id: int
+    name: str
+    parent_id: Optional[int] = None
+    similarity: float
+
+
+class OrganismRef(BaseModel):
+    id: int
+    name: str
+    parent_id: Optional[int] = None
+
+
+class OrganismRefPage(BaseModel):
+    items: List[OrganismRef]
+    next_cursor: Optional[str] = None
+
+
+class MotifMatch(BaseModel):
+    id: int
+    name: str
+    parent_id: Optional[int] = None
+    positions: List[int]
+
+
+class MotifMatchPage(BaseModel):
+    items: List[MotifMatch]
+    next_cursor: Optional[str] = None
+
+
+class TraitMatch(BaseModel):
+    id: int
+    name: str
+    parent_id: Optional[int] = None
+    value: float
+
+
+class TraitMatchPage(BaseModel):
+    items: List[TraitMatch]
+    next_cursor: Optional[str] = None
+
+
+class PopulationQuery(BaseModel):
+    """Organisms to analyse: explicit ids, or else the newest `limit` ones."""
+    organism_ids: Optional[List[int]] = Field(None, max_length=10000)
+    limit: int = Field(1000, ge=1, le=10000)
+
+
+class KmerQuery(PopulationQuery):
+    k: int = Field(3, ge=1, le=6)
+
+
+class DistanceQuery(BaseModel):
+    organism_ids: List[int] = Field(..., min_length=2, max_length=1000)
+    metric: Literal['hamming', 'edit'] = 'hamming'
+
+
+class EvolutionRequest(BaseModel):
+    """Evolution job settings; without `seed_ids` a random population is created."""
+    fitness: Literal['gc_content', 'target', 'motif'] = 'gc_content'
+    params: Dict[str, Any] = Field(default_factory=dict)
+    generations: int = Field(10, ge=1, le=1000)
+    population_size: int = Field(100, ge=2, le=5000)
+    genome_length: int = Field(100, ge=1, le=5000)
+    seed_ids: Optional[List[int]] = Field(None, max_length=5000)
+    mutation_rate: float = Field(0.01, ge=0, le=1)
+    crossover_rate: float = Field(0.5, ge=0, le=1)
+    elite: int = Field(1, ge=0)
+    seed: Optional[int] = None
@@ -0,0 +1,134 @@
+# Sampled q-gram index for motif search over nucleotide genomes
+#
+# Every STEP-th position of an A/C/G/T genome starts one Q-base gram (padded
+# with an end marker near the tail), encoded as a base-5 integer. The index
+# keeps one row per (gram, organism) holding the gram's sampled positions as
+# varint deltas, so it is about STEP times smaller than a gram per position.
+# An occurrence of a motif with at least STEP bases (leading and trailing N's
+# aside) covers exactly one sampled position at each offset modulo STEP, so
+# probing the gram ranges that start at the motif's first STEP offsets finds
+# every occurrence; IUPAC codes expand to several grams and short or
+# truncated windows become prefix ranges. Probes only yield candidate starts,
+# which are verified against the genome with `pattern`. Shorter motifs match
+# too often for an index to help and are searched by scanning.
+import itertools
+import re
+from typing import Dict, List, Optional, Tuple
+
+Q = 8
+STEP = 8  # sampling interval of indexed positions
+MAX_EXPANSIONS = 64  # concrete grams per probe; longer probes are truncated
+
+IUPAC = {
+    'A': 'A', 'C': 'C', 'G': 'G', 'T': 'T', 'U': 'T',
+    'R': 'AG', 'Y': 'CT', 'S': 'CG', 'W': 'AT', 'K': 'GT', 'M': 'AC',
+    'B': 'CGT', 'D': 'AGT', 'H': 'ACT', 'V': 'ACG', 'N': 'ACGT',
+}
+
+_DIGIT = {'A': 0, 'C': 1, 'G': 2, 'T': 3}
+_TO_DIGITS = str.maketrans('ACGT', '0123')
+_END = '4'
+
+
+def grams(genome: str) -> List[Tuple[int, bytes]]:
+    """Return `(gram, packed positions)` postings for the sampled positions of an A/C/G/T genome."""
+    digits = genome.translate(_TO_DIGITS)
+    positions: Dict[int, List[int]] = {}
+    for p in range(0, len(genome), STEP):
+        positions.setdefault(int(digits[p:p + Q].ljust(Q, _END), 5), []).append(p)
+    return [(g, pack_positions(ps)) for g, ps in positions.items()]
+
+
+def pack_positions(positions: List[int]) -> bytes:
+    out = bytearray()
+    prev = 0
+    for p in positions:
+        n = p - prev
+        prev = p
+        while n >= 0x80:
+            out.append(n & 0x7F | 0x80)
+            n >>= 7
+        out.append(n)
+    return bytes(out)
+
+
+def unpack_positions(data: bytes) -> List[int]:
+    positions = []
+    p = n = shift = 0
+    for b in data:
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            p += n
+            positions.append(p)
+            n = shift = 0
+        else:
+            shift += 7
+    return positions
+
+
+def normalize(motif: str) -> str:
+    motif = motif.upper()
+    bad = set(motif) - IUPAC.keys()
+    if not motif or bad:
+        raise ValueError(f"invalid motif characters: {''.join(sorted(bad))}" if bad else "empty motif")
+    return motif
+
+
+def probes(motif: str) -> Tuple[int, Optional[List[Tuple[int, List[Tuple[int, int]]]]]]:
+    """Plan the index probes for a normalized motif.
+
+    Returns `(lead, probes)`: `lead` is the number of leading N's, and each
+    probe `(offset, [(lo, hi), ...])` holds the gram ranges sampled at
+    `offset` past the lead. An occurrence starting at s has a posting at
+    s + lead + offset for some probe. `probes` is None when the motif is too
+    short to be found through sampled grams and has to be scanned for.
+    Raises ValueError for an all-N motif.
+    """
+    core = motif.strip('N')
+    if not core:
+        raise ValueError("motif has no bases other than N")
+    lead = len(motif) - len(motif.lstrip('N'))
+    if len(core) < STEP:
+        return lead, None
+    found = []
+    for off in range(STEP):
+        prefix = core[off:off + Q].rstrip('N')
+        while _expansions(prefix) > MAX_EXPANSIONS:
+            prefix = prefix[:-1].rstrip('N')
+        if not prefix.strip('N'):
+            return lead, None  # a probe matching every gram filters nothing
+        found.append((off, _ranges(prefix)))
+    return lead, found
+
+
+def _expansions(chunk: str) -> int:
+    count = 1
+    for c in chunk:
+        count *= len(IUPAC[c])
+    return count
+
+
+def _ranges(prefix: str) -> List[Tuple[int, int]]:
+    """Merged `[lo, hi)` ranges of the grams starting with a concrete expansion of `prefix`."""
+    scale = 5 ** (Q - len(prefix))
+    ranges = []
+    for bases in itertools.product(*(sorted(IUPAC[c]) for c in prefix)):
+        code = 0
+        for b in bases:
+            code = code * 5 + _DIGIT[b]
+        lo = code * scale
+        if ranges and ranges[-1][1] == lo:
+            ranges[-1] = (ranges[-1][0], lo + scale)
+        else:
+            ranges.append((lo, lo + scale))
+    return ranges
+
+
+def pattern(motif: str) -> 're.Pattern':
+    """Regex matching a normalized motif at one position (`pattern.match(g, p)`)."""
+    return re.compile(''.join(c if len(IUPAC[c]) == 1 and c != 'U' else f'[{IUPAC[c]}]' for c in motif))
+
+
+def finder(motif: str) -> 're.Pattern':
+    """Regex whose `finditer` yields every (possibly overlapping) occurrence of a normalized motif."""
+    return re.compile(f'(?={pattern(motif).pattern})')
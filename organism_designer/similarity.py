@@ -0,0 +1,70 @@
+# MinHash sketches of genome k-mer sets for nearest-organism search
+#
+# A sketch is a one-permutation MinHash signature: every distinct k-mer is
+# hashed once, the low bits pick one of NUM_HASHES slots and each slot keeps
+# its smallest hash. The fraction of equal slots of two sketches estimates the
+# Jaccard similarity of the k-mer sets. Slots are grouped into BANDS bands;
+# genomes sharing any whole band land in the same LSH bucket, which is how
+# candidates are found without comparing against every organism.
+import struct
+import zlib
+from typing import List, Sequence, Tuple
+
+K = 10
+NUM_HASHES = 64
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+
+_MASK = 0xFFFFFFFF
+_SLOT_MASK = NUM_HASHES - 1
+_STEP = 0x9E3779B1  # offset per slot of distance when densifying
+_STRUCT = struct.Struct(f'<{NUM_HASHES}I')
+
+
+def sketch(genome: str) -> Tuple[int, ...]:
+    """Return the MinHash signature of `genome`'s k-mer set."""
+    data = genome.encode('utf-8')
+    if len(data) <= K:
+        kmers = {data}
+    else:
+        kmers = {data[i:i + K] for i in range(len(data) - K + 1)}
+    hashes = sorted(set(map(zlib.crc32, kmers)), reverse=True)
+    # descending order, so the last (smallest) hash per slot wins
+    mins = dict(zip([h & _SLOT_MASK for h in hashes], hashes))
+    return _densify(mins)
+
+
+def _densify(mins: dict) -> Tuple[int, ...]:
+    # short genomes leave slots empty; fill each from the next non-empty slot
+    # (deterministically offset by the distance) so sketches stay comparable
+    sig = [mins.get(slot) for slot in range(NUM_HASHES)]
+    if len(mins) == NUM_HASHES:
+        return tuple(sig)
+    for slot in range(NUM_HASHES):
+        if sig[slot] is None:
+            for dist in range(1, NUM_HASHES):
+                donor = mins.get((slot + dist) & _SLOT_MASK)
+                if donor is not None:
+                    sig[slot] = (donor + dist * _STEP) & _MASK
+                    break
+    return tuple(sig)
+
+
+def band_keys(sig: Sequence[int]) -> List[int]:
+    """One 32-bit LSH bucket key per band."""
+    raw = _STRUCT.pack(*sig)
+    width = ROWS * 4
+    return [zlib.crc32(raw[i:i + width]) for i in range(0, NUM_HASHES * 4, width)]
+
+
+def similarity(a: Sequence[int], b: Sequence[int]) -> float:
+    """Estimated Jaccard similarity of the k-mer sets behind two sketches."""
+    return sum(x == y for x, y in zip(a, b)) / NUM_HASHES
+
+
+def pack(sig: Sequence[int]) -> bytes:
+    return _STRUCT.pack(*sig)
+
+
+def unpack(data: bytes) -> Tuple[int, ...]:
+    return _STRUCT.unpack(data)
@@ -0,0 +1,97 @@
+# Scalar traits derived from a genome, stored per organism for indexed queries
+#
+# Each extractor maps a genome to a float, or None when the trait does not
+# apply (e.g. nucleotide traits of a protein sequence). Traits are computed
+# when an organism is inserted and backfilled for older rows, so filtering or
+# sorting by a trait is an index range scan rather than a pass over genomes.
+import math
+import re
+from typing import Callable, Dict, Optional
+
+_START = re.compile(r'(?=ATG)')
+_STOP = re.compile(r'(?=TAA|TAG|TGA)')
+
+
+_STRIP_DNA = str.maketrans('', '', 'ACGTN')
+
+
+def _is_dna(genome: str) -> bool:
+    return not genome.upper().translate(_STRIP_DNA)
+
+
+def _counts(genome: str) -> Dict[str, int]:
+    g = genome.upper()
+    return {b: g.count(b) for b in 'ACGT'}
+
+
+def length(genome: str) -> Optional[float]:
+    return float(len(genome))
+
+
+def gc_content(genome: str) -> Optional[float]:
+    """Fraction of G and C among all characters."""
+    if not genome or not _is_dna(genome):
+        return None
+    c = _counts(genome)
+    return (c['G'] + c['C']) / len(genome)
+
+
+def gc_skew(genome: str) -> Optional[float]:
+    """(G - C) / (G + C); None without any G or C."""
+    if not _is_dna(genome):
+        return None
+    c = _counts(genome)
+    total = c['G'] + c['C']
+    return (c['G'] - c['C']) / total if total else None
+
+
+def entropy(genome: str) -> Optional[float]:
+    """Shannon entropy (bits) of the A/C/G/T composition."""
+    if not _is_dna(genome):
+        return None
+    c = _counts(genome)
+    total = sum(c.values())
+    if not total:
+        return None
+    return -sum(n / total * math.log2(n / total) for n in c.values() if n)
+
+
+def longest_orf(genome: str) -> Optional[float]:
+    """Length in bases of the longest ATG..stop reading frame on the forward strand."""
+    if not _is_dna(genome):
+        return None
+    g = genome.upper()
+    # walk start and stop codon positions only, keeping one open ORF per frame
+    events = sorted(
+        [(m.start(), 0) for m in _START.finditer(g)] + [(m.start(), 1) for m in _STOP.finditer(g)]
+    )
+    best = 0
+    open_at = [None, None, None]
+    for pos, is_stop in events:
+        frame = pos % 3
+        if not is_stop:
+            if open_at[frame] is None:
+                open_at[frame] = pos
+        elif open_at[frame] is not None:
+            best = max(best, pos + 3 - open_at[frame])
+            open_at[frame] = None
+    return float(best)
+
+
+TRAITS: Dict[str, Callable[[str], Optional[float]]] = {
+    'length': length,
+    'gc_content': gc_content,
+    'gc_skew': gc_skew,
+    'entropy': entropy,
+    'longest_orf': longest_orf,
+}
+
+
+def extract(genome: str) -> Dict[str, float]:
+    """Every applicable trait of `genome`."""
+    out = {}
+    for name, fn in TRAITS.items():
+        value = fn(genome)
+        if value is not None:
+            out[name] = value
+    return out
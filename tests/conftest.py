@@ -0,0 +1,19 @@
+import pytest
+
+from backend import db
+from backend import settings as settings_mod
+
+
+@pytest.fixture(autouse=True)
+def isolated_data(tmp_path, monkeypatch):
+    """Keep every test's database, settings and audit log under tmp_path.
+
+    Tests that need their own paths still monkeypatch them as before.
+    """
+    monkeypatch.setattr(db, 'DB_PATH', tmp_path / 'jarvis.db')
+    monkeypatch.setattr(settings_mod, 'SETTINGS_PATH', tmp_path / 'jarvis_settings.json')
+    monkeypatch.setattr(settings_mod, 'LOG_PATH', tmp_path / 'jarvis_settings.log')
+    yield
+    # queued rows must land in this test's database, not the next one's
+    db.flush_writes(timeout=5)
+    settings_mod.flush_audit(timeout=5)
@@ -0,0 +1,80 @@
+import random
+from collections import Counter
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from backend import db
+from organism_designer import analytics
+
+
+def _levenshtein(a, b):
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return prev[-1]
+
+
+@pytest.fixture
+def genomes():
+    rng = random.Random(9)
+    return [''.join(rng.choice('ACGTN') for _ in range(rng.randrange(0, 30))) for _ in range(15)]
+
+
+def test_composition_gc_and_kmers_match_python(genomes):
+    pop = analytics.Population(genomes)
+    comp = analytics.base_composition(pop)
+    gc = analytics.gc_content(pop)
+    spectra = analytics.kmer_spectra(pop, 2)
+    labels = analytics.kmer_labels(2)
+    for i, g in enumerate(genomes):
+        assert comp[i].tolist() == [g.count(b) for b in 'ACGTN']
+        assert gc[i] == pytest.approx((g.count('G') + g.count('C')) / max(len(g), 1))
+        expected = Counter(g[j:j + 2] for j in range(len(g) - 1) if 'N' not in g[j:j + 2])
+        assert {labels[c]: int(spectra[i, c]) for c in np.flatnonzero(spectra[i])} == dict(expected)
+
+
+def test_distance_matrices_match_python(genomes):
+    pop = analytics.Population(genomes)
+    hamming = analytics.hamming_matrix(pop)
+    edit = analytics.edit_distance_matrix(pop)
+    for i, a in enumerate(genomes):
+        for j, b in enumerate(genomes):
+            assert hamming[i, j] == sum(x != y for x, y in zip(a, b)) + abs(len(a) - len(b))
+            assert edit[i, j] == _levenshtein(a, b)
+
+
+def test_positional_entropy_and_summary():
+    pop = analytics.Population(['AAAA', 'AAAC', 'AA'])
+    assert analytics.positional_entropy(pop).tolist() == [0.0, 0.0, 0.0, 1.0]
+    summary = analytics.population_summary(pop)
+    assert summary['count'] == 3 and summary['length']['max'] == 4
+    assert analytics.population_summary(analytics.Population([])) == {'count': 0}
+
+
+def test_get_organism_genomes(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DB_PATH', tmp_path / 'analytics.db')
+    a = db.create_organism('a', 'ACGT')
+    b = db.create_organism('b', 'MKV')
+    assert db.get_organism_genomes([b, 12345, a]) == [(b, 'MKV'), (a, 'ACGT')]
+    assert [oid for oid, _ in db.get_organism_genomes(limit=1)] == [b]
+
+
+def test_population_total_bases_are_capped(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DB_PATH', tmp_path / 'analytics.db')
+    a = db.create_organism('a', 'ACGT' * 10)
+    b = db.create_organism('b', 'GATTACA')
+    assert len(db.get_organism_genomes([a, b], max_bases=47)) == 2
+    with pytest.raises(ValueError):
+        db.get_organism_genomes([a, b], max_bases=46)
+    with pytest.raises(ValueError):
+        db.get_organism_genomes(limit=10, max_bases=46)
+    monkeypatch.setattr(analytics, 'MAX_POPULATION_BASES', 10)
+    with pytest.raises(ValueError):
+        analytics.Population(['ACGTAC', 'GATTA'])
+    pop = analytics.Population(['ACGTA', 'GATTA'])
+    assert pop.owner.dtype == pop.pos.dtype == np.int32
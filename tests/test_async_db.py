@@ -0,0 +1,26 @@
+import asyncio
+import threading
+
+from backend import async_db as adb
+
+
+def test_async_facade_round_trip():
+    async def scenario():
+        pid = await adb.create_project('async-project', 'via facade')
+        proj = await adb.get_project(pid)
+        listed = await adb.list_projects()
+        return pid, proj, listed
+
+    pid, proj, listed = asyncio.run(scenario())
+    assert proj['title'] == 'async-project'
+    assert any(p['id'] == pid for p in listed)
+
+
+def test_writes_share_a_single_thread():
+    async def scenario():
+        names = await asyncio.gather(*[adb.run_write(lambda: threading.current_thread().name) for _ in range(8)])
+        return set(names)
+
+    names = asyncio.run(scenario())
+    assert len(names) == 1
+    assert next(iter(names)).startswith('db-writer')
@@ -0,0 +1,64 @@
+import csv
+import io
+import json
+
+import pytest
+
+from backend import settings as settings_mod
+
+
+def _setup(tmp_path, monkeypatch, n=300):
+    monkeypatch.setattr(settings_mod, 'LOG_PATH', tmp_path / 'audit.log')
+    with settings_mod.LOG_PATH.open('w', encoding='utf-8') as f:
+        for i in range(n):
+            f.write(json.dumps({'timestamp': 1000 + i, 'actor': 'alice' if i % 3 else 'bob', 'reason': None,
+                                'field': 'theme', 'old_value': {'n': i}, 'new_value': f'v,{i}'}) + '\n')
+
+
+def test_ndjson_export_streams_filtered_entries(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch)
+    monkeypatch.setattr(settings_mod, '_EXPORT_CHUNK', 256)
+    chunks = list(settings_mod.export_audit('ndjson', actor='bob', since=1100))
+    assert len(chunks) > 1
+    rows = [json.loads(line) for line in b''.join(chunks).decode('utf-8').splitlines()]
+    assert rows == settings_mod.get_audit_logs(limit=1000, actor='bob', since=1100)
+    assert [r['timestamp'] for r in rows][:2] == [1297, 1294]
+
+
+def test_csv_export(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch, n=5)
+    settings_mod.append_audit_entry('carol', 'volume', None, 7)  # still buffered
+    text = b''.join(settings_mod.export_audit('csv', until=2 ** 40)).decode('utf-8')
+    rows = list(csv.reader(io.StringIO(text)))
+    assert rows[0] == list(settings_mod.AUDIT_FIELDS)
+    assert rows[1][1:] == ['carol', '', 'volume', '', '7']
+    assert rows[2] == ['1004', 'alice', '', 'theme', '{"n": 4}', 'v,4']
+    assert len(rows) == 7
+
+
+def test_export_rejects_unknown_format(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch, n=1)
+    with pytest.raises(ValueError):
+        next(settings_mod.export_audit('xml'))
+
+
+def test_export_survives_rotation_midway(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch, n=300)
+    monkeypatch.setattr(settings_mod, 'AUDIT_RETENTION_DAYS', 0)
+    settings_mod.rotate_audit_log()
+    with settings_mod.LOG_PATH.open('w', encoding='utf-8') as f:
+        for i in range(300, 600):
+            f.write(json.dumps({'timestamp': 1000 + i, 'actor': 'carol', 'field': 'x', 'new_value': i}) + '\n')
+    expected = settings_mod.get_audit_logs(limit=10000)
+    monkeypatch.setattr(settings_mod, '_EXPORT_CHUNK', 256)
+
+    export = settings_mod.export_audit('ndjson')
+    chunks = [next(export)]
+    # the active log rotates and retention drops every older segment
+    monkeypatch.setattr(settings_mod, 'AUDIT_RETENTION_SEGMENTS', 1)
+    with settings_mod.LOG_PATH.open('a', encoding='utf-8') as f:
+        f.write(json.dumps({'timestamp': 5000, 'actor': 'dave', 'field': 'x'}) + '\n')
+    settings_mod.rotate_audit_log()
+    chunks += list(export)
+    rows = [json.loads(line) for line in b''.join(chunks).decode('utf-8').splitlines()]
+    assert rows == expected
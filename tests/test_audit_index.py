@@ -0,0 +1,85 @@
+import json
+import random
+
+from backend import settings as settings_mod
+
+
+def _brute(entries, limit, offset, actor=None, field=None, since=None, until=None):
+    keyed = []
+    pos = 0
+    for e in entries:
+        keyed.append(((e['timestamp'], pos), e))
+        pos += len((json.dumps(e, ensure_ascii=False) + '\n').encode('utf-8'))
+    keyed.sort(key=lambda ke: ke[0], reverse=True)
+    out = [
+        e for _, e in keyed
+        if (not actor or e['actor'] == actor) and (not field or e['field'] == field)
+        and (since is None or e['timestamp'] >= since) and (until is None or e['timestamp'] <= until)
+    ]
+    return out[offset:offset + limit]
+
+
+def _write(path, entries):
+    with path.open('w', encoding='utf-8') as f:
+        for e in entries:
+            f.write(json.dumps(e, ensure_ascii=False) + '\n')
+
+
+def test_indexed_queries_match_full_scan(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings_mod, 'LOG_PATH', tmp_path / 'audit.log')
+    rng = random.Random(2)
+    entries = [
+        {'timestamp': 1000 + i // 3, 'actor': rng.choice(['alice', 'bob', 'ünï']), 'reason': None,
+         'field': rng.choice(['theme', 'volume']), 'old_value': None, 'new_value': i}
+        for i in range(300)
+    ]
+    _write(settings_mod.LOG_PATH, entries)
+    shuffled = entries[:]
+    # a few late entries: disorder stays small and bounded
+    for i in range(0, 300, 37):
+        shuffled.insert(min(i + 20, 299), shuffled.pop(i))
+    for _ in range(3):
+        for kwargs in ({}, {'actor': 'bob'}, {'field': 'theme', 'since': 1020, 'until': 1070}, {'actor': 'ünï', 'until': 1050}):
+            assert settings_mod.get_audit_logs(limit=25, offset=5, **kwargs) == _brute(entries, 25, 5, **kwargs)
+            # cursor pages cover the same entries as one big page
+            seen, cursor = [], None
+            while True:
+                page = settings_mod.get_audit_page(limit=40, cursor=cursor, **kwargs)
+                seen.extend(page['items'])
+                cursor = page['next_cursor']
+                if cursor is None:
+                    break
+            assert seen == _brute(entries, 1000, 0, **kwargs)
+        # then a log in reverse order: the disorder spans the whole log
+        entries = shuffled if entries is not shuffled else entries[::-1]
+        _write(settings_mod.LOG_PATH, entries)
+
+
+def test_index_follows_appends_and_rewrites(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings_mod, 'LOG_PATH', tmp_path / 'audit.log')
+    settings_mod.append_audit_entry('alice', 'theme', 'light', 'dark')
+    settings_mod.append_audit_entry('bob', 'volume', 1, 2)
+    assert [e['actor'] for e in settings_mod.get_audit_logs()] == ['bob', 'alice']
+    settings_mod.append_audit_entry('carol', 'theme', 'dark', 'light')
+    assert settings_mod.get_audit_logs(limit=1)[0]['actor'] == 'carol'
+    settings_mod.flush_audit()
+
+    # a rewritten log is detected and reindexed
+    _write(settings_mod.LOG_PATH, [{'timestamp': 5, 'actor': 'dave', 'field': 'x', 'old_value': 0, 'new_value': 1}])
+    assert [e['actor'] for e in settings_mod.get_audit_logs()] == ['dave']
+
+
+def test_disorder_is_tracked_and_batches_are_sorted(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings_mod, 'LOG_PATH', tmp_path / 'audit.log')
+    entries = [{'timestamp': ts, 'actor': 'a', 'field': 'f', 'old_value': None, 'new_value': ts} for ts in range(100, 200)]
+    entries.insert(80, entries.pop(10))  # ts 110 written after ts 180
+    _write(settings_mod.LOG_PATH, entries)
+    count, disorder, max_ts = settings_mod._sync_index()
+    assert (count, disorder, max_ts) == (100, 70, 199)
+    assert [e['timestamp'] for e in settings_mod.get_audit_logs(limit=5, since=108, until=112)] == [112, 111, 110, 109, 108]
+
+    # one writer batch submitted out of order lands sorted
+    log = tmp_path / 'batch.log'
+    settings_mod._audit_writer._append(log, [({'timestamp': t}, json.dumps({'timestamp': t}) + '\n') for t in (3, 1, 2)])
+    assert [json.loads(line)['timestamp'] for line in log.read_text().splitlines()] == [1, 2, 3]
+    assert settings_mod._sync_index(log, tmp_path / 'batch.log.idx')[1] == 0
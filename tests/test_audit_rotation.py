@@ -0,0 +1,172 @@
+import json
+import os
+import random
+import time
+
+from backend import settings as settings_mod
+
+
+def _write(path, entries):
+    with path.open('a', encoding='utf-8') as f:
+        for e in entries:
+            f.write(json.dumps(e, ensure_ascii=False) + '\n')
+
+
+def _brute(segments, limit, actor=None, since=None, until=None):
+    keyed = []
+    for seq, entries in enumerate(segments):
+        pos = 0
+        for e in entries:
+            keyed.append(((e['timestamp'], seq, pos), e))
+            pos += len((json.dumps(e, ensure_ascii=False) + '\n').encode('utf-8'))
+    keyed.sort(key=lambda ke: ke[0], reverse=True)
+    out = [
+        e for _, e in keyed
+        if (not actor or e['actor'] == actor)
+        and (since is None or e['timestamp'] >= since) and (until is None or e['timestamp'] <= until)
+    ]
+    return out[:limit]
+
+
+def _entries(rng, start, n):
+    return [
+        {'timestamp': start + i // 2, 'actor': rng.choice(['alice', 'bob']), 'reason': None,
+         'field': 'theme', 'old_value': None, 'new_value': i}
+        for i in range(n)
+    ]
+
+
+def test_queries_span_rotated_segments(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings_mod, 'LOG_PATH', tmp_path / 'audit.log')
+    monkeypatch.setattr(settings_mod, 'AUDIT_RETENTION_DAYS', 0)
+    rng = random.Random(3)
+    # overlapping timestamps at segment boundaries, and one unsorted segment
+    segments = [_entries(rng, 1000, 120), _entries(rng, 1059, 120)[::-1], _entries(rng, 1118, 80)]
+    for entries in segments[:2]:
+        _write(settings_mod.LOG_PATH, entries)
+        assert settings_mod.rotate_audit_log()['entries'] == len(entries)
+    _write(settings_mod.LOG_PATH, segments[2])
+    segdir = tmp_path / 'audit.log.segments'
+    assert sorted(p.name for p in segdir.glob('*.gz')) == ['00000001.log.gz', '00000002.log.gz']
+
+    for kwargs in ({}, {'actor': 'bob'}, {'since': 1050, 'until': 1070}, {'until': 1065}):
+        assert settings_mod.get_audit_logs(limit=1000, **kwargs) == _brute(segments, 1000, **kwargs)
+        seen, cursor = [], None
+        while True:
+            page = settings_mod.get_audit_page(limit=35, cursor=cursor, **kwargs)
+            seen.extend(page['items'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        assert seen == _brute(segments, 1000, **kwargs)
+
+
+def test_segments_outside_the_range_are_not_opened(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings_mod, 'LOG_PATH', tmp_path / 'audit.log')
+    monkeypatch.setattr(settings_mod, 'AUDIT_RETENTION_DAYS', 0)
+    rng = random.Random(4)
+    segments = [_entries(rng, 1000, 50), _entries(rng, 2000, 50), _entries(rng, 3000, 50)]
+    for entries in segments[:2]:
+        _write(settings_mod.LOG_PATH, entries)
+        settings_mod.rotate_audit_log()
+    _write(settings_mod.LOG_PATH, segments[2])
+
+    opened = []
+    real_open = settings_mod._open_segment
+    monkeypatch.setattr(settings_mod, '_open_segment', lambda f: opened.append(os.path.basename(f.name)) or real_open(f))
+    assert settings_mod.get_audit_logs(limit=10, since=2000) == _brute(segments, 10, since=2000)
+    assert opened == []  # the newest ten all come from the active log
+    assert settings_mod.get_audit_logs(limit=200, since=2010) == _brute(segments, 200, since=2010)
+    assert opened == ['00000002.log.gz']
+    opened.clear()
+    assert settings_mod.get_audit_logs(until=1020) == _brute(segments, 100, until=1020)
+    assert opened == ['00000001.log.gz']
+
+
+def test_rotation_thresholds_and_retention(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings_mod, 'LOG_PATH', tmp_path / 'audit.log')
+    monkeypatch.setattr(settings_mod, 'AUDIT_ROTATE_BYTES', 400)
+    monkeypatch.setattr(settings_mod, 'AUDIT_RETENTION_SEGMENTS', 2)
+    for i in range(20):
+        settings_mod.append_audit_entry('alice', 'volume', i, i + 1)
+        settings_mod.flush_audit()
+    manifest = json.loads((tmp_path / 'audit.log.segments' / 'manifest.json').read_text())
+    assert len(manifest['segments']) == 2
+    assert len(list((tmp_path / 'audit.log.segments').glob('*.log.gz'))) == 2
+    kept = sum(s['entries'] for s in manifest['segments'])
+    logs = settings_mod.get_audit_logs(limit=100)
+    assert [e['new_value'] for e in logs] == list(range(20, 0, -1))[:len(logs)]
+    assert kept <= len(logs) < 20  # older segments were dropped
+
+    # the age limit rotates a log whose oldest entry is too old
+    monkeypatch.setattr(settings_mod, 'AUDIT_ROTATE_BYTES', 0)
+    settings_mod.LOG_PATH.unlink(missing_ok=True)
+    _write(settings_mod.LOG_PATH, [{'timestamp': int(time.time()) - 2 * 86400, 'actor': 'bob', 'field': 'x', 'old_value': 0, 'new_value': 1}])
+    settings_mod.append_audit_entry('carol', 'x', 1, 2)
+    settings_mod.flush_audit()
+    assert not settings_mod.LOG_PATH.exists() or settings_mod.LOG_PATH.stat().st_size == 0
+    assert [e['new_value'] for e in settings_mod.get_audit_logs(actor='bob')] == [1]
+    assert settings_mod.get_audit_logs(limit=1)[0]['actor'] == 'carol'
+
+
+def test_retention_waits_for_active_readers(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings_mod, 'LOG_PATH', tmp_path / 'audit.log')
+    monkeypatch.setattr(settings_mod, 'AUDIT_RETENTION_DAYS', 0)
+    rng = random.Random(5)
+    segments = [_entries(rng, 1000, 40), _entries(rng, 2000, 40), _entries(rng, 3000, 40)]
+    for entries in segments[:2]:
+        _write(settings_mod.LOG_PATH, entries)
+        settings_mod.rotate_audit_log()
+    _write(settings_mod.LOG_PATH, segments[2])
+    expected = _brute(segments, 1000)
+
+    reader = settings_mod._iter_audit()
+    seen = [next(reader)[1] for _ in range(10)]
+    # the active log rotates and retention wants only the newest segment
+    monkeypatch.setattr(settings_mod, 'AUDIT_RETENTION_SEGMENTS', 1)
+    _write(settings_mod.LOG_PATH, _entries(rng, 4000, 10))
+    settings_mod.rotate_audit_log()
+    seen += [e for _, e in reader]
+    assert seen == expected
+
+    segdir = tmp_path / 'audit.log.segments'
+    assert len(list(segdir.glob('*.log.gz'))) == 3  # deferred while the reader was open
+    _write(settings_mod.LOG_PATH, _entries(rng, 5000, 10))
+    settings_mod.rotate_audit_log()
+    assert sorted(p.name for p in segdir.glob('*.log.gz')) == ['00000004.log.gz']
+    assert [e['timestamp'] for e in settings_mod.get_audit_logs(limit=1000)][-1] == 5000
+
+
+def test_vanished_segment_is_skipped(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings_mod, 'LOG_PATH', tmp_path / 'audit.log')
+    monkeypatch.setattr(settings_mod, 'AUDIT_RETENTION_DAYS', 0)
+    rng = random.Random(6)
+    segments = [_entries(rng, 1000, 20), _entries(rng, 2000, 20)]
+    _write(settings_mod.LOG_PATH, segments[0])
+    settings_mod.rotate_audit_log()
+    _write(settings_mod.LOG_PATH, segments[1])
+    (tmp_path / 'audit.log.segments' / '00000001.idx').unlink()
+    assert settings_mod.get_audit_logs(limit=1000) == _brute([[], segments[1]], 1000)
+
+
+def test_segment_reader_seeks_back_without_inflating_everything(tmp_path, monkeypatch):
+    import gzip
+
+    monkeypatch.setattr(settings_mod, '_SEGMENT_READ', 256)
+    monkeypatch.setattr(settings_mod, '_SEGMENT_CHECKPOINT', 4096)
+    rng = random.Random(4)
+    lines = [(''.join(rng.choice('abc') for _ in range(rng.randint(0, 1500))) + '\n').encode() for _ in range(300)]
+    path = tmp_path / 'seg.log.gz'
+    with gzip.open(path, 'wb') as f:
+        f.write(b''.join(lines))
+    offsets = [sum(map(len, lines[:i])) for i in range(len(lines))]
+
+    reader = settings_mod._open_segment(open(path, 'rb'))
+    # newest first, as queries read, then in random order
+    for i in list(range(len(lines)))[::-1] + rng.sample(range(len(lines)), len(lines)):
+        reader.seek(offsets[i])
+        assert reader.readline() == lines[i]
+        assert len(reader._chunk) <= 256
+    reader.seek(offsets[-1] + len(lines[-1]))
+    assert reader.readline() == b''
+    reader.close()
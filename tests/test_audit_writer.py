@@ -0,0 +1,87 @@
+import json
+import threading
+
+from backend import settings as settings_mod
+
+
+def _on_disk(path):
+    if not path.exists():
+        return []
+    return [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+
+
+def test_shutdown_mode_buffers_but_reads_see_entries(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings_mod, 'LOG_PATH', tmp_path / 'audit.log')
+    monkeypatch.setattr(settings_mod, '_audit_writer', settings_mod._AuditWriter('shutdown', 50, 1000))
+    settings_mod.append_audit_entry('alice', 'theme', 'light', 'dark')
+    settings_mod.append_audit_entry('bob', 'volume', (1, 2), 3)
+    assert _on_disk(settings_mod.LOG_PATH) == []
+    # read-your-writes: buffered entries come back as they will from disk
+    logs = settings_mod.get_audit_logs()
+    assert [e['actor'] for e in logs] == ['bob', 'alice']
+    assert logs[0]['old_value'] == [1, 2]
+    assert [e['actor'] for e in settings_mod.get_audit_logs(field='theme')] == ['alice']
+
+    assert settings_mod.flush_audit(timeout=5)
+    assert [e['actor'] for e in _on_disk(settings_mod.LOG_PATH)] == ['alice', 'bob']
+    assert settings_mod.get_audit_logs() == logs
+
+
+def test_entry_mode_writes_before_returning(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings_mod, 'LOG_PATH', tmp_path / 'audit.log')
+    monkeypatch.setattr(settings_mod, '_audit_writer', settings_mod._AuditWriter('entry', 50, 1000))
+    settings_mod.append_audit_entry('alice', 'theme', 'light', 'dark')
+    assert [e['actor'] for e in _on_disk(settings_mod.LOG_PATH)] == ['alice']
+
+
+def test_concurrent_writers_are_batched_without_loss(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings_mod, 'LOG_PATH', tmp_path / 'audit.log')
+    # a small buffer makes producers wait for the writer
+    monkeypatch.setattr(settings_mod, '_audit_writer', settings_mod._AuditWriter('interval', 5, 16))
+
+    def produce(actor):
+        for i in range(100):
+            settings_mod.append_audit_entry(actor, 'n', i, i + 1)
+
+    threads = [threading.Thread(target=produce, args=(f'a{t}',)) for t in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(settings_mod.get_audit_logs(limit=1000)) == 400
+    assert settings_mod.flush_audit(timeout=5)
+    written = _on_disk(settings_mod.LOG_PATH)
+    assert len(written) == 400
+    for t in range(4):
+        assert [e['old_value'] for e in written if e['actor'] == f'a{t}'] == list(range(100))
+    assert len(settings_mod.get_audit_logs(limit=1000)) == 400
+
+
+def test_failed_writes_raise_and_are_retried(tmp_path, monkeypatch):
+    import pytest
+
+    # the log's directory is missing, so every append fails until it exists
+    monkeypatch.setattr(settings_mod, 'LOG_PATH', tmp_path / 'later' / 'audit.log')
+    monkeypatch.setattr(settings_mod, '_AUDIT_RETRY_MAX_SECONDS', 0.05)
+    monkeypatch.setattr(settings_mod, '_audit_writer', settings_mod._AuditWriter('entry', 50, 1000))
+    with pytest.raises(OSError):
+        settings_mod.append_audit_entry('alice', 'theme', 'light', 'dark')
+    with pytest.raises(OSError):
+        settings_mod.flush_audit(timeout=5)
+    assert [e['actor'] for e in settings_mod.get_audit_logs()] == ['alice']
+
+    settings_mod.LOG_PATH.parent.mkdir(exist_ok=True)
+    assert settings_mod.flush_audit(timeout=5)
+    assert [e['actor'] for e in _on_disk(settings_mod.LOG_PATH)] == ['alice']
+
+
+def test_unserializable_entries_are_rejected_by_the_caller(tmp_path, monkeypatch):
+    import pytest
+
+    monkeypatch.setattr(settings_mod, 'LOG_PATH', tmp_path / 'audit.log')
+    monkeypatch.setattr(settings_mod, '_audit_writer', settings_mod._AuditWriter('interval', 5, 16))
+    with pytest.raises(TypeError):
+        settings_mod.append_audit_entry('alice', 'theme', object(), 'dark')
+    settings_mod.append_audit_entry('bob', 'theme', 'light', 'dark')
+    assert settings_mod.flush_audit(timeout=5)
+    assert [e['actor'] for e in _on_disk(settings_mod.LOG_PATH)] == ['bob']
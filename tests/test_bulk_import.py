@@ -0,0 +1,49 @@
+import asyncio
+import json
+
+from backend import db
+from organism_designer import importers
+
+
+def _run(body: bytes, fmt: str, chunk: int = 7, batch_size: int = 2):
+    async def chunks():
+        for i in range(0, len(body), chunk):
+            yield body[i:i + chunk]
+
+    return asyncio.run(importers.import_organisms(chunks(), fmt, batch_size=batch_size))
+
+
+def test_ndjson_import_resolves_refs_across_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DB_PATH', tmp_path / 'import.db')
+    existing = db.create_organism('existing', 'ACGT')
+    lines = [
+        {'name': 'root', 'genome': 'AAAA', 'ref': 'r'},
+        {'name': 'child', 'genome': 'AAAC', 'ref': 'c', 'parent': 'r'},
+        'not json',
+        {'name': 'orphan', 'genome': 'AAAG', 'parent': 'missing'},
+        {'name': '', 'genome': 'AAAT'},
+        {'name': 'grandchild', 'genome': 'AACC', 'parent': 'c'},
+        {'name': 'adopted', 'genome': 'AACG', 'parent_id': existing},
+    ]
+    body = '\n'.join(l if isinstance(l, str) else json.dumps(l) for l in lines).encode()
+    result = _run(body, 'ndjson')
+
+    assert result['imported'] == 4 and result['failed'] == 3
+    assert [e['line'] for e in result['errors']] == [3, 4, 5]
+    rows = {r['name']: r for r in db.list_organisms(limit=10)}
+    assert rows['child']['parent_id'] == rows['root']['id']
+    assert rows['adopted']['parent_id'] == existing
+    assert [a['name'] for a in db.get_ancestors(rows['grandchild']['id'])] == ['child', 'root']
+    assert db.get_organism(rows['grandchild']['id'])['genome'] == 'AACC'
+
+
+def test_fasta_import(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DB_PATH', tmp_path / 'import.db')
+    body = b">seq1 ref=a some description\nACGT\nACGT\n;comment\n>seq2 parent=a\r\nTTTT\n>empty\n"
+    result = _run(body, 'fasta', chunk=5)
+
+    assert result['imported'] == 2 and result['failed'] == 1
+    assert result['errors'][0]['line'] == 7
+    rows = {r['name']: r for r in db.list_organisms(limit=10)}
+    assert db.get_organism(rows['seq1']['id'])['genome'] == 'ACGTACGT'
+    assert rows['seq2']['parent_id'] == rows['seq1']['id']
@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+
+from backend import db
+
+
+def test_connection_is_reused_per_thread():
+    with db.connection() as c1:
+        pass
+    with db.connection() as c2:
+        pass
+    assert c1 is c2
+
+    other = []
+    t = threading.Thread(target=lambda: other.append(db.get_conn()))
+    t.start()
+    t.join()
+    assert other[0] is not c1
+
+
+def test_pragmas_applied():
+    with db.connection() as conn:
+        mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        timeout = conn.execute("PRAGMA busy_timeout").fetchone()[0]
+    assert mode.lower() == 'wal'
+    assert timeout == int(db.PRAGMAS['busy_timeout'])
+
+
+def test_transaction_rolls_back_on_error():
+    db.init_db()
+    with pytest.raises(RuntimeError):
+        with db.transaction() as conn:
+            conn.execute("INSERT INTO projects (title, description) VALUES (?, ?)", ('pool-rollback', ''))
+            raise RuntimeError('boom')
+    with db.connection() as conn:
+        row = conn.execute("SELECT id FROM projects WHERE title=?", ('pool-rollback',)).fetchone()
+    assert row is None
+
+
+def test_close_all_reconnects():
+    with db.connection() as before:
+        pass
+    db.close_all()
+    with db.connection() as after:
+        assert after.execute("SELECT 1").fetchone()[0] == 1
+    assert after is not before
+
+
+def test_connections_of_finished_threads_are_closed():
+    db.get_conn()
+    before = len(db._pool)
+    conns = []
+
+    def work():
+        conns.append(db.get_conn())
+        assert len(db._pool) == before + 1
+
+    threads = [threading.Thread(target=work) for _ in range(5)]
+    for t in threads:
+        t.start()
+        t.join()
+    assert len(db._pool) == before
+    with pytest.raises(Exception):
+        conns[0].execute("SELECT 1")
+
+
+def test_changing_db_path_closes_the_old_connection(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DB_PATH', tmp_path / 'first.db')
+    first = db.get_conn()
+    before = len(db._pool)
+    monkeypatch.setattr(db, 'DB_PATH', tmp_path / 'second.db')
+    second = db.get_conn()
+    assert second is not first
+    assert len(db._pool) == before
+    with pytest.raises(Exception):
+        first.execute("SELECT 1")
@@ -0,0 +1,95 @@
+import random
+
+import pytest
+
+from backend import db
+from organism_designer import core
+
+
+@pytest.fixture
+def inline(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DB_PATH', tmp_path / 'evolution.db')
+    monkeypatch.setattr(core, 'EVOLUTION_WORKERS', 0)
+    monkeypatch.setattr(core, '_pool', None)
+    yield
+    core.shutdown()
+
+
+def _config(**overrides):
+    config = dict(fitness='gc_content', params={}, generations=3, population_size=20, genome_length=40,
+                  seed_ids=None, mutation_rate=0.05, crossover_rate=0.5, elite=2, seed=7)
+    config.update(overrides)
+    return config
+
+
+def test_mutate_and_crossover():
+    rng = random.Random(1)
+    g = 'A' * 1000
+    assert core.mutate(g, 0, rng) == g
+    changed = sum(a != b for a, b in zip(g, core.mutate(g, 0.05, rng)))
+    assert 20 < changed < 90
+    assert core.mutate(g, 1.0, rng).count('A') == 0
+    child = core.crossover('AAAA', 'TTTT', rng)
+    assert child[0] == 'A' and child[-1] == 'T'
+
+
+def test_job_persists_generations_with_parents(inline):
+    job = core.start_evolution(_config())
+    result = core.wait_job(job['id'], timeout=30)
+    assert result['status'] == 'completed' and result['progress'] == 1.0
+    assert [h['generation'] for h in result['history']] == [0, 1, 2, 3]
+    assert result['history'][-1]['best_fitness'] >= result['history'][0]['best_fitness']
+    assert len(result['population']) == 20
+
+    child = db.get_organism(result['population'][-1])
+    assert child['name'].startswith(f"evo-{job['id'][:8]}-g3-")
+    # elites carry over, so a child may descend from an older generation
+    assert child['parent_id'] is not None and 1 <= db.get_lineage_depth(child['id']) <= 3
+    assert core.list_jobs()[0]['id'] == job['id'] and 'population' not in core.list_jobs()[0]
+
+
+def test_seeded_job_and_validation(inline):
+    seed = db.create_organism('seed', 'ACGTACGTAC')
+    result = core.wait_job(core.start_evolution(_config(fitness='motif', params={'motif': 'GC'}, seed_ids=[seed], population_size=6, generations=1))['id'], 30)
+    assert result['status'] == 'completed'
+    assert {db.get_organism(oid)['parent_id'] for oid in result['population'][2:]} == {seed}
+    with pytest.raises(ValueError):
+        core.start_evolution(_config(fitness='target'))
+
+
+def test_process_pool_matches_inline(tmp_path, monkeypatch, inline):
+    monkeypatch.setattr(core, 'CHUNK_SIZE', 4)
+    expected = core.wait_job(core.start_evolution(_config())['id'], 30)['history']
+    monkeypatch.setattr(db, 'DB_PATH', tmp_path / 'pool.db')
+    monkeypatch.setattr(core, 'EVOLUTION_WORKERS', 2)
+    core.shutdown()
+    result = core.wait_job(core.start_evolution(_config())['id'], 120)
+    assert result['status'] == 'completed', result['error']
+    assert [h['best_fitness'] for h in result['history']] == [h['best_fitness'] for h in expected]
+
+
+def test_generations_are_written_in_batches_through_the_writer(inline, monkeypatch):
+    from backend import async_db as adb
+
+    monkeypatch.setattr(core, 'WRITE_BATCH', 7)
+    batches = []
+    real_submit = adb.submit_write
+
+    def submit(fn, records):
+        batches.append(len(records))
+        return real_submit(fn, records)
+
+    monkeypatch.setattr(adb, 'submit_write', submit)
+    result = core.wait_job(core.start_evolution(_config(generations=1))['id'], 30)
+    assert result['status'] == 'completed'
+    assert max(batches) == 7 and sum(batches) == 20 + 18
+
+
+def test_finished_jobs_are_evicted(inline, monkeypatch):
+    monkeypatch.setattr(core, 'MAX_FINISHED_JOBS', 2)
+    ids = [core.start_evolution(_config(generations=1))['id'] for _ in range(4)]
+    for job_id in ids:
+        core.wait_job(job_id, 30)
+    assert len({j['id'] for j in core.list_jobs()} & set(ids)) == 2
+    monkeypatch.setattr(core, 'JOB_TTL', -1)
+    assert not {j['id'] for j in core.list_jobs()} & set(ids)
@@ -0,0 +1,55 @@
+import sqlite3
+
+import pytest
+
+from backend import db
+from backend.pagination import encode_cursor
+
+
+def _genome_rows(conn):
+    return conn.execute("SELECT COUNT(*), COALESCE(SUM(refcount), 0) FROM genomes").fetchone()
+
+
+def test_identical_genomes_share_one_row(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DB_PATH', tmp_path / 'dedup.db')
+    g = 'ACGT' * 100
+    root = db.create_organism('root', g)
+    clones = db.create_organisms({'name': f'clone-{i}', 'genome': g, 'parent_id': root} for i in range(3))
+    other = db.create_organism('other', 'TTTT')
+    with db.connection() as conn:
+        assert tuple(_genome_rows(conn)) == (2, 5)
+
+    assert db.get_organism(clones[0])['genome'] == g
+    assert db.get_organism(clones[0])['genome_hash'] == db.get_organism(root)['genome_hash']
+    first = db.list_organisms_sharing_genome(clones[1], limit=2)
+    assert [r['id'] for r in first] == [root, clones[0]]
+    rest = db.list_organisms_sharing_genome(clones[1], cursor=encode_cursor(first[-1]['id']))
+    assert [r['id'] for r in rest] == clones[1:]
+    assert db.list_organisms_sharing_genome(99999) is None
+
+    with pytest.raises(ValueError):
+        db.delete_organism(root)
+    for oid in clones:
+        assert db.delete_organism(oid)
+    assert db.delete_organism(other)
+    assert not db.delete_organism(other)
+    with db.connection() as conn:
+        assert tuple(_genome_rows(conn)) == (1, 1)
+        assert conn.execute("SELECT COUNT(*) FROM organism_lsh WHERE organism_id=?", (other,)).fetchone()[0] == 0
+    assert db.find_similar_organisms(genome=g, k=5)[0]['id'] == root
+
+
+def test_migration_moves_genomes_out_of_organisms(tmp_path, monkeypatch):
+    path = tmp_path / 'legacy.db'
+    legacy = sqlite3.connect(str(path))
+    legacy.execute("CREATE TABLE organisms (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, genome TEXT NOT NULL, parent_id INTEGER, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+    legacy.executemany("INSERT INTO organisms (name, genome) VALUES (?, ?)", [('a', 'GATTACA'), ('b', 'GATTACA'), ('c', 'MKV')])
+    legacy.commit()
+    legacy.close()
+
+    monkeypatch.setattr(db, 'DB_PATH', path)
+    assert sorted(r['genome'] for r in db.list_organisms()) == ['GATTACA', 'GATTACA', 'MKV']
+    with db.connection() as conn:
+        columns = {r[1] for r in conn.execute("PRAGMA table_info(organisms)")}
+        assert 'genome' not in columns and 'genome_hash' in columns
+        assert tuple(_genome_rows(conn)) == (2, 3)
@@ -0,0 +1,85 @@
+import random
+
+from backend import db
+from organism_designer import genome as genome_codec
+
+
+def _mutate(rng, genome, n):
+    bases = list(genome)
+    for i in rng.sample(range(len(bases)), n):
+        bases[i] = rng.choice('ACGT'.replace(bases[i], ''))
+    return ''.join(bases)
+
+
+def test_diff_patch_round_trip():
+    base = 'ACGT' * 300
+    for target in (base, _mutate(random.Random(1), base, 7), base[:500] + 'GATTACA' + base[503:], base[10:], 'MKV' + base):
+        script = genome_codec.diff(base, target)
+        assert genome_codec.patch(base, script) == target
+    assert len(genome_codec.diff(base, _mutate(random.Random(2), base, 3))) < 20
+
+
+def test_lineage_stored_as_deltas_with_keyframes(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DB_PATH', tmp_path / 'delta.db')
+    monkeypatch.setattr(db, 'GENOME_DELTA', True)
+    monkeypatch.setattr(db, 'GENOME_DELTA_MAX_DEPTH', 3)
+    rng = random.Random(4)
+    genomes = [''.join(rng.choice('ACGT') for _ in range(4000))]
+    ids = [db.create_organism('gen-0', genomes[0])]
+    for gen in range(1, 9):
+        genomes.append(_mutate(rng, genomes[-1], 3))
+    # half through single creates, half through one bulk batch with refs
+    for gen in range(1, 5):
+        ids.append(db.create_organism(f'gen-{gen}', genomes[gen], parent_id=ids[-1]))
+    refs = {'p': ids[-1]}
+    ids += db.create_organisms(
+        [{'name': f'gen-{gen}', 'genome': genomes[gen], 'ref': str(gen), 'parent': 'p' if gen == 5 else str(gen - 1)} for gen in range(5, 9)],
+        refs,
+    )
+
+    with db.connection() as conn:
+        depths = [r[0] for r in conn.execute(
+            "SELECT g.chain_depth FROM organisms o JOIN genomes g ON g.hash = o.genome_hash ORDER BY o.id"
+        )]
+        stored = conn.execute("SELECT SUM(length(data)) FROM genomes").fetchone()[0]
+    assert depths == [0, 1, 2, 3, 0, 1, 2, 3, 0]
+    assert stored < 3 * 1000 + 6 * 100
+
+    db.clear_caches()
+    assert [db.get_organism(oid)['genome'] for oid in ids] == genomes
+
+    for oid in reversed(ids):
+        assert db.delete_organism(oid)
+    with db.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM genomes").fetchone()[0] == 0
+
+
+def test_batch_child_of_stored_delta_respects_max_depth(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DB_PATH', tmp_path / 'delta.db')
+    monkeypatch.setattr(db, 'GENOME_DELTA', True)
+    monkeypatch.setattr(db, 'GENOME_DELTA_MAX_DEPTH', 3)
+    rng = random.Random(5)
+    genomes = [''.join(rng.choice('ACGT') for _ in range(4000))]
+    for _ in range(5):
+        genomes.append(_mutate(rng, genomes[-1], 3))
+    ids = [db.create_organism('gen-0', genomes[0])]
+    for gen in range(1, 4):
+        ids.append(db.create_organism(f'gen-{gen}', genomes[gen], parent_id=ids[-1]))
+    # a batch re-inserting the depth-3 genome, then children of that copy
+    db.create_organisms([
+        {'name': 'copy', 'genome': genomes[3], 'ref': 'c', 'parent_id': ids[2]},
+        {'name': 'child', 'genome': genomes[4], 'ref': 'd', 'parent': 'c'},
+        {'name': 'grandchild', 'genome': genomes[5], 'parent': 'd'},
+    ], {})
+
+    with db.connection() as conn:
+        depths = dict(conn.execute("SELECT o.name, g.chain_depth FROM organisms o JOIN genomes g ON g.hash = o.genome_hash"))
+        longest = conn.execute(
+            "WITH RECURSIVE chain(hash, n) AS (SELECT hash, 0 FROM genomes UNION ALL"
+            " SELECT g.base_hash, n + 1 FROM chain JOIN genomes g ON g.hash = chain.hash WHERE g.base_hash IS NOT NULL)"
+            " SELECT MAX(n) FROM chain"
+        ).fetchone()[0]
+    assert depths['copy'] == 3 and depths['child'] == 0 and depths['grandchild'] == 1
+    assert longest <= 3
+    db.clear_caches()
+    assert db.get_organism(ids[3])['genome'] == genomes[3]
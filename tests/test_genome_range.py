@@ -0,0 +1,22 @@
+import random
+
+from backend import db
+
+
+def test_genome_range_matches_slices(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DB_PATH', tmp_path / 'range.db')
+    rng = random.Random(3)
+    dna = ''.join(rng.choice('ACGT') for _ in range(20001))
+    protein = ''.join(rng.choice('ACDEFGHIKLMNPQRSTVWY') for _ in range(5000))
+    ids = db.create_organisms([
+        {'name': 'dna', 'genome': dna},
+        {'name': 'protein', 'genome': protein},
+        {'name': 'short', 'genome': 'MKV'},
+    ])
+    for oid, genome in zip(ids, (dna, protein, 'MKV')):
+        for start, end in ((0, None), (5000, 5200), (1, 2), (3, 3), (-7, None), (10, 10 ** 9), (2, 1)):
+            window = db.get_genome_range(oid, start, end)
+            assert window['sequence'] == genome[start:end]
+            assert window['length'] == len(genome)
+            assert window['end'] - window['start'] == len(window['sequence'])
+    assert db.get_genome_range(10 ** 9) is None
@@ -0,0 +1,52 @@
+import random
+import sqlite3
+
+from backend import db
+from organism_designer import genome as genome_codec
+
+
+def test_codec_round_trip():
+    rng = random.Random(7)
+    for n in (0, 1, 3, 4, 5, 4097):
+        g = ''.join(rng.choice('ACGT') for _ in range(n))
+        codec, value = genome_codec.encode(g)
+        assert codec == genome_codec.CODEC_2BIT
+        assert len(value) == (n + 3) // 4
+        assert genome_codec.decode(codec, value, n) == g
+    protein = 'MKVLAAGG' * 50
+    codec, value = genome_codec.encode(protein)
+    assert codec == genome_codec.CODEC_ZLIB
+    assert genome_codec.decode(codec, value, len(protein)) == protein
+    assert genome_codec.encode('MKV') == (genome_codec.CODEC_TEXT, 'MKV')
+
+
+def test_create_organism_stores_packed_and_decodes_lazily():
+    g = 'ACGT' * 250
+    oid = db.create_organism('packed-probe', g)
+    with db.connection() as conn:
+        kind, size = conn.execute(
+            "SELECT typeof(g.data), length(g.data) FROM organisms o JOIN genomes g ON g.hash = o.genome_hash WHERE o.id=?", (oid,)
+        ).fetchone()
+    assert (kind, size) == ('blob', 250)
+
+    row = db.get_organism(oid)
+    assert 'genome' not in row._data
+    assert row['genome'] == g
+    assert dict(row)['name'] == 'packed-probe'
+    assert row.genome_length == 1000
+
+
+def test_migration_packs_legacy_rows(tmp_path, monkeypatch):
+    path = tmp_path / 'legacy_organisms.db'
+    legacy = sqlite3.connect(str(path))
+    legacy.execute("CREATE TABLE organisms (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, genome TEXT NOT NULL, parent_id INTEGER, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+    legacy.execute("INSERT INTO organisms (name, genome) VALUES ('old', 'GATTACA')")
+    legacy.commit()
+    legacy.close()
+
+    monkeypatch.setattr(db, 'DB_PATH', path)
+    row = db.list_organisms(limit=1)[0]
+    assert row['genome'] == 'GATTACA'
+    with db.connection() as conn:
+        codec = conn.execute("SELECT codec FROM genomes").fetchone()[0]
+    assert codec == genome_codec.CODEC_2BIT
@@ -0,0 +1,65 @@
+import sqlite3
+from contextlib import contextmanager
+
+import pytest
+
+from backend import db
+
+
+def test_history_is_batched_and_visible_after_flush():
+    marker = 'group-commit-probe'
+    for i in range(20):
+        db.add_to_history(f'{marker} {i}', 'ok')
+    assert db.flush_writes(timeout=5) is True
+    with db.connection() as conn:
+        count = conn.execute("SELECT COUNT(*) FROM conversation_history WHERE user_message LIKE ?", (marker + '%',)).fetchone()[0]
+    assert count >= 20
+
+
+def test_get_history_reads_its_own_writes():
+    db.add_to_history('read-your-writes probe', 'seen')
+    # created_at has one-second resolution, so look past same-second ties
+    latest = db.get_history(limit=50)
+    assert any(h['user_message'] == 'read-your-writes probe' for h in latest)
+
+
+def test_sync_durability_commits_inline(monkeypatch):
+    monkeypatch.setattr(db, 'WRITE_DURABILITY', 'sync')
+    db.record_command('sync-durability probe')
+    with db.connection() as conn:
+        row = conn.execute("SELECT id FROM commands WHERE command_text=?", ('sync-durability probe',)).fetchone()
+    assert row is not None
+
+
+def test_busy_database_is_retried(monkeypatch):
+    real = db.transaction
+    failures = []
+
+    @contextmanager
+    def flaky():
+        if len(failures) < 2:
+            failures.append(1)
+            raise sqlite3.OperationalError('database is locked')
+        with real() as conn:
+            yield conn
+
+    monkeypatch.setattr(db, 'transaction', flaky)
+    monkeypatch.setattr(db, 'WRITE_DURABILITY', 'sync')
+    assert db.record_command('busy-retry probe').result(timeout=5) is None
+    assert len(failures) == 2
+
+
+def test_failed_rows_reach_their_futures():
+    ok = db.record_command('group-commit ok probe')
+    bad = db._group_writer.submit("INSERT INTO no_such_table (x) VALUES (?)", (1,))
+    assert db.flush_writes(timeout=5) is True
+    assert ok.result(timeout=5) is None
+    with pytest.raises(sqlite3.OperationalError):
+        bad.result(timeout=5)
+
+
+def test_sync_failures_reach_the_future(monkeypatch):
+    monkeypatch.setattr(db, 'WRITE_DURABILITY', 'sync')
+    bad = db._write_behind("INSERT INTO no_such_table (x) VALUES (?)", (1,))
+    with pytest.raises(sqlite3.OperationalError):
+        bad.result(timeout=5)
@@ -0,0 +1,36 @@
+from backend import db
+
+
+def _family(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DB_PATH', tmp_path / 'lineage.db')
+    root = db.create_organism('root', 'AAAA')
+    a = db.create_organism('a', 'AAAC', parent_id=root)
+    b = db.create_organism('b', 'AAAG', parent_id=root)
+    a1 = db.create_organism('a1', 'AACC', parent_id=a)
+    a2 = db.create_organism('a2', 'AACG', parent_id=a1)
+    return root, a, b, a1, a2
+
+
+def test_ancestors_and_depth(tmp_path, monkeypatch):
+    root, a, b, a1, a2 = _family(tmp_path, monkeypatch)
+    assert [r['id'] for r in db.get_ancestors(a2)] == [a1, a, root]
+    assert db.get_ancestors(root) == []
+    assert db.get_ancestors(9999) is None
+    assert db.get_lineage_depth(a2) == 3
+    assert db.get_lineage_depth(root) == 0
+
+
+def test_descendants_paging_and_common_ancestor(tmp_path, monkeypatch):
+    root, a, b, a1, a2 = _family(tmp_path, monkeypatch)
+    first = db.get_descendants(root, limit=2)
+    assert [(r['id'], r['depth']) for r in first] == [(a, 1), (b, 1)]
+    from backend.pagination import encode_cursor
+    rest = db.get_descendants(root, limit=10, cursor=encode_cursor(first[-1]['depth'], first[-1]['id']))
+    assert [r['id'] for r in rest] == [a1, a2]
+    assert [r['id'] for r in db.get_descendants(root, max_depth=1)] == [a, b]
+    assert db.get_descendants(a2) == []
+    assert db.get_descendants(99999) is None
+
+    assert db.get_common_ancestor(a2, b)['id'] == root
+    lca = db.get_common_ancestor(a2, a1)
+    assert (lca['id'], lca['depth_a'], lca['depth_b']) == (a1, 1, 0)
@@ -1,13 +1,11 @@
 import time
 import json
-from pathlib import Path
 
 from backend import settings as settings_mod
 
 
 def _write_log_lines(lines):
-    p = Path(__file__).resolve().parent.parent / 'data' / 'jarvis_settings.log'
-    p.parent.mkdir(parents=True, exist_ok=True)
+    p = settings_mod.LOG_PATH
     with p.open('w', encoding='utf-8') as f:
         for l in lines:
             f.write(json.dumps(l, ensure_ascii=False) + '\n')
@@ -47,3 +45,12 @@ def test_log_time_range_and_pagination():
     since = now - 2
     r = settings_mod.get_audit_logs(limit=10, since=since)
     assert all(int(e['timestamp']) >= since for e in r)
+
+
+def test_offset_is_ignored_with_a_cursor():
+    now = int(time.time())
+    _write_log_lines([{'timestamp': now - i, 'actor': 'x', 'field': f'f{i}', 'old_value': None, 'new_value': i} for i in range(10)])
+
+    first = settings_mod.get_audit_page(limit=3)
+    second = settings_mod.get_audit_page(limit=3, offset=5, cursor=first['next_cursor'])
+    assert [e['field'] for e in second['items']] == ['f3', 'f4', 'f5']
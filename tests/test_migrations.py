@@ -0,0 +1,35 @@
+import sqlite3
+
+from backend import db
+
+
+def _tables(conn):
+    return {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+
+
+def test_fresh_database_is_migrated_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DB_PATH', tmp_path / 'fresh.db')
+    db.init_db()
+    with db.connection() as conn:
+        assert db.schema_version(conn) == db.MIGRATIONS[-1][0]
+        assert {'admin_sessions', 'revoked_tokens', 'project_files', 'project_snapshots'} <= _tables(conn)
+        # re-running is a no-op
+        assert db.migrate(conn) == db.MIGRATIONS[-1][0]
+        count = conn.execute("SELECT COUNT(*) FROM schema_version").fetchone()[0]
+    assert count == len(db.MIGRATIONS)
+
+
+def test_legacy_database_upgrades_in_place(tmp_path, monkeypatch):
+    path = tmp_path / 'legacy.db'
+    legacy = sqlite3.connect(str(path))
+    legacy.execute("CREATE TABLE projects (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, description TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+    legacy.execute("INSERT INTO projects (title, description) VALUES ('kept', '')")
+    legacy.commit()
+    legacy.close()
+
+    monkeypatch.setattr(db, 'DB_PATH', path)
+    pid = db.create_project('new')
+    assert db.get_project(pid)['title'] == 'new'
+    assert [p['title'] for p in db.list_projects()].count('kept') == 1
+    s = db.create_admin_session('migrated', ttl_seconds=5)
+    assert db.verify_admin_session(s['session_token']) == (True, 'migrated')
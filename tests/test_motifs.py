@@ -0,0 +1,83 @@
+import random
+import re
+
+import pytest
+
+from backend import db
+from backend.pagination import next_cursor
+from organism_designer import motifs
+
+
+def _brute(genome, motif):
+    rx = re.compile('(?=' + motifs.pattern(motifs.normalize(motif)).pattern + ')')
+    return [m.start() for m in rx.finditer(genome)]
+
+
+def test_positions_round_trip():
+    ps = [0, 1, 5, 200, 70000, 70001]
+    assert motifs.unpack_positions(motifs.pack_positions(ps)) == ps
+
+
+def _search_all(motif):
+    got, cursor = [], None
+    while True:
+        rows = db.search_motif(motif, limit=7, cursor=cursor)
+        got.extend((r['id'], r['positions']) for r in rows)
+        cursor = next_cursor(rows, 7, key=('id',))
+        if cursor is None:
+            return got
+
+
+def test_search_matches_brute_force(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DB_PATH', tmp_path / 'motifs.db')
+    rng = random.Random(5)
+    genomes = [''.join(rng.choice('ACGT') for _ in range(rng.randint(3, 400))) for _ in range(60)]
+    genomes += ['GATTACAGATTACA', 'MKVLAAG', 'ACGTACGTACGTACGTAC']
+    ids = db.create_organisms({'name': f'o{i}', 'genome': g} for i, g in enumerate(genomes))
+    # half the organisms are indexed, the rest are scanned until the next backfill
+    db.backfill_motifs(batch_size=10)
+    more = [''.join(rng.choice('ACGT') for _ in range(rng.randint(3, 400))) for _ in range(20)]
+    ids += db.create_organisms({'name': f'p{i}', 'genome': g} for i, g in enumerate(more))
+    genomes += more
+    db.delete_organism(ids[3])
+    db.delete_organism(ids[-1])
+    live = {oid: g for oid, g in zip(ids, genomes) if oid not in (ids[3], ids[-1])}
+
+    motifs_ = ('GATTACA', 'acg', 'T', 'RYN', 'NNNGATTACAGNN', 'ACGTACGTAC', 'NNNNNNNNNNA', 'AGCTTNNNNNNNNNNNNRR', 'KMSWKMSWK', 'BDHVBDHVACG',
+               'YWWNDAD', 'KYVCBHYB', 'NBDHVBDHVN', 'ACGTNNNNACGTAC')
+    for motif in motifs_:
+        expected = [(oid, _brute(g, motif)) for oid, g in sorted(live.items()) if _brute(g, motif) and set(g) <= set('ACGT')]
+        assert _search_all(motif) == expected, motif
+    assert db.backfill_motifs() == 19
+    for motif in motifs_:
+        expected = [(oid, _brute(g, motif)) for oid, g in sorted(live.items()) if _brute(g, motif) and set(g) <= set('ACGT')]
+        assert _search_all(motif) == expected, motif
+
+
+def test_deleted_organism_leaves_no_postings(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DB_PATH', tmp_path / 'motifs.db')
+    keep, drop = db.create_organisms([{'name': 'keep', 'genome': 'ACGT' * 50}, {'name': 'drop', 'genome': 'GATTACA' * 30}])
+    db.backfill_motifs()
+    db.delete_organism(drop)
+    with db.connection() as conn:
+        rows = conn.execute("SELECT DISTINCT organism_id FROM motif_index").fetchall()
+    assert [r[0] for r in rows] == [keep]
+
+
+def test_invalid_motif(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DB_PATH', tmp_path / 'motifs.db')
+    for bad in ('', 'ACGX', 'NNN'):
+        with pytest.raises(ValueError):
+            db.search_motif(bad)
+
+
+def test_probes_cover_every_sampled_offset():
+    for motif in ('GATTACAGA', 'YWWNDADKYVCBHYB', 'BDHVBDHVACG', 'NNACGTACGTNN'):
+        lead, found = motifs.probes(motif)
+        assert lead == len(motif) - len(motif.lstrip('N'))
+        assert [off for off, _ in found] == list(range(motifs.STEP))
+        for _, ranges in found:
+            assert len(ranges) <= motifs.MAX_EXPANSIONS
+    # too short, or a probe that would match every gram: scanned instead
+    assert motifs.probes('GATTACA')[1] is None
+    assert motifs.probes('ACGTNNNNNNNNNACGT')[1] is None
@@ -0,0 +1,43 @@
+from backend import db
+from backend.pagination import next_cursor
+from organism_designer import genome as genome_codec
+
+
+def test_summaries_leave_out_genomes(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DB_PATH', tmp_path / 'listing.db')
+    ids = db.create_organisms([{'name': f'o{i}', 'genome': 'ACGT' * (i + 1)} for i in range(5)])
+
+    seen = []
+    cursor = None
+    while True:
+        rows = db.list_organism_summaries(limit=2, cursor=cursor)
+        seen.extend(rows)
+        cursor = next_cursor(rows, 2)
+        if cursor is None:
+            break
+    assert [r['id'] for r in seen] == [r['id'] for r in db.list_organisms(limit=10)]
+    assert sorted(r['id'] for r in seen) == ids
+    first = next(r for r in seen if r['id'] == ids[0])
+    assert 'genome' not in first
+    assert first['genome_length'] == 4
+    assert first['genome_hash'] == genome_codec.digest('ACGT').hex()
+
+
+def test_ndjson_stream_stops_at_limit_with_a_cursor(tmp_path, monkeypatch):
+    import asyncio
+    import json
+
+    from backend import async_db as adb
+    from organism_designer import api
+
+    monkeypatch.setattr(db, 'DB_PATH', tmp_path / 'listing.db')
+    monkeypatch.setattr(api, 'STREAM_BATCH', 2)
+    db.create_organisms([{'name': f'o{i}', 'genome': 'ACGT'} for i in range(7)])
+
+    async def read(limit, cursor=None):
+        return [json.loads(line) async for line in api._stream_organisms(adb.list_organism_summaries, limit, cursor)]
+
+    first = asyncio.run(read(5))
+    assert [r['name'] for r in first[:-1]] == ['o6', 'o5', 'o4', 'o3', 'o2']
+    rest = asyncio.run(read(5, first[-1]['next_cursor']))
+    assert [r['name'] for r in rest] == ['o1', 'o0']
@@ -0,0 +1,54 @@
+import pytest
+
+from backend import db
+from backend.pagination import InvalidCursor, decode_cursor, encode_cursor, next_cursor
+
+
+def test_cursor_round_trip():
+    c = encode_cursor('2024-01-01 00:00:00', 42)
+    assert decode_cursor(c) == ['2024-01-01 00:00:00', 42]
+    with pytest.raises(InvalidCursor):
+        decode_cursor('not-a-cursor')
+
+
+def test_keyset_pages_cover_every_row_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DB_PATH', tmp_path / 'pages.db')
+    # identical created_at values exercise the id tie-breaker
+    with db.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO projects (title, description, created_at) VALUES (?, '', ?)",
+            [(f'p{i}', '2024-01-01 00:00:00' if i % 2 else '2024-01-02 00:00:00') for i in range(25)],
+        )
+    seen = []
+    cursor = None
+    while True:
+        rows = db.list_projects(limit=7, cursor=cursor)
+        seen.extend(r['title'] for r in rows)
+        cursor = next_cursor(rows, 7)
+        if cursor is None:
+            break
+    assert len(seen) == 25
+    assert len(set(seen)) == 25
+    # newest created_at first
+    assert all(int(t[1:]) % 2 == 0 for t in seen[:13])
+
+
+def test_offset_is_ignored_with_a_cursor(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DB_PATH', tmp_path / 'revoked.db')
+    for i in range(6):
+        db.revoke_token(f'tok{i}', actor='admin')
+    first = db.list_revoked_tokens(limit=2)
+    cursor = next_cursor(first, 2, key=('revoked_at', 'id'))
+    assert db.list_revoked_tokens(limit=2, offset=3, cursor=cursor) == db.list_revoked_tokens(limit=2, cursor=cursor)
+    assert len(db.list_revoked_tokens(limit=10, offset=1, cursor=cursor)) == 4
+
+
+def test_list_devices_command_pages_through_every_device(tmp_path, monkeypatch):
+    pytest.importorskip('requests')  # jarvis.weather
+    from jarvis.ai_core import BasicAICore
+
+    monkeypatch.setattr(db, 'DB_PATH', tmp_path / 'devices.db')
+    for i in range(105):
+        db.add_device(f'dev{i}', 'lamp', f'token{i}', [])
+    reply = BasicAICore().chat('list devices')
+    assert reply.count('\n- ') == 105
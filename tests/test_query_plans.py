@@ -0,0 +1,51 @@
+"""Guard against hot queries regressing to full table scans.
+
+Every SQL statement literal in `backend/db.py` is run through
+`EXPLAIN QUERY PLAN` against a freshly migrated database; a plan step of the
+form ``SCAN <table>`` (without an index) fails the test. One-off backfills
+inside `_migration_*` steps are exempt.
+"""
+import ast
+import re
+from pathlib import Path
+
+import pytest
+
+from backend import db
+
+DB_SOURCE = Path(db.__file__)
+_FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+_STATEMENT = re.compile(r'^\s*(SELECT|UPDATE|DELETE|INSERT\b.*\bSELECT|WITH)\b', re.DOTALL)
+
+
+def _queries():
+    tree = ast.parse(DB_SOURCE.read_text(encoding='utf-8'))
+    exempt = set()
+    for fn in ast.walk(tree):
+        if isinstance(fn, ast.FunctionDef) and fn.name.startswith('_migration_'):
+            exempt.update(id(n) for n in ast.walk(fn))
+    found = []
+    for node in ast.walk(tree):
+        if id(node) in exempt:
+            continue
+        if isinstance(node, ast.Constant) and isinstance(node.value, str) and _STATEMENT.match(node.value):
+            found.append(pytest.param(node.value, id=f'line{node.lineno}'))
+    return found
+
+
+@pytest.fixture(scope='module')
+def conn(tmp_path_factory):
+    import sqlite3
+
+    c = sqlite3.connect(str(tmp_path_factory.mktemp('plans') / 'plans.db'))
+    db.migrate(c)
+    yield c
+    c.close()
+
+
+@pytest.mark.parametrize('sql', _queries())
+def test_query_uses_an_index(conn, sql):
+    params = [None] * sql.count('?')
+    plan = conn.execute('EXPLAIN QUERY PLAN ' + sql, params).fetchall()
+    scans = [row[-1] for row in plan if _FULL_SCAN.match(row[-1])]
+    assert not scans, f'full table scan in {sql!r}: {scans}'
@@ -0,0 +1,30 @@
+import json
+
+import pytest
+
+pytest.importorskip('starlette')
+
+from backend import db, responses
+
+
+def test_fast_encoder_handles_db_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DB_PATH', tmp_path / 'responses.db')
+    oid = db.create_organism('fast', 'GATTACA')
+    rows = db.list_organisms(limit=5)
+    body = json.loads(responses.dumps({'items': rows, 'next_cursor': None}))
+    assert body['items'][0]['id'] == oid
+    assert body['items'][0]['genome'] == 'GATTACA'
+
+
+def test_respond_is_opt_in(monkeypatch):
+    content = {'items': [], 'next_cursor': None}
+    monkeypatch.setattr(responses, 'FAST_RESPONSES', False)
+    assert responses.respond(content) is content
+    monkeypatch.setattr(responses, 'FAST_RESPONSES', True)
+    assert responses.respond(content).body == b'{"items":[],"next_cursor":null}'
+
+
+def test_gzip_chunks_is_one_stream():
+    import gzip
+    chunks = [b'{"a":1}\n' * 1000, b'', b'{"b":2}\n']
+    assert gzip.decompress(b''.join(responses.gzip_chunks(chunks))) == b''.join(chunks)
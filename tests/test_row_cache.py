@@ -0,0 +1,77 @@
+from backend import db
+
+
+def test_row_cache_hits_and_invalidates_on_write(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DB_PATH', tmp_path / 'cache.db')
+    oid = db.create_organism('cached', 'ACGT')
+    before = db.cache_stats()['organisms']
+    first = db.get_organism(oid)
+    second = db.get_organism(oid)
+    assert second is not first and second == first
+    after = db.cache_stats()['organisms']
+    assert after['misses'] == before['misses'] + 1
+    assert after['hits'] == before['hits'] + 1
+
+    assert db.delete_organism(oid)
+    assert db.get_organism(oid) is None
+
+    pid = db.create_project('cached project', 'v1')
+    proj = db.get_project(pid)
+    proj['title'] = 'mutated by caller'
+    assert db.get_project(pid)['title'] == 'cached project'
+
+
+def test_row_cache_evicts_least_recently_used():
+    cache = db._RowCache(maxsize=2, ttl=60)
+    for key in (1, 2, 1, 3):
+        cache.get_or_load(key, lambda: {'key': key})
+    assert cache.stats() == {'size': 2, 'hits': 1, 'misses': 3, 'evictions': 1}
+    # 2 was least recently used, so it is the one reloaded
+    loads = []
+    cache.get_or_load(2, lambda: loads.append(2) or {'key': 2})
+    cache.get_or_load(1, lambda: loads.append(1) or {'key': 1})
+    assert loads == [2, 1]
+
+
+def test_row_cache_expires_entries():
+    cache = db._RowCache(maxsize=10, ttl=0)
+    cache.get_or_load('k', lambda: 'v')
+    cache.get_or_load('k', lambda: 'v')
+    assert cache.stats()['hits'] == 0
+
+
+def test_organism_rows_are_cached_without_genomes(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DB_PATH', tmp_path / 'cache.db')
+    oid = db.create_organism('big', 'ACGT' * 1000)
+    assert db.get_organism(oid)['genome'] == 'ACGT' * 1000
+    with db._organism_cache._lock:
+        cached = [row for _, row in db._organism_cache._entries.values()]
+    assert cached and all('genome' not in row for row in cached)
+
+
+def test_deletions_by_other_processes_reach_the_cache(tmp_path, monkeypatch):
+    import sqlite3
+
+    monkeypatch.setattr(db, 'DB_PATH', tmp_path / 'cache.db')
+    monkeypatch.setattr(db, 'ROW_CACHE_RECHECK', 0)
+    keep, gone = db.create_organism('keep', 'ACGT'), db.create_organism('gone', 'GGCC')
+    assert db.get_organism(gone)['name'] == 'gone'
+    # another process deletes it: this process's cache is not told directly
+    other = sqlite3.connect(str(db.DB_PATH))
+    with other:
+        other.execute("DELETE FROM organisms WHERE id=?", (gone,))
+        other.execute("INSERT INTO organism_tombstones (organism_id) VALUES (?)", (gone,))
+    other.close()
+    assert db.get_organism(gone) is None
+    assert db.get_organism(keep)['name'] == 'keep'
+
+
+def test_genome_cache_is_bounded_by_bytes(monkeypatch):
+    db.clear_caches()
+    monkeypatch.setattr(db, 'GENOME_CACHE_BYTES', 10)
+    db._cache_genome(b'a', 'ACGT')
+    db._cache_genome(b'b', 'ACGTAC')
+    db._cache_genome(b'c', 'AC')
+    db._cache_genome(b'd', 'A' * 11)
+    assert list(db._genome_cache) == [b'b', b'c']
+    db.clear_caches()
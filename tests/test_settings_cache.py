@@ -0,0 +1,73 @@
+import json
+import os
+import threading
+
+from backend import settings as settings_mod
+
+
+def _setup(tmp_path, monkeypatch, recheck=60.0):
+    monkeypatch.setattr(settings_mod, 'SETTINGS_PATH', tmp_path / 'settings.json')
+    monkeypatch.setattr(settings_mod, 'LOG_PATH', tmp_path / 'audit.log')
+    monkeypatch.setattr(settings_mod, 'SETTINGS_RECHECK_SECONDS', recheck)
+    monkeypatch.setattr(settings_mod, '_settings_cache', settings_mod._SettingsCache())
+
+
+def _external_write(path, value):
+    # another worker's atomic replace: a new inode
+    tmp = path.with_name('other.tmp')
+    tmp.write_text(json.dumps(value), encoding='utf-8')
+    os.replace(tmp, path)
+
+
+def test_reads_are_served_from_cache(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch)
+    settings_mod.save_settings_atomic({'theme': 'dark'}, actor='alice')
+    reads = []
+    real_read = settings_mod._read_json_file
+    monkeypatch.setattr(settings_mod, '_read_json_file', lambda path: reads.append(path) or real_read(path))
+    for _ in range(5):
+        assert settings_mod.load_settings() == {'theme': 'dark'}
+    assert reads == []
+    # callers get copies
+    settings_mod.load_settings()['theme'] = 'mutated'
+    assert settings_mod.load_settings() == {'theme': 'dark'}
+
+
+def test_external_changes_are_reloaded_after_recheck(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch)
+    settings_mod.save_settings_atomic({'theme': 'dark'}, actor='alice')
+    _external_write(settings_mod.SETTINGS_PATH, {'theme': 'light'})
+    assert settings_mod.load_settings() == {'theme': 'dark'}  # within the recheck window
+    monkeypatch.setattr(settings_mod, 'SETTINGS_RECHECK_SECONDS', 0.0)
+    assert settings_mod.load_settings() == {'theme': 'light'}
+
+    # saves diff against the file on disk, even inside the recheck window
+    monkeypatch.setattr(settings_mod, 'SETTINGS_RECHECK_SECONDS', 60.0)
+    _external_write(settings_mod.SETTINGS_PATH, {'theme': 'blue'})
+    settings_mod.save_settings_atomic({'theme': 'green'}, actor='bob')
+    entry = settings_mod.get_audit_logs(actor='bob')[0]
+    assert (entry['old_value'], entry['new_value']) == ('blue', 'green')
+
+
+def test_subscribers_hear_own_and_external_changes(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch, recheck=0.01)
+    settings_mod.save_settings_atomic({'volume': 1}, actor='alice')
+    changes = []
+    seen = threading.Event()
+
+    def on_change(old, new):
+        changes.append((old, new))
+        seen.set()
+
+    unsubscribe = settings_mod.subscribe(on_change)
+    settings_mod.save_settings_atomic({'volume': 2}, actor='alice')
+    assert changes == [({'volume': 1}, {'volume': 2})]
+
+    seen.clear()
+    _external_write(settings_mod.SETTINGS_PATH, {'volume': 3})
+    assert seen.wait(5)
+    assert changes[-1] == ({'volume': 2}, {'volume': 3})
+
+    unsubscribe()
+    settings_mod.save_settings_atomic({'volume': 4}, actor='alice')
+    assert len(changes) == 2
@@ -0,0 +1,42 @@
+import random
+
+from backend import db
+from organism_designer import similarity
+
+
+def _mutate(rng, genome, n):
+    bases = list(genome)
+    for i in rng.sample(range(len(bases)), n):
+        bases[i] = rng.choice('ACGT'.replace(bases[i], ''))
+    return ''.join(bases)
+
+
+def test_sketch_estimates_jaccard():
+    rng = random.Random(3)
+    g = ''.join(rng.choice('ACGT') for _ in range(3000))
+    assert similarity.similarity(similarity.sketch(g), similarity.sketch(g)) == 1.0
+    close = similarity.similarity(similarity.sketch(g), similarity.sketch(_mutate(rng, g, 30)))
+    unrelated = similarity.similarity(similarity.sketch(g), similarity.sketch(''.join(rng.choice('ACGT') for _ in range(3000))))
+    assert close > 0.6 and unrelated < 0.1
+    # genomes shorter than a k-mer still get a full, stable sketch
+    assert similarity.sketch('ACG') == similarity.sketch('ACG')
+    assert len(similarity.unpack(similarity.pack(similarity.sketch('ACG')))) == similarity.NUM_HASHES
+
+
+def test_find_similar_uses_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DB_PATH', tmp_path / 'similar.db')
+    rng = random.Random(11)
+    base = ''.join(rng.choice('ACGT') for _ in range(1000))
+    target = db.create_organism('target', base)
+    near = db.create_organism('near', _mutate(rng, base, 5))
+    far = db.create_organism('far', _mutate(rng, base, 15))
+    db.create_organisms({'name': f'noise-{i}', 'genome': ''.join(rng.choice('ACGT') for _ in range(1000))} for i in range(50))
+
+    result = db.find_similar_organisms(organism_id=target, k=5)
+    assert [r['id'] for r in result[:2]] == [near, far]
+    assert all(r['id'] != target for r in result)
+    assert result[0]['similarity'] > result[1]['similarity']
+
+    by_genome = db.find_similar_organisms(genome=base, k=1)
+    assert by_genome[0]['id'] == target and by_genome[0]['similarity'] == 1.0
+    assert db.find_similar_organisms(organism_id=99999) is None
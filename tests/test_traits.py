@@ -0,0 +1,46 @@
+import pytest
+
+from backend import db
+from backend.pagination import next_cursor
+from organism_designer import traits
+
+
+def test_extract():
+    t = traits.extract('CCATGAAATAGGGATGTTTTTTTGA')
+    assert t['length'] == 25
+    assert t['gc_content'] == pytest.approx(8 / 25)
+    assert t['gc_skew'] == pytest.approx(4 / 8)
+    assert t['longest_orf'] == 12  # ATG AAA TAG
+    assert traits.extract('AAAA')['entropy'] == 0
+    # nucleotide traits do not apply to protein sequences
+    assert traits.extract('MKVLA') == {'length': 5}
+
+
+def test_traits_stored_on_insert_and_queried_by_range(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DB_PATH', tmp_path / 'traits.db')
+    genomes = ['G' * i + 'A' * (10 - i) for i in range(11)]
+    ids = db.create_organisms({'name': f'gc{i}', 'genome': g} for i, g in enumerate(genomes))
+    assert db.get_organism_traits(ids[3])['gc_content'] == pytest.approx(0.3)
+    assert db.get_organism_traits(10 ** 9) is None
+
+    seen, cursor = [], None
+    while True:
+        rows = db.list_organisms_by_trait('gc_content', 0.2, 0.75, descending=True, limit=2, cursor=cursor)
+        seen.extend(r['id'] for r in rows)
+        cursor = next_cursor(rows, 2, key=('value', 'id'))
+        if cursor is None:
+            break
+    assert seen == ids[7:1:-1]
+
+    db.delete_organism(ids[5])
+    assert ids[5] not in [r['id'] for r in db.list_organisms_by_trait('gc_content', limit=20)]
+
+
+def test_backfill_fills_missing_traits(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'DB_PATH', tmp_path / 'traits.db')
+    ids = db.create_organisms({'name': f'o{i}', 'genome': 'ACGT' * (i + 1)} for i in range(5))
+    with db.transaction() as conn:
+        conn.execute("DELETE FROM organism_traits WHERE organism_id IN (?, ?)", (ids[1], ids[3]))
+    assert db.backfill_traits(batch_size=1) == 2
+    assert db.get_organism_traits(ids[3])['length'] == 16
+    assert db.backfill_traits() == 0